@@ -1,47 +1,16 @@
 import subprocess
 import os
 
-# Lista com os nomes das pastas onde cada main.py está localizado
-nomes_das_pastas = [
-    "Amazon Buscas Bot",
-    "Amazon Listagens Bot",
-    "Amazon Produtos Bot",
-    "Americanas Buscas Bot",
-    "Americanas Listagens Bot",
-    "Americanas Produtos Bot",
-    "Dafiti Buscas Bot",
-    "Dafiti Listagens Bot",
-    "Dafiti Produtos Bot",
-    "Carrefour Buscas Bot",
-    "Carrefour Listagens Bot",
-    "Carrefour Produtos Bot",
-    "Kabum Buscas Bot",
-    "Kabum Listagens Bot",
-    "Kabum Produtos Bot",
-    "Fast Buscas Bot",
-    "Fast Listagens Bot",
-    "Fast Produtos Bot",
-    "Magazine Buscas Bot",
-    "Magazine Listagens Bot",
-    "Magazine Produtos Bot",
-    "Casas B Buscas Bot",
-    "Casas B Listagens Bot",
-    "Casas B Produtos Bot",
-    "Mercado L Buscas Bot",
-    # Adicione o restante dos nomes das pastas aqui
-]
+# Todos os bots (Buscas, Listagens e Produtos de cada loja) agora rodam em um único processo.
+# Os tenants e as variáveis com os tokens de cada bot ficam no tenants.json do projeto
+# (veja o tenants.example.json com os nomes das antigas pastas).
 
-# O diretório base onde as pastas estão localizadas
-# Isso deve ser o caminho para o diretório "BOTS MONITORA PREÇO" no seu sistema
-diretorio_base = r"C:\Users\breno\OneDrive\Área de Trabalho\Price Bots"
+# O diretório do projeto, onde estão o runner.py e o tenants.json
+diretorio_base = r"C:\Users\breno\OneDrive\Área de Trabalho\Price Bots\BotAmazonDiscord"
 
-# Iniciando todos os scripts main.py simultaneamente, cada um em uma nova janela de CMD
-for nome_da_pasta in nomes_das_pastas:
-    # Construir o caminho completo para o arquivo main.py
-    caminho_script = os.path.join(diretorio_base, nome_da_pasta, "main.py")
-    
-    # Iniciar o script main.py em uma nova janela de CMD
-    subprocess.Popen(["cmd", "/k", "python", caminho_script])
+# Iniciando o runner em uma nova janela de CMD
+caminho_script = os.path.join(diretorio_base, "runner.py")
+subprocess.Popen(["cmd", "/k", "python", caminho_script], cwd=diretorio_base)
 
-# Neste ponto, as novas janelas de CMD foram abertas e os scripts estão rodando nelas.
-# Este script principal pode ser encerrado, ou você pode adicionar código para manter o controle dos processos, se necessário.
+# Neste ponto, o runner está rodando na nova janela de CMD e hospeda todos os bots.
+# O relatório de uso de recursos por tenant é mostrado nessa janela a cada RUNNER_REPORT_INTERVAL segundos.
@@ -1,4 +1,3 @@
-import pandas as pd
 import threading
 import asyncio
 import os
@@ -8,17 +7,21 @@ import pickle
 
 from dotenv import load_dotenv
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException, ElementClickInterceptedException
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains 
 
-from time import sleep, time
+from time import sleep
+
+from botUtils.driverPool import get_driver_pool
+from botUtils.browserProfiles import apply_profile
+from botUtils.productStore import ProductStateStore, NEW_PRODUCT, PRICE_CHANGED
+from botUtils.resultSink import ResultSink
+from botUtils.priceHistory import get_price_history
+from botUtils.notifications import get_notification_queue
+from botUtils.waits import StoreWaiter
+from botUtils.productWatcher import start_watcher, stop_watcher
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -32,62 +35,64 @@ class AliExpressPriceBot():
     def __init__(self, search_query, expected_price, pages, user, loop, times):
         self.url = "https://best.aliexpress.com"
         self.search_query = search_query
-        self.priceList = []  # Lista para armazenar os preços encontrados
+        self.results = ResultSink("aliexpress", search_query)  # Resultados gravados em disco durante a busca (só os mais recentes ficam em memória)
+        self.price_history = get_price_history()  # Histórico de preços em SQLite compartilhado por todos os bots
         self.expected_price = expected_price
         self.pages = pages  # Número de páginas a serem verificadas
         self.user = user  # Objeto para enviar notificações para o usuário
         self.loop = loop
+        self.notifier = get_notification_queue(loop)  # Fila que junta as notificações em resumos e controla o ritmo de envio
         self.times = times
         self.stop_search = False  # Controle de interrupção
         self.coupon_list = {}
         self.cookies_path = 'cookies.pkl'
-        self.priceListInformation = []
-        self.products_names = []
+        self.product_store = ProductStateStore(sink=self.results, history=self.price_history, store="aliexpress")  # Produtos já vistos, indexados pela chave do produto
 
         # Configurações do navegador Chrome
         self.options = Options() 
         self.user_agent = userAgent
         self.options.add_argument(f'user-agent={self.user_agent}')
-        #options.add_argument('--headless')
         self.options.add_argument('--disable-gpu')
-        self.options.add_argument('--window-size=1920x1080')
         self.options.add_argument('--disable-dev-shm-usage')
         self.options.add_argument('--no-sandbox')
         self.options.add_argument('--ignore-certificate-errors')
         self.options.add_experimental_option('excludeSwitches', ['enable-logging'])
         self.options.add_argument('--disable-blink-features=AutomationControlled')
         self.options.add_argument('--disable-extensions')
-        self.options.add_argument('--disable-images')
 
-        service = Service(ChromeDriverManager().install())
-        service.log_path = 'NUL'
+        # Perfil do navegador da loja (headless, memória reduzida...), definido em botUtils/browserProfiles.py
+        apply_profile(self.options, "aliexpress")
+
+        # O navegador é emprestado do pool compartilhado a cada ciclo (ver restart_driver)
+        self.driver = None
 
-        self.driver = webdriver.Chrome(service=service, options=self.options)
+        # Espera pelos cards da busca e pelo título da página do produto em vez de pausas fixas
+        self.waiter = StoreWaiter("aliexpress", results=(By.CSS_SELECTOR, "div.multi--outWrapper--SeJ8lrF"), product=(By.CSS_SELECTOR, "h1[data-pl='product-title']"))
 
     async def notify_discord_about_new_product(self, title, price, url):
         message = "-" * 70 + f"\n\n**Novo Produto!**\n**Produto:** {title}\n**Preço Abaixo do Esperado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_change_in_price(self, title, price, url):
         message = "-" * 70 + f"\n\n**Mudança no preço**\n**Produto:** {title}\n**Preço Abaixo do Esperado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
 
     async def notify_discord_about_monitoring_new_product(self, title, price, url):
         message = "-" * 70 + f"\n\n**Novo Produto!**\n**Produto:** {title}\n**Preço Monitorado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_monitoring_new_price(self, title, price, url):
         message = "-" * 70 + f"\n\n**Mudança no preço!**\n**Produto:** {title}\n**Preço Monitorado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_error(self):
         message = "-" * 70 + f"\n\nOcorreu um erro ao monitorar o produto. \n\nO produto pode estar sem estoque, a página pode estar indisponível ou a estrutura do site mudou!\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_coupon(self, url, coupon):
         message = "-" * 70 + f"\n\nCupom encontrado na loja {url}\n Cupom:{coupon}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     # Método para realizar a pesquisa do produto na Ali Express
     def search_product(self):
@@ -105,7 +110,7 @@ class AliExpressPriceBot():
 
         try:
             self.driver.fullscreen_window()
-            sleep(1)
+            self.waiter.results_ready(self.driver)
 
             scroll_increment = 500
             last_height = self.driver.execute_script("return document.body.scrollHeight")
@@ -146,55 +151,46 @@ class AliExpressPriceBot():
                         'price': product_price
                     }
 
-                    if product_info['title'] not in self.products_names:
+                    try:
+                        price = float(product_price.replace('R$', '').replace('.', '').replace(',', '.').strip())
+                    except ValueError:
+                        print(f"Erro ao converter o preço do produto '{product_title}'. Preço encontrado: '{product_price}'")
+                        continue
 
-                        self.products_names.append(product_info['title'])
-                        self.priceListInformation.append(product_info)
+                    # Consulta o estado do produto pela chave (busca O(1)) para saber se ele é novo ou se o preço mudou
+                    change = self.product_store.observe(product_info['link'], product_info['title'], price)
 
-                        try:
-                            price = float(product_price.replace('R$', '').replace('.', '').replace(',', '.').strip())
-                        except ValueError:
-                            print(f"Erro ao converter o preço do produto '{product_title}'. Preço encontrado: '{product_price}'")
-                            continue
+                    if change == NEW_PRODUCT:
 
                         if self.expected_price is None:
 
-                            asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_product(product_info['title'], price, product_info["link"]), self.loop)
+                            self.notifier.submit(self.notify_discord_about_monitoring_new_product(product_info['title'], price, product_info['link']))
 
-                            print(f"Novo Produto!\nPreço encontrado para '{product_info['title']}' \nPreço: R${price}\n\n")
+                            print(f"Novo produto!\nPreço encontrado para '{product_info['title']}' \nPreço: R${price}\n\n")
 
                         elif price <= self.expected_price:
 
-                            asyncio.run_coroutine_threadsafe(self.notify_discord_about_new_product(product_info['title'], price, product_info["link"]), self.loop)
+                            self.notifier.submit(self.notify_discord_about_new_product(product_info['title'], price, product_info['link']))
 
-                            print(f"Novo Produto!\nPreço encontrado para '{product_info['title']}' \nPreço: R${price}\n\n")
+                            print(f"Novo produto!\nPreço encontrado para '{product_info['title']}' \nPreço: R${price}\n\n")
 
-                    else:
-                        for product in self.priceListInformation:
-                            if product_info['title'] == product['title'] and product_info['price'] != product['price']:
-                                try:
-                                    price = float(product_info['price'].replace('R$', '').replace('.', '').replace(',', '.').strip())
-                                except ValueError:
-                                    print(f"Erro ao converter o preço do produto '{product_info['title']}'. Preço encontrado: '{product_info['price']}'")
-                                    continue
+                    elif change == PRICE_CHANGED:
 
-                                product['price'] = product_info['price']
+                        if self.expected_price is None:
 
-                                if self.expected_price is None:
-                                        
-                                        asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_price(product_info['title'], price, product_info["link"]), self.loop)
-    
-                                        print(f"Novo Preço!\nPreço encontrado para '{product_info['title']}' \nPreço: R${price}\n\n")
-                                
-                                elif price <= self.expected_price:
-                                        
-                                        asyncio.run_coroutine_threadsafe(self.notify_discord_about_change_in_price(product_info['title'], price, product_info["link"]), self.loop)
-    
-                                        print(f"Novo Preço!\nPreço encontrado para '{product_info['title']}' \nPreço: R${price}\n\n")
+                            self.notifier.submit(self.notify_discord_about_monitoring_new_price(product_info['title'], price, product_info['link']))
+
+                            print(f"Preço mudou para '{product_info['title']}' \nPreço: R${price}\n\n")
+
+                        elif price <= self.expected_price:
+
+                            self.notifier.submit(self.notify_discord_about_change_in_price(product_info['title'], price, product_info['link']))
+
+                            print(f"Preço mudou para '{product_info['title']}' \nPreço: R${price}\n\n")
 
                 try:
                     self.driver.execute_script(f"window.scrollBy(0, {scroll_increment});")
-                    sleep(2)
+                    self.waiter.network_idle(self.driver)
 
                     new_height = self.driver.execute_script("return document.body.scrollHeight")
                     if new_height == last_height:
@@ -204,12 +200,12 @@ class AliExpressPriceBot():
                     print(f"Erro ao executar a rolagem da página: {e}")
                     break
 
-            print(f"Foram encontrados {len(self.priceListInformation)} produtos únicos na página.")
+            print(f"Foram encontrados {len(self.product_store)} produtos únicos até agora.")
 
         except Exception as e:
             print(f"Erro geral na busca de produtos e preços: {e}")
 
-        return self.priceListInformation
+        return self.product_store.values()
 
     # Método para navegar para a próxima página de resultados
     def next_page(self):
@@ -249,21 +245,20 @@ class AliExpressPriceBot():
                 self.restart_driver()
                 self.driver.get(self.url)
                 self.slide_button(self.driver)
-                sleep(0.7)
+                self.waiter.page_ready(self.driver)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
                 search_url = self.driver.current_url
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url)
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         else:
             for _ in range(self.times):
                 if self.stop_search:
@@ -271,23 +266,22 @@ class AliExpressPriceBot():
                 self.restart_driver()
                 self.driver.get(self.url)
                 self.slide_button(self.driver)
-                sleep(0.7)
+                self.waiter.page_ready(self.driver)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
                 search_url = self.driver.current_url
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url)
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         
-        self.driver.quit()
+        self.release_driver()
 
     
     # Método para realizar a busca de preços de forma síncrona
@@ -297,19 +291,18 @@ class AliExpressPriceBot():
                 self.restart_driver()
                 self.driver.get(link)
                 self.slide_button(self.driver)
-                sleep(0.7)
+                self.waiter.results_ready(self.driver)
                 search_url = self.driver.current_url
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url)
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         else:
             for _ in range(self.times):
                 if self.stop_search:
@@ -317,27 +310,38 @@ class AliExpressPriceBot():
                 self.restart_driver()
                 self.driver.get(link)
                 self.slide_button(self.driver)
-                sleep(0.7)
+                self.waiter.results_ready(self.driver)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
                 search_url = self.driver.current_url
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url) 
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         
-        self.driver.quit()
+        self.release_driver()
+
+    # Devolve o navegador atual ao pool e pega outro (reaproveitado, se houver algum livre)
+    def restart_driver(self, recycle=False):
+        self.waiter.next_cycle()
+        driver_pool = get_driver_pool()
+        if recycle:
+            driver_pool.discard(self.driver)
+        else:
+            driver_pool.release(self.driver)
+        self.driver = driver_pool.checkout(self.options, store="aliexpress", should_stop=lambda: self.stop_search)
 
-    def restart_driver(self):
-        self.driver.quit()
-        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=self.options)
+    def release_driver(self):
+        self.results.flush()
+        self.waiter.end_cycle()
+        get_driver_pool().release(self.driver)
+        self.driver = None
 
     # Função para monitorar um link de um produto específico e se o preço dele mudou   
     def check_specific_product(self, link, expected_price):
@@ -352,12 +356,15 @@ class AliExpressPriceBot():
 
         in_stock = True
 
+        # Aba do produto mantida aberta entre as verificações
+        watcher = start_watcher(self, "aliexpress", link)
+
         while not self.stop_search:
             try:
-                self.restart_driver()
-                self.driver.get(link)
+                # Abre a página do produto na primeira volta; nas seguintes espera o intervalo e atualiza a mesma aba
+                watcher.load()
                 self.slide_button(self.driver)
-                sleep(1)
+                self.waiter.product_ready(self.driver)
             except TimeoutException:
                 print(f"Timeout ao carregar {link}, tentando recarregar.")
                 try:
@@ -379,16 +386,19 @@ class AliExpressPriceBot():
                 price = float(price_text)
                 print(f"Preço encontrado para '{title}' \nPreço: R${price}\n\n")
 
+                # Guarda o preço no histórico (a gravação acontece em segundo plano)
+                self.price_history.record("aliexpress", link, title, price)
+
                 if last_price is None:
                     last_price = price
 
                 if first_notification:
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_product(title, price, link), self.loop)
+                    self.notifier.submit(self.notify_discord_about_monitoring_new_product(title, price, link))
                     print(f"\n\nProduto: {title}\nPreço: R${price}\nLink: {link}\n\n")
                     first_notification = False
 
                 if price < last_price or (price < expected_price and not notified_for_price_drop):
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_price(title, price, link), self.loop)
+                    self.notifier.submit(self.notify_discord_about_monitoring_new_price(title, price, link))
                     print(f"\n\nProduto: {title}\nPreço: R${price}\nLink: {link}\n\n")
                     last_price = price
                     notified_for_price_drop = True
@@ -398,14 +408,17 @@ class AliExpressPriceBot():
             except NoSuchElementException:
                 print(f"Não foi possível encontrar o título ou preço para a URL: {link}")
                 if in_stock:
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_error(), self.loop)
+                    self.notifier.submit(self.notify_discord_about_error())
                     in_stock = False    
                 continue
 
-            except WebDriverException as e:
-                if "Out of Memory" in str(e):
-                    print("Detectado erro 'Out of Memory'. Reiniciando o driver...")
-                    self.restart_driver()
+            except WebDriverException:
+                # Troca o navegador se ele parou de responder ou passou dos limites de memória/CPU (botUtils/resourceMonitor.py)
+                if get_driver_pool().needs_recycle(self.driver):
+                    self.restart_driver(recycle=True)
+
+        stop_watcher(watcher)
+        self.release_driver()
 
     def save_cookies(self, driver, path):
         if os.path.exists(path):
@@ -486,32 +499,33 @@ class AliExpressPriceBot():
         options.add_argument('--disable-extensions')
         options.add_argument('--disable-popup-blocking')
         options.add_argument('--disable-infobars')
-        options.add_argument('--window-size=1920x1080')
         options.add_argument('--disable-dev-shm-usage')
         options.add_argument('--no-sandbox')
         options.add_argument('--ignore-certificate-errors')
         options.add_experimental_option('excludeSwitches', ['enable-logging'])
         options.add_argument('--disable-blink-features=AutomationControlled')
-        options.add_argument('--disable-images')
         options.add_argument('--disable-notifications')
         options.add_argument('--disable-web-security')
         options.add_argument('--no-zygote')
         options.add_argument('--ignore-ssl-errors=yes')
         options.add_argument('--ignore-certificate-errors')
+        apply_profile(options, "aliexpress")
         return options
 
     def find_coupons(self, urls):
         options = self.configure_options(self.user_agent)
-        service = Service(ChromeDriverManager().install())
+        driver_pool = get_driver_pool()
 
         while not self.stop_search:
             for url in urls:
-                # Inicialização do driver e carregamento de cookies
-                driver = webdriver.Chrome(options=options, service=service)
-                self.check_and_refresh_cookies(driver, self.cookies_path, url)
-                sleep(random.uniform(1, 3))  # Intervalo aleatório antes de verificar cupons
-                self.check_coupon(driver)
-                driver.quit()
+                # Empréstimo do driver do pool e carregamento de cookies
+                driver = driver_pool.checkout(options, store="aliexpress", should_stop=lambda: self.stop_search)
+                try:
+                    self.check_and_refresh_cookies(driver, self.cookies_path, url)
+                    sleep(random.uniform(1, 3))  # Intervalo aleatório antes de verificar cupons
+                    self.check_coupon(driver)
+                finally:
+                    driver_pool.release(driver)
                 sleep(random.uniform(10, 60))  # Intervalo aleatório entre iterações
 
     def check_coupon(self, driver):
@@ -520,10 +534,10 @@ class AliExpressPriceBot():
         sleep(2)
 
         try:
-            sleep(5)
+            self.waiter.network_idle(driver)
             driver.execute_script("window.scrollTo(0, 70)")
             driver.fullscreen_window()
-            sleep(2)
+            self.waiter.network_idle(driver)
 
             # Obter o link da loja atual
             current_url = driver.current_url
@@ -546,7 +560,7 @@ class AliExpressPriceBot():
                             print(f"Novo cupom encontrado na loja {current_url}: {elemento.text}")
                             self.coupon_list[current_url].append(elemento.text)
                             new_coupons_found = True
-                            asyncio.run_coroutine_threadsafe(self.notify_discord_about_coupon(current_url, elemento.text), self.loop)
+                            self.notifier.submit(self.notify_discord_about_coupon(current_url, elemento.text))
 
                 if not new_coupons_found:
                     print(f"Não foram encontrados novos cupons na loja {current_url}.")
@@ -560,7 +574,7 @@ class AliExpressPriceBot():
                     actions.move_to_element(load_more_button).click().perform()
 
                     print("Carregando mais cupons...")
-                    sleep(2)
+                    self.waiter.network_idle(driver)
                 except NoSuchElementException:
                     print("Não há mais botões para carregar cupons.")
                     break
@@ -589,8 +603,7 @@ class AliExpressPriceBot():
     async def search_for_coupons(self, urls):
         await asyncio.get_event_loop().run_in_executor(None, self.find_coupons, urls)
 
-    # Método para salvar os dados em um arquivo CSV
+    # Método para gravar no arquivo de resultados as linhas que ainda estão em memória
     def data_to_csv(self):
-        df = pd.DataFrame(self.priceList)
-        df = df.dropna(how='all')
-        df.to_csv(f"{self.search_query}.csv", index=False)
\ No newline at end of file
+        self.results.flush()
+        return self.results.path
\ No newline at end of file
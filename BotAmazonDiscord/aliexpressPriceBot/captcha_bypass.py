@@ -1,4 +1,3 @@
-import pandas as pd
 import threading
 import asyncio
 import os
@@ -17,8 +16,6 @@ from seleniumwire import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementClickInterceptedException
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains 
@@ -26,6 +23,11 @@ from webdriver_manager.opera import OperaDriverManager
 
 from time import sleep, time
 
+# Permite importar o botUtils ao executar este script diretamente
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from botUtils.driverResolver import build_service
+
 load_dotenv()
 
 userAgent = os.getenv("USER_AGENT")
@@ -36,9 +38,6 @@ coupon_list = {}
 
 user_agent = userAgent
 
-
-service = Service(ChromeDriverManager().install())
-
 def check_coupon(driver):
     sleep(2)
     slide_button(driver)
@@ -171,7 +170,14 @@ def configure_options(user_agent):
 
 options = configure_options(user_agent)
 
-service = Service(ChromeDriverManager().install())
+service = None
+
+# O chromedriver é resolvido só quando o primeiro navegador é aberto (cache em disco) e reaproveitado em todas as iterações
+def get_service():
+    global service
+    if service is None:
+        service = build_service()
+    return service
 
 # Funções para o Gerenciamento de Cookies
 def save_cookies(driver, path):
@@ -214,7 +220,7 @@ while True:
     for url in urls:
         url = url
         # Inicialização do driver e carregamento de cookies
-        driver = webdriver.Chrome(options=options, service=service)
+        driver = webdriver.Chrome(options=options, service=get_service())
         check_and_refresh_cookies(driver, cookies_path, url)
         sleep(random.uniform(1, 3))  # Intervalo aleatório antes de verificar cupons
         check_coupon(driver)
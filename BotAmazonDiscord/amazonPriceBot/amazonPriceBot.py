@@ -1,20 +1,24 @@
-import pandas as pd
 import threading
 import asyncio
 import os
 
 from dotenv import load_dotenv
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 
-from time import sleep, time
+
+from botUtils.driverPool import get_driver_pool
+from botUtils.browserProfiles import apply_profile
+from botUtils.productStore import ProductStateStore, NEW_PRODUCT, PRICE_CHANGED
+from botUtils.resultSink import ResultSink
+from botUtils.priceHistory import get_price_history
+from botUtils.notifications import get_notification_queue
+from botUtils.waits import StoreWaiter
+from botUtils.structuredData import page_structured_product
+from botUtils.pagePipeline import load_product_pages
+from botUtils.productWatcher import start_watcher, stop_watcher
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -27,56 +31,58 @@ class AmazonPriceBot():
     def __init__(self, search_query, expected_price, pages, user, loop, times):
         self.url = "https://www.amazon.com.br"
         self.search_query = search_query
-        self.priceList = []  # Lista para armazenar os preços encontrados
+        self.results = ResultSink("amazon", search_query)  # Resultados gravados em disco durante a busca (só os mais recentes ficam em memória)
+        self.price_history = get_price_history()  # Histórico de preços em SQLite compartilhado por todos os bots
         self.expected_price = expected_price
         self.pages = pages  # Número de páginas a serem verificadas
         self.user = user  # Objeto para enviar notificações para o usuário
         self.loop = loop
+        self.notifier = get_notification_queue(loop)  # Fila que junta as notificações em resumos e controla o ritmo de envio
         self.times = times
         self.stop_search = False  # Controle de interrupção
-        self.product_info = []
-        self.product_names = []
+        self.product_store = ProductStateStore(sink=self.results, history=self.price_history, store="amazon")  # Produtos já vistos, indexados pela chave do produto
 
         # Configurações do navegador Chrome
         self.options = Options()
         user_agent = userAgent
         self.options.add_argument(f'user-agent={user_agent}')
-        #self.options.add_argument('--headless')
         self.options.add_argument('--disable-gpu')
-        self.options.add_argument('--window-size=1920x1080')
         self.options.add_argument('--disable-dev-shm-usage')
         self.options.add_argument('--no-sandbox')
         self.options.add_argument('--ignore-certificate-errors')
         self.options.add_experimental_option('excludeSwitches', ['enable-logging'])
         self.options.add_argument('--disable-blink-features=AutomationControlled')
         self.options.add_argument('--disable-extensions')
-        self.options.add_argument('--disable-images')
+
+        # Perfil do navegador da loja (headless, memória reduzida...), definido em botUtils/browserProfiles.py
+        apply_profile(self.options, "amazon")
 
 
-        service = Service(ChromeDriverManager().install())
-        service.log_path = 'NUL'
+        # O navegador é emprestado do pool compartilhado a cada ciclo (ver restart_driver)
+        self.driver = None
 
-        self.driver = webdriver.Chrome(service=service, options=self.options)
+        # Espera pelos cards da busca e pelo título da página do produto em vez de pausas fixas
+        self.waiter = StoreWaiter("amazon", results=(By.XPATH, '//h2[contains(@class, "a-size-mini a-spacing-none")]/a'), product=(By.ID, "productTitle"))
 
     async def notify_discord_about_new_product(self, title, price, url):
         message = "-" * 70 + f"\n\n**Novo Produto!**\n**Produto:** {title}\n**Preço Abaixo do Esperado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_change_in_price(self, title, price, url):
         message = "-" * 70 + f"\n\n**Mudança no preço**\n**Produto:** {title}\n**Preço Abaixo do Esperado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_monitoring_new_product(self, title, price, url):
         message = "-" * 70 + f"\n\n**Novo Produto!**\n**Produto:** {title}\n**Preço Monitorado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_monitoring_new_price(self, title, price, url):
         message = "-" * 70 + f"\n\n**Mudança no preço!**\n**Produto:** {title}\n**Preço Monitorado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_error(self):
         message = "-" * 70 + f"\n\nOcorreu um erro ao monitorar o produto. \n\nO produto pode estar sem estoque, a página pode estar indisponível ou a estrutura do site mudou!\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
 
     # Método para realizar a pesquisa do produto na Amazon
@@ -118,145 +124,138 @@ class AmazonPriceBot():
 
             print(f"Encontrados {len(product_links)} produtos na página atual.")
 
-            for product in product_links:
-                if self.stop_search:  # Verificar antes de cada ação
-                    break
-                self.driver.get(product["url"])
-                sleep(1)
-                title = product["title"]
-                price = None
+            # Carrega as páginas dos produtos (várias ao mesmo tempo quando PAGE_CONCURRENCY > 1) e processa cada uma
+            load_product_pages(self.driver, product_links, self.check_product_page, ready=self.waiter.product_ready, should_stop=lambda: self.stop_search)
 
-                try:
-                    # Tenta obter o preço do produto
-                    price_whole = self.driver.find_element(By.CLASS_NAME, 'a-price-whole').text.replace('.', '').replace(',', '')
-                    price_fraction = self.driver.find_element(By.CLASS_NAME, 'a-price-fraction').text
-                    price_str = f"{price_whole}.{price_fraction}"
+        except Exception as e:
+            print(f"Ocorreu um erro geral ao tentar buscar os produtos e preços: {e}. Site pode estar fora do ar.")
 
-                    if not self.is_valid_price(price_str):
-                        raise NoSuchElementException
+        return self.results.recent()
 
-                    price = float(price_str)
+    # Lê o título e o preço da página de produto aberta no navegador e envia as notificações
+    def check_product_page(self, product):
+        title = product["title"]
+        price = None
 
-                    product_data = {
-                        "titulo": title,
-                        "preço": price,
-                        "url": product["url"]
-                    }
+        try:
+            # Tenta primeiro os dados estruturados (JSON-LD/microdata) da página; os seletores ficam como alternativa
+            structured = page_structured_product(self.driver, "amazon")
 
-                    if product_data["titulo"] not in self.product_names:
-                        self.product_names.append(product_data["titulo"])
-                        self.product_info.append(product_data)
+            if structured is not None and not structured["available"]:
+                print(f"Produto '{structured['title']}' indisponível: {product['url']}")
+                return
 
-                        if self.expected_price == None:
-                            
-                            asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_product(product['title'], price, product["url"]), self.loop)
-                            
-                            print(f"Novo produto!\nPreço encontrado para '{product['title']}' \nPreço: R${price}\n\n")
+            if structured is not None:
+                price = structured["preço"]
+            else:
+                # Tenta obter o preço do produto
+                price_whole = self.driver.find_element(By.CLASS_NAME, 'a-price-whole').text.replace('.', '').replace(',', '')
+                price_fraction = self.driver.find_element(By.CLASS_NAME, 'a-price-fraction').text
+                price_str = f"{price_whole}.{price_fraction}"
 
-                        elif price <= self.expected_price:
+                if not self.is_valid_price(price_str):
+                    raise NoSuchElementException
 
-                            asyncio.run_coroutine_threadsafe(self.notify_discord_about_new_product(product['title'], price, product["url"]), self.loop)
+                price = float(price_str)
 
-                            print(f"Novo produto!\nPreço encontrado para '{product['title']}' \nPreço: R${price}\n\n")
+            product_data = {
+                "titulo": title,
+                "preço": price,
+                "url": product["url"]
+            }
 
-                    else:
-                        for product in self.product_info:
+            # Consulta o estado do produto pela chave (busca O(1)) para saber se ele é novo ou se o preço mudou
+            change = self.product_store.observe(product_data['url'], product_data['titulo'], price)
 
-                            if product["titulo"] == product_data["titulo"]:
+            if change == NEW_PRODUCT:
 
-                                if product["preço"] != product_data["preço"]:
+                if self.expected_price is None:
 
-                                    product["preço"] = product_data["preço"]
+                    self.notifier.submit(self.notify_discord_about_monitoring_new_product(product_data['titulo'], price, product_data['url']))
 
-                                    if self.expected_price == None:
-                                        
-                                        asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_price(product['title'], price, product["url"]), self.loop)
-                                        
-                                        print(f"Preço mudou para '{product['title']}' \nPreço: R${price}\n\n")
+                    print(f"Novo produto!\nPreço encontrado para '{product_data['titulo']}' \nPreço: R${price}\n\n")
 
-                                    elif price <= self.expected_price:
+                elif price <= self.expected_price:
 
-                                        asyncio.run_coroutine_threadsafe(self.notify_discord_about_change_in_price(product['title'], price, product["url"]), self.loop)
+                    self.notifier.submit(self.notify_discord_about_new_product(product_data['titulo'], price, product_data['url']))
 
-                                        print(f"Preço mudou para '{product['title']}' \nPreço: R${price}\n\n")
-                    
+                    print(f"Novo produto!\nPreço encontrado para '{product_data['titulo']}' \nPreço: R${price}\n\n")
 
+            elif change == PRICE_CHANGED:
 
-                except NoSuchElementException:
-                    try:
-                        # Tenta obter o preço de outra forma, caso o anterior não funcione
-                        price_element = self.driver.find_element(By.XPATH, '//span[contains(@id, "price") and contains(@class, "a-size-medium")]')
-                        price_text = price_element.get_attribute('innerHTML')
-                        price_text = price_text.replace('R$', '').replace('&nbsp;', '').replace('.', '').strip()
-                        if ',' in price_text:
-                            price_whole, price_fraction = price_text.split(',')
-                        else:
-                            price_whole = price_text
-                            price_fraction = '00'  
+                if self.expected_price is None:
 
-                        price = float(f"{price_whole}.{price_fraction}")
-                        print(f"Preço encontrado para '{title}': ${price}")
+                    self.notifier.submit(self.notify_discord_about_monitoring_new_price(product_data['titulo'], price, product_data['url']))
 
-                        product_data = {
-                            "titulo": title,
-                            "preço": price,
-                            "url": product["url"]
-                        }
+                    print(f"Preço mudou para '{product_data['titulo']}' \nPreço: R${price}\n\n")
 
-                        print(product_data)
+                elif price <= self.expected_price:
 
-                        if product_data["titulo"] not in self.product_names:
-                            self.product_names.append(product_data["titulo"])
-                            self.product_info.append(product_data)
-                        
-                            if self.expected_price == None:
-                                
-                                asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_product(product['title'], price, product["url"]), self.loop)
-                                
-                                print(f"Novo produto!\nPreço encontrado para '{product['title']}' \nPreço: R${price}\n\n")
+                    self.notifier.submit(self.notify_discord_about_change_in_price(product_data['titulo'], price, product_data['url']))
 
-                            elif price <= self.expected_price:
+                    print(f"Preço mudou para '{product_data['titulo']}' \nPreço: R${price}\n\n")
+            
 
-                                asyncio.run_coroutine_threadsafe(self.notify_discord_about_new_product(product['title'], price, product["url"]), self.loop)
 
-                                print(f"Novo produto!\nPreço encontrado para '{product['title']}' \nPreço: R${price}\n\n")
+        except NoSuchElementException:
+            try:
+                # Tenta obter o preço de outra forma, caso o anterior não funcione
+                price_element = self.driver.find_element(By.XPATH, '//span[contains(@id, "price") and contains(@class, "a-size-medium")]')
+                price_text = price_element.get_attribute('innerHTML')
+                price_text = price_text.replace('R$', '').replace('&nbsp;', '').replace('.', '').strip()
+                if ',' in price_text:
+                    price_whole, price_fraction = price_text.split(',')
+                else:
+                    price_whole = price_text
+                    price_fraction = '00'  
 
-                        else:
-                            for product in self.product_info:
+                price = float(f"{price_whole}.{price_fraction}")
+                print(f"Preço encontrado para '{title}': ${price}")
 
-                                if product["titulo"] == product_data["titulo"]:
+                product_data = {
+                    "titulo": title,
+                    "preço": price,
+                    "url": product["url"]
+                }
 
-                                    if product["preço"] != product_data["preço"]:
+                print(product_data)
 
-                                        product["preço"] = product_data["preço"]
+                # Consulta o estado do produto pela chave (busca O(1)) para saber se ele é novo ou se o preço mudou
+                change = self.product_store.observe(product_data['url'], product_data['titulo'], price)
 
-                                        if self.expected_price == None:
-                                            
-                                            asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_price(product['title'], price, product["url"]), self.loop)
-                                            
-                                            print(f"Preço mudou para '{product['title']}' \nPreço: R${price}\n\n")
+                if change == NEW_PRODUCT:
 
-                                        elif price <= self.expected_price:
+                    if self.expected_price is None:
 
-                                            asyncio.run_coroutine_threadsafe(self.notify_discord_about_change_in_price(product['title'], price, product["url"]), self.loop)
+                        self.notifier.submit(self.notify_discord_about_monitoring_new_product(product_data['titulo'], price, product_data['url']))
 
-                                            print(f"Preço mudou para '{product['title']}' \nPreço: R${price}\n\n")
-                            
-                    except NoSuchElementException:
-                        print(f"Não foi possível encontrar o preço para {title}. Site pode estar fora do ar.\n")
-                        continue
+                        print(f"Novo produto!\nPreço encontrado para '{product_data['titulo']}' \nPreço: R${price}\n\n")
 
-                except Exception as e:
-                    print(f"Erro ao processar o preço para {title}: {e}. Site pode estar fora do ar.")
-                    continue
+                    elif price <= self.expected_price:
 
-                finally:
-                    self.priceList.append({"titulo": title, "preço": price})
+                        self.notifier.submit(self.notify_discord_about_new_product(product_data['titulo'], price, product_data['url']))
 
-        except Exception as e:
-            print(f"Ocorreu um erro geral ao tentar buscar os produtos e preços: {e}. Site pode estar fora do ar.")
+                        print(f"Novo produto!\nPreço encontrado para '{product_data['titulo']}' \nPreço: R${price}\n\n")
+
+                elif change == PRICE_CHANGED:
+
+                    if self.expected_price is None:
 
-        return self.priceList
+                        self.notifier.submit(self.notify_discord_about_monitoring_new_price(product_data['titulo'], price, product_data['url']))
+
+                        print(f"Preço mudou para '{product_data['titulo']}' \nPreço: R${price}\n\n")
+
+                    elif price <= self.expected_price:
+
+                        self.notifier.submit(self.notify_discord_about_change_in_price(product_data['titulo'], price, product_data['url']))
+
+                        print(f"Preço mudou para '{product_data['titulo']}' \nPreço: R${price}\n\n")
+                    
+            except NoSuchElementException:
+                print(f"Não foi possível encontrar o preço para {title}. Site pode estar fora do ar.\n")
+
+        except Exception as e:
+            print(f"Erro ao processar o preço para {title}: {e}. Site pode estar fora do ar.")
 
     # Método para navegar para a próxima página de resultados
     def next_page(self):
@@ -286,44 +285,42 @@ class AmazonPriceBot():
             while not self.stop_search:
                 self.restart_driver()
                 self.driver.get(self.url)
-                sleep(0.7)
+                self.waiter.page_ready(self.driver)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
                 search_url = self.driver.current_url
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url)
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         else:
             for _ in range(self.times):
                 if self.stop_search:
                     break
                 self.restart_driver()
                 self.driver.get(self.url)
-                sleep(0.7)
+                self.waiter.page_ready(self.driver)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
                 search_url = self.driver.current_url
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url)
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         
-        self.driver.quit()
+        self.release_driver()
 
     # Método para realizar a busca de preços de forma síncrona
     def check_link_prices(self, link):
@@ -331,46 +328,56 @@ class AmazonPriceBot():
             while not self.stop_search:
                 self.restart_driver()
                 self.driver.get(link)
-                sleep(0.7)
+                self.waiter.results_ready(self.driver)
                 search_url = self.driver.current_url
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url)
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         else:
             for _ in range(self.times):
                 if self.stop_search:
                     break
                 self.restart_driver()
                 self.driver.get(link)
-                sleep(0.7)
+                self.waiter.results_ready(self.driver)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
                 search_url = self.driver.current_url
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url)
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         
-        self.driver.quit()
+        self.release_driver()
+
+    # Devolve o navegador atual ao pool e pega outro (reaproveitado, se houver algum livre)
+    def restart_driver(self, recycle=False):
+        self.waiter.next_cycle()
+        driver_pool = get_driver_pool()
+        if recycle:
+            driver_pool.discard(self.driver)
+        else:
+            driver_pool.release(self.driver)
+        self.driver = driver_pool.checkout(self.options, store="amazon", should_stop=lambda: self.stop_search)
 
-    def restart_driver(self):
-        self.driver.quit()
-        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=self.options)
+    def release_driver(self):
+        self.results.flush()
+        self.waiter.end_cycle()
+        get_driver_pool().release(self.driver)
+        self.driver = None
 
     # Função para monitorar um link de um produto específico e se o preço dele mudou   
     def check_specific_product(self, link, expected_price):
@@ -385,13 +392,15 @@ class AmazonPriceBot():
 
         in_stock = True
 
+        # Aba do produto mantida aberta entre as verificações
+        watcher = start_watcher(self, "amazon", link)
+
         while not self.stop_search:
 
             try:
-                # Tente carregar a página
-                self.restart_driver()
-                self.driver.get(link)
-                sleep(1)        
+                # Abre a página do produto na primeira volta; nas seguintes espera o intervalo e atualiza a mesma aba
+                watcher.load()
+                self.waiter.product_ready(self.driver)
             except TimeoutException:
                 # Se ocorrer um timeout, recarregue a página e vá para a próxima iteração
                 print(f"Timeout ao carregar {link}, tentando recarregar.")
@@ -403,31 +412,44 @@ class AmazonPriceBot():
                 continue
 
             try:
-                # Tenta localizar o título do produto
-                title_element = self.driver.find_element(By.ID, "productTitle")
-                title = title_element.text.strip()
+                # Tenta primeiro os dados estruturados (JSON-LD/microdata) da página; os seletores ficam como alternativa
+                product = page_structured_product(self.driver, "amazon")
+
+                if product is not None and not product["available"]:
+                    raise NoSuchElementException("Produto indisponível")
+
+                if product is not None:
+                    title = product["title"]
+                    price = product["preço"]
+                else:
+                    # Tenta localizar o título do produto
+                    title_element = self.driver.find_element(By.ID, "productTitle")
+                    title = title_element.text.strip()
+
+                    # Tenta localizar a parte inteira do preço
+                    price_whole_element = self.driver.find_element(By.CSS_SELECTOR, "span.a-price-whole")
+                    price_whole_text = price_whole_element.text.replace('.', '').strip()
 
-                # Tenta localizar a parte inteira do preço
-                price_whole_element = self.driver.find_element(By.CSS_SELECTOR, "span.a-price-whole")
-                price_whole_text = price_whole_element.text.replace('.', '').strip()
+                    # Tenta localizar a fração do preço
+                    price_fraction_element = self.driver.find_element(By.CSS_SELECTOR, "span.a-price-fraction")
+                    price_fraction_text = price_fraction_element.text.strip()
 
-                # Tenta localizar a fração do preço
-                price_fraction_element = self.driver.find_element(By.CSS_SELECTOR, "span.a-price-fraction")
-                price_fraction_text = price_fraction_element.text.strip()
+                    price_text = f"{price_whole_text},{price_fraction_text}"
+                    price = float(price_text.replace(',', '.'))
 
-                price_text = f"{price_whole_text},{price_fraction_text}"
-                price = float(price_text.replace(',', '.'))
+                # Guarda o preço no histórico (a gravação acontece em segundo plano)
+                self.price_history.record("amazon", link, title, price)
 
                 if last_price is None:
                     last_price = price
 
                 if first_notification:
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_product(title, price, link), self.loop)
+                    self.notifier.submit(self.notify_discord_about_monitoring_new_product(title, price, link))
                     first_notification = False
 
                 # Condição para enviar notificação apenas quando o preço diminuir ou for menor que o esperado
                 if price < last_price or (price < expected_price and not notified_for_price_drop):
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_price(title, price, link), self.loop)
+                    self.notifier.submit(self.notify_discord_about_monitoring_new_price(title, price, link))
                     print(f"Preço encontrado para '{title}' \nPreço: R${price}\n\n")
                     last_price = price  # Atualiza o último preço verificado
                     notified_for_price_drop = True
@@ -435,15 +457,17 @@ class AmazonPriceBot():
             except NoSuchElementException:
                 print(f"Não foi possível encontrar o título ou preço para a URL: {link}")
                 if in_stock:
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_error(), self.loop)
+                    self.notifier.submit(self.notify_discord_about_error())
                     in_stock = False    
                 continue
 
-            except WebDriverException as e:
-                if "Out of Memory" in str(e):
-                    print("Detectado erro 'Out of Memory'. Reiniciando o driver...")
-                    self.restart_driver()
+            except WebDriverException:
+                # Troca o navegador se ele parou de responder ou passou dos limites de memória/CPU (botUtils/resourceMonitor.py)
+                if get_driver_pool().needs_recycle(self.driver):
+                    self.restart_driver(recycle=True)
 
+        stop_watcher(watcher)
+        self.release_driver()
 
     async def search_specific_product(self, link, expected_price):
         await asyncio.get_event_loop().run_in_executor(None, self.check_specific_product, link, expected_price)
@@ -454,8 +478,7 @@ class AmazonPriceBot():
     async def search_link_prices(self, link):
         await asyncio.get_event_loop().run_in_executor(None, self.check_link_prices, link)
 
-    # Método para salvar os dados em um arquivo CSV
+    # Método para gravar no arquivo de resultados as linhas que ainda estão em memória
     def data_to_csv(self):
-        df = pd.DataFrame(self.priceList)
-        df = df.dropna(how='all')
-        df.to_csv(f"{self.search_query}.csv", index=False)
\ No newline at end of file
+        self.results.flush()
+        return self.results.path
\ No newline at end of file
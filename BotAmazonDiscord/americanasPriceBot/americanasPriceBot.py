@@ -1,4 +1,3 @@
-import pandas as pd
 import threading
 import asyncio
 import os
@@ -6,16 +5,21 @@ import random
 
 from dotenv import load_dotenv
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 
-from time import sleep, time
+
+from botUtils.driverPool import get_driver_pool
+from botUtils.browserProfiles import apply_profile
+from botUtils.productStore import ProductStateStore, NEW_PRODUCT, PRICE_CHANGED
+from botUtils.resultSink import ResultSink
+from botUtils.priceHistory import get_price_history
+from botUtils.notifications import get_notification_queue
+from botUtils.waits import StoreWaiter
+from botUtils.listingExtractor import extract_listing
+from botUtils.structuredData import page_structured_product
+from botUtils.productWatcher import start_watcher, stop_watcher
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -28,58 +32,60 @@ class AmericanasPriceBot():
     def __init__(self, search_query, expected_price, pages, user, loop, times):
         self.url = "https://www.americanas.com.br"
         self.search_query = search_query
-        self.priceList = []  # Lista para armazenar os preços encontrados
+        self.results = ResultSink("americanas", search_query)  # Resultados gravados em disco durante a busca (só os mais recentes ficam em memória)
+        self.price_history = get_price_history()  # Histórico de preços em SQLite compartilhado por todos os bots
         self.expected_price = expected_price
         self.pages = pages  # Número de páginas a serem verificadas
         self.user = user  # Objeto para enviar notificações para o usuário
         self.loop = loop
+        self.notifier = get_notification_queue(loop)  # Fila que junta as notificações em resumos e controla o ritmo de envio
         self.times = times
         self.url_busca = None
         self.stop_search = False  # Controle de interrupção
-        self.product_info = []
-        self.product_names = []
+        self.product_store = ProductStateStore(sink=self.results, history=self.price_history, store="americanas")  # Produtos já vistos, indexados pela chave do produto
 
         # Configurações do navegador Chrome
         self.options = Options()
         user_agent = userAgent
         self.options.add_argument(f'user-agent={user_agent}')
-        #options.add_argument('--headless')
         self.options.add_argument('--disable-gpu')
-        self.options.add_argument('--window-size=1920x1080')
         self.options.add_argument('--disable-dev-shm-usage')
         self.options.add_argument('--no-sandbox')
         self.options.add_argument('--ignore-certificate-errors')
         self.options.add_experimental_option('excludeSwitches', ['enable-logging'])
         self.options.add_argument("--disable-blink-features=AutomationControlled")
         self.options.add_argument('--disable-extensions')
-        self.options.add_argument('--disable-images')
+
+        # Perfil do navegador da loja (headless, memória reduzida...), definido em botUtils/browserProfiles.py
+        apply_profile(self.options, "americanas")
         
 
-        service = Service(ChromeDriverManager().install())
-        service.log_path = 'NUL'
+        # O navegador é emprestado do pool compartilhado a cada ciclo (ver restart_driver)
+        self.driver = None
 
-        self.driver = webdriver.Chrome(service=service, options=self.options)
+        # Espera pelos cards da busca e pelo título da página do produto em vez de pausas fixas
+        self.waiter = StoreWaiter("americanas", results=(By.CSS_SELECTOR, "div.inStockCard__Wrapper-sc-1ngt5zo-0.iRvjrG a, div.src__Wrapper-sc-1wgxjb2-0.dUUAKQ a"), product=(By.CSS_SELECTOR, "h1.sc-fdfabab6-6.jNQQeD"))
 
     async def notify_discord_about_new_product(self, title, price, url):
         message = "-" * 70 + f"\n\n**Novo Produto!**\n**Produto:** {title}\n**Preço Abaixo do Esperado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_change_in_price(self, title, price, url):
         message = "-" * 70 + f"\n\n**Mudança no preço**\n**Produto:** {title}\n**Preço Abaixo do Esperado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
 
     async def notify_discord_about_monitoring_new_product(self, title, price, url):
         message = "-" * 70 + f"\n\n**Novo Produto!**\n**Produto:** {title}\n**Preço Monitorado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_monitoring_new_price(self, title, price, url):
         message = "-" * 70 + f"\n\n**Mudança no preço!**\n**Produto:** {title}\n**Preço Monitorado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_error(self):
         message = "-" * 70 + f"\n\nOcorreu um erro ao monitorar o produto. \n\nO produto pode estar sem estoque, a página pode estar indisponível ou a estrutura do site mudou!\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     # Método para realizar a pesquisa do produto na Americanas
     def search_product(self):
@@ -93,89 +99,52 @@ class AmericanasPriceBot():
     def check_prices(self):
 
         try:
-            # Encontrar cartões de produto
-            product_cards = self.driver.find_elements(By.CSS_SELECTOR, "div.inStockCard__Wrapper-sc-1ngt5zo-0.iRvjrG a")
-            if not product_cards:
-                product_cards = self.driver.find_elements(By.CSS_SELECTOR, "div.src__Wrapper-sc-1wgxjb2-0.dUUAKQ a")
-
-            print(f"Foram encontrados {len(product_cards)} produtos na página {self.driver.current_url}")
-
-            for card in product_cards:
-                product_link = {"url": card.get_attribute('href')}
-                # Encontrar título do produto
-                title_selectors = ["h3.product-name__Name-sc-1shovj0-0.gUjFDF", "span.product-name__Name-sc-n8j4w0-0.fcRttM"]
-                for selector in title_selectors:
-                    try:
-                        title_element = card.find_element(By.CSS_SELECTOR, selector)
-                        if title_element:
-                            product_link["title"] = title_element.text
-                            break
-                    except Exception:
-                        continue
-
-                # Encontrar preço do produto
-                price_selectors = ["span.price__PromotionalPrice-sc-h6xgft-1.ctBJlj", "span.price__PromotionalPrice-sc-1i4tohf-1.hjtXiU"]
-                for selector in price_selectors:
-                    try:
-                        price_element = card.find_element(By.CSS_SELECTOR, selector)
-                        if price_element:
-                            price_text = price_element.text.replace('R$', '').replace('.', '').replace(',', '.').strip()
-                            try:
-                                price = float(price_text)
-                                product_link["preço"] = price
-                                break
-                            except ValueError:
-                                print(f"Formato de preço inválido para '{product_link.get('title', 'Unknown')}'")
-                    except Exception:
-                        continue
+            # Lê todos os cartões de produto da página com uma única chamada ao navegador
+            products = extract_listing(self.driver, "americanas")
+
+            print(f"Foram encontrados {len(products)} produtos na página {self.driver.current_url}")
+
+            for product in products:
+                if product["price"] is None:
+                    print(f"Formato de preço inválido para '{product['title'] or 'Unknown'}'")
+                    continue
 
                 product_data = {
-                    "title": product_link.get("title", "Unknown"),
-                    "preço": product_link.get("preço", "Unknown"),
-                    "url": product_link.get("url", "Unknown")
+                    "title": product["title"] or "Unknown",
+                    "preço": product["price"],
+                    "url": product["url"]
                 }
 
-                if product_data["title"] not in self.product_names:
-
-                    self.product_names.append(product_data["title"])
+                # Consulta o estado do produto pela chave (busca O(1)) para saber se ele é novo ou se o preço mudou
+                change = self.product_store.observe(product_data['url'], product_data['title'], product_data['preço'])
 
-                    self.product_info.append(product_data)
+                if change == NEW_PRODUCT:
 
                     if self.expected_price is None:
 
-                        asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_product(product_data['title'], product_data["preço"], product_data["url"]), self.loop)
-                        
+                        self.notifier.submit(self.notify_discord_about_monitoring_new_product(product_data['title'], product_data['preço'], product_data['url']))
+
                         print(f"Novo produto!\nPreço encontrado para '{product_data['title']}' \nPreço: R${product_data['preço']}\n\n")
-                    
-                    elif product_data["preço"] <= self.expected_price:
 
-                        asyncio.run_coroutine_threadsafe(self.notify_discord_about_new_product(product_data['title'], product_data["preço"], product_data["url"]), self.loop)
-                        
+                    elif product_data['preço'] <= self.expected_price:
+
+                        self.notifier.submit(self.notify_discord_about_new_product(product_data['title'], product_data['preço'], product_data['url']))
+
                         print(f"Novo produto!\nPreço encontrado para '{product_data['title']}' \nPreço: R${product_data['preço']}\n\n")
 
-                else:
-                    for product in self.product_info:
+                elif change == PRICE_CHANGED:
+
+                    if self.expected_price is None:
 
-                        if product["title"] == product_data["title"]:
+                        self.notifier.submit(self.notify_discord_about_monitoring_new_price(product_data['title'], product_data['preço'], product_data['url']))
 
-                            if product["preço"] != product_data["preço"]:
-                                
-                                product["preço"] = product_data["preço"]
+                        print(f"Preço mudou para '{product_data['title']}' \nPreço: R${product_data['preço']}\n\n")
 
-                                if self.expected_price is None:
+                    elif product_data['preço'] <= self.expected_price:
 
-                                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_price(product_data['title'], product_data["preço"], product_data["url"]), self.loop)
-                                    
-                                    print(f"Mudança no preço!\nPreço encontrado para '{product_data['title']}' \nPreço: R${product_data['preço']}\n\n")
-                                    
-                                
-                                elif product_data["preço"] <= self.expected_price:
-                                    
-                                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_change_in_price(product_data['title'], product_data["preço"], product_data["url"]), self.loop)
-                                    
-                                    print(f"Mudança no preço!\nPreço encontrado para '{product_data['title']}' \nPreço: R${product_data['preço']}\n\n")
-                                    
-                            break
+                        self.notifier.submit(self.notify_discord_about_change_in_price(product_data['title'], product_data['preço'], product_data['url']))
+
+                        print(f"Preço mudou para '{product_data['title']}' \nPreço: R${product_data['preço']}\n\n")
 
                 # Enviar notificação para o Discord
                 if self.stop_search:
@@ -184,9 +153,8 @@ class AmericanasPriceBot():
         except Exception as e:
             print(f"Ocorreu um erro geral ao tentar buscar os produtos e preços: {e}")
 
-        self.priceList = self.product_info
         print("\n\n\n")
-        return self.priceList
+        return self.results.recent()
 
     # Método para navegar para a próxima página de resultados
     def next_page(self):
@@ -219,42 +187,40 @@ class AmericanasPriceBot():
             while not self.stop_search:
                 self.restart_driver()
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
                 search_url = self.driver.current_url
                 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url)
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         else:
             for _ in range(self.times):
                 if self.stop_search:
                     break
                 self.restart_driver()
                 self.driver.get(self.url)
-                sleep(0.7)
+                self.waiter.page_ready(self.driver)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
                 search_url = self.driver.current_url
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url)
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         
-        self.driver.quit()
+        self.release_driver()
 
     
     # Método para realizar a busca de preços de forma síncrona
@@ -266,19 +232,18 @@ class AmericanasPriceBot():
                 self.driver.get(link)
                 self.driver.fullscreen_window()
                 self.driver.execute_script("window.scrollTo(0, 700)")
-                sleep(0.7)
+                self.waiter.network_idle(self.driver)
                 search_url = self.driver.current_url
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url)
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         else:
             for _ in range(self.times):
                 if self.stop_search:
@@ -287,25 +252,36 @@ class AmericanasPriceBot():
                 self.driver.get(link)
                 self.driver.fullscreen_window()
                 self.driver.execute_script("window.scrollTo(0, 700)")
-                sleep(0.7)
+                self.waiter.network_idle(self.driver)
                 search_url = self.driver.current_url
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url)
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         
-        self.driver.quit()
+        self.release_driver()
+
+    # Devolve o navegador atual ao pool e pega outro (reaproveitado, se houver algum livre)
+    def restart_driver(self, recycle=False):
+        self.waiter.next_cycle()
+        driver_pool = get_driver_pool()
+        if recycle:
+            driver_pool.discard(self.driver)
+        else:
+            driver_pool.release(self.driver)
+        self.driver = driver_pool.checkout(self.options, store="americanas", should_stop=lambda: self.stop_search)
 
-    def restart_driver(self):
-        self.driver.quit()
-        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=self.options)
+    def release_driver(self):
+        self.results.flush()
+        self.waiter.end_cycle()
+        get_driver_pool().release(self.driver)
+        self.driver = None
 
     # Função para monitorar um link de um produto específico e se o preço dele mudou   
     def check_specific_product(self, link, expected_price):
@@ -320,12 +296,14 @@ class AmericanasPriceBot():
 
         in_stock = True
 
+        # Aba do produto mantida aberta entre as verificações
+        watcher = start_watcher(self, "americanas", link)
+
         while not self.stop_search:
             try:
-                # Tente carregar a página
-                self.restart_driver()
-                self.driver.get(link)
-                sleep(1)
+                # Abre a página do produto na primeira volta; nas seguintes espera o intervalo e atualiza a mesma aba
+                watcher.load()
+                self.waiter.product_ready(self.driver)
             except TimeoutException:
                 # Se ocorrer um timeout, recarregue a página e vá para a próxima iteração
                 print(f"Timeout ao carregar {link}, tentando recarregar.")
@@ -337,26 +315,39 @@ class AmericanasPriceBot():
                 continue
 
             try:
-                # Tenta localizar o título do produto
-                title_element = self.driver.find_element(By.CSS_SELECTOR, "h1.sc-fdfabab6-6.jNQQeD")
-                title = title_element.text
+                # Tenta primeiro os dados estruturados (JSON-LD/microdata) da página; os seletores ficam como alternativa
+                product = page_structured_product(self.driver, "americanas")
 
-                # Tenta localizar o preço do produto
-                price_element = self.driver.find_element(By.CSS_SELECTOR, "h4.sc-5492faee-2.ipHrwP.finalPrice")
-                price_text = price_element.text.replace('R$', '').replace('.', '').replace(',', '.').strip()
+                if product is not None and not product["available"]:
+                    raise NoSuchElementException("Produto indisponível")
 
-                price = float(price_text)
+                if product is not None:
+                    title = product["title"]
+                    price = product["preço"]
+                else:
+                    # Tenta localizar o título do produto
+                    title_element = self.driver.find_element(By.CSS_SELECTOR, "h1.sc-fdfabab6-6.jNQQeD")
+                    title = title_element.text
+
+                    # Tenta localizar o preço do produto
+                    price_element = self.driver.find_element(By.CSS_SELECTOR, "h4.sc-5492faee-2.ipHrwP.finalPrice")
+                    price_text = price_element.text.replace('R$', '').replace('.', '').replace(',', '.').strip()
+
+                    price = float(price_text)
+
+                # Guarda o preço no histórico (a gravação acontece em segundo plano)
+                self.price_history.record("americanas", link, title, price)
 
                 if last_price is None:
                     last_price = price
 
                 if first_notification:
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_product(title, price, link), self.loop)
+                    self.notifier.submit(self.notify_discord_about_monitoring_new_product(title, price, link))
                     first_notification = False
 
                 # Condição modificada para enviar notificação apenas quando o preço diminuir ou for menor que o esperado
                 if price < last_price or (price < expected_price and not notified_for_price_drop):
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_price(title, price, link), self.loop)
+                    self.notifier.submit(self.notify_discord_about_monitoring_new_price(title, price, link))
                     print(f"Preço encontrado para '{title}' \nPreço: R${price}\n\n")
                     last_price = price  # Atualiza o último preço verificado
                     notified_for_price_drop = True
@@ -364,16 +355,17 @@ class AmericanasPriceBot():
             except NoSuchElementException:
                 print(f"Não foi possível encontrar o título ou preço para a URL: {link}")
                 if in_stock:
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_error(), self.loop)
+                    self.notifier.submit(self.notify_discord_about_error())
                     in_stock = False
                 continue
                 
-            except WebDriverException as e:
-                if "Out of Memory" in str(e):
-                    print("Detectado erro 'Out of Memory'. Reiniciando o driver...")
-                    self.restart_driver()
-
+            except WebDriverException:
+                # Troca o navegador se ele parou de responder ou passou dos limites de memória/CPU (botUtils/resourceMonitor.py)
+                if get_driver_pool().needs_recycle(self.driver):
+                    self.restart_driver(recycle=True)
 
+        stop_watcher(watcher)
+        self.release_driver()
 
     async def search_specific_product(self, link, expected_price):
         await asyncio.get_event_loop().run_in_executor(None, self.check_specific_product, link, expected_price)
@@ -384,8 +376,7 @@ class AmericanasPriceBot():
     async def search_link_prices(self, link):
         await asyncio.get_event_loop().run_in_executor(None, self.check_link_prices, link)
 
-    # Método para salvar os dados em um arquivo CSV
+    # Método para gravar no arquivo de resultados as linhas que ainda estão em memória
     def data_to_csv(self):
-        df = pd.DataFrame(self.priceList)
-        df = df.dropna(how='all')
-        df.to_csv(f"{self.search_query}.csv", index=False)
\ No newline at end of file
+        self.results.flush()
+        return self.results.path
\ No newline at end of file
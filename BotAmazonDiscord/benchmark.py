@@ -0,0 +1,274 @@
+import argparse
+import threading
+import json
+import os
+
+# Intervalos curtos no monitoramento de produto: o benchmark mede o trabalho de cada verificação, não a espera
+os.environ.setdefault("WATCH_INTERVAL", "1")
+os.environ.setdefault("WATCH_JITTER", "0")
+
+from dotenv import load_dotenv
+from datetime import datetime
+from time import sleep, time
+
+from discordBots.storeRegistry import STORES, load_store
+from botUtils.driverPool import PooledChrome, get_driver_pool
+from botUtils.replayServer import ReplayServer, record_store, recorded_stores, FIXTURES_DIR
+from botUtils.processInfo import process_tree_usage
+from botUtils import nextData
+
+load_dotenv()
+
+# Benchmark offline dos bots: cada loja é servida a partir das páginas gravadas (botUtils/replayServer.py)
+# e os modos de busca, listagem e produto específico rodam do começo ao fim contra o servidor local.
+# O resultado (páginas/s, produtos/s, chamadas ao WebDriver e pico de memória por loja e modo) é gravado
+# em JSON; com --baseline, cada métrica é comparada com um resultado anterior.
+#
+#   python benchmark.py --record                 grava as páginas das lojas de benchmarks/stores.json
+#   python benchmark.py                          roda todas as lojas gravadas
+#   python benchmark.py --stores kabum,amazon --baseline benchmarks/results/anterior.json
+
+STORES_FILE = os.path.join("benchmarks", "stores.json")
+RESULTS_DIR = os.path.join("benchmarks", "results")
+
+# O navegador só resolve o servidor local: nenhuma requisição (CDN, analytics...) sai para a internet
+ISOLATION_ARGUMENT = "--host-resolver-rules=MAP * ~NOTFOUND, EXCLUDE 127.0.0.1"
+
+# Tempo máximo (em segundos) de cada modo antes de a busca ser interrompida
+MODE_TIMEOUT = 300
+
+# Métricas comparadas com o --baseline: True quando um valor maior é melhor
+COMPARED_METRICS = {"pages_per_sec": True, "products_per_sec": True, "round_trips_per_page": False, "peak_rss_mb": False}
+
+# Chamadas ao WebDriver (cada uma é uma requisição HTTP ao chromedriver)
+round_trips = {"count": 0}
+round_trips_lock = threading.Lock()
+original_execute = PooledChrome.execute
+
+
+def counting_execute(self, driver_command, params=None):
+    with round_trips_lock:
+        round_trips["count"] += 1
+    return original_execute(self, driver_command, params)
+
+
+PooledChrome.execute = counting_execute
+
+
+# Conta os produtos observados pelo bot (cada preço lido passa pelo histórico)
+class CountingHistory():
+    def __init__(self, history):
+        self.history = history
+        self.records = 0
+
+    def record(self, *args, **kwargs):
+        self.records += 1
+        return self.history.record(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.history, name)
+
+
+# Mede o pico de memória do processo e dos processos filhos (chromedriver e Chrome) enquanto um modo roda
+class PeakMemory():
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.peak = 0
+        self.running = False
+        self.thread = None
+
+    def sample(self):
+        self.peak = max(self.peak, process_tree_usage(os.getpid())[0])
+
+    def run(self):
+        while self.running:
+            self.sample()
+            sleep(self.interval)
+
+    def __enter__(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.running = False
+        self.thread.join()
+        self.sample()
+
+
+# Aponta a loja para o servidor local: endereço do bot, base dos links do Next.js e base da Carrefour
+def point_store_at(bot, store, server):
+    bot.url = server.base_url + "/"
+    bot.options.add_argument(ISOLATION_ARGUMENT)
+
+    if store in nextData.NEXT_STORES:
+        nextData.NEXT_STORES[store]["base_url"] = server.base_url + "/"
+
+    if store == "carrefour":
+        from carrefourPriceBot import carrefourHttp
+        carrefourHttp.BASE_URL = server.base_url
+
+
+# Roda function(*args) até terminar ou até o tempo limite, e interrompe a busca no fim
+def run_mode(bot, function, args, seconds):
+    error = []
+
+    def target():
+        try:
+            function(*args)
+        except Exception as e:
+            error.append(e)
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(seconds)
+
+    if thread.is_alive():
+        bot.stop_searching()
+        thread.join(MODE_TIMEOUT)
+
+    return error[0] if error else None
+
+
+def benchmark_mode(store, mode, bot_class, server, product_seconds):
+    manifest = server.manifest
+    paths = manifest["paths"]
+
+    if mode == "search":
+        if "search" not in paths or not manifest.get("query"):
+            return None
+        bot = bot_class(manifest["query"], manifest["expected_price"], manifest["pages_to_check"], None, None, 1)
+        function, args, seconds = bot.search_prices_sync, (), MODE_TIMEOUT
+    elif mode == "link":
+        if "listing" not in paths:
+            return None
+        bot = bot_class(None, manifest["expected_price"], manifest["pages_to_check"], None, None, 1)
+        function, args, seconds = bot.check_link_prices, (server.url("listing"),), MODE_TIMEOUT
+    else:
+        if "product" not in paths:
+            return None
+        bot = bot_class(None, None, None, None, None, 1)
+        function, args, seconds = bot.check_specific_product, (server.url("product"), manifest["expected_price"]), product_seconds
+
+    point_store_at(bot, store, server)
+    bot.price_history = CountingHistory(bot.price_history)
+    bot.product_store.history = bot.price_history
+
+    pages_before = server.pages_served
+    round_trips_before = round_trips["count"]
+    started_at = time()
+
+    with PeakMemory() as memory:
+        error = run_mode(bot, function, args, seconds)
+
+    elapsed = time() - started_at
+    pages = server.pages_served - pages_before
+    trips = round_trips["count"] - round_trips_before
+    products = bot.price_history.records
+
+    return {
+        "store": store,
+        "mode": mode,
+        "seconds": elapsed,
+        "pages": pages,
+        "pages_per_sec": pages / elapsed if elapsed else 0,
+        "products": products,
+        "products_per_sec": products / elapsed if elapsed else 0,
+        "round_trips": trips,
+        "round_trips_per_page": trips / pages if pages else 0,
+        "peak_rss_mb": memory.peak,
+        "error": str(error) if error else None,
+    }
+
+
+# Diferença percentual de cada métrica em relação ao resultado anterior. Retorna as regressões acima da tolerância
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path, encoding="utf-8") as file:
+        baseline = {(result["store"], result["mode"]): result for result in json.load(file)["results"]}
+
+    regressions = []
+    for result in results:
+        previous = baseline.get((result["store"], result["mode"]))
+        if previous is None:
+            continue
+
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before, after = previous.get(metric), result.get(metric)
+            if not before:
+                continue
+            change = (after - before) / before
+            worse = -change if higher_is_better else change
+            flag = " <- regressão" if worse > tolerance else ""
+            print(f"  {result['store']:<14} {result['mode']:<7} {metric:<22} {before:>10.2f} -> {after:>10.2f} ({change:+.0%}){flag}")
+            if flag:
+                regressions.append((result["store"], result["mode"], metric, change))
+
+    return regressions
+
+
+def record(stores):
+    with open(STORES_FILE, encoding="utf-8") as file:
+        config = json.load(file)
+
+    for store in stores or config:
+        record_store(store, config[store])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark offline dos bots das lojas")
+    parser.add_argument("--record", action="store_true", help=f"grava as páginas das lojas de {STORES_FILE}")
+    parser.add_argument("--stores", default="", help="lojas separadas por vírgula (padrão: todas as gravadas)")
+    parser.add_argument("--modes", default="search,link,product", help="modos separados por vírgula: search, link, product")
+    parser.add_argument("--product-seconds", type=float, default=20, help="duração do modo de produto específico")
+    parser.add_argument("--output", default=None, help="arquivo JSON com os resultados")
+    parser.add_argument("--baseline", default=None, help="resultado anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="piora máxima aceita em relação ao --baseline (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    stores = [store for store in args.stores.split(",") if store]
+
+    if args.record:
+        record(stores)
+        return
+
+    registered = {name for name, module, class_name in STORES}
+    stores = [store for store in stores or recorded_stores() if store in registered]
+    if not stores:
+        print(f"Nenhuma loja gravada em {FIXTURES_DIR}. Use python benchmark.py --record")
+        return
+
+    results = []
+    for store in stores:
+        bot_class = load_store(store)
+        server = ReplayServer(store).start()
+
+        try:
+            for mode in args.modes.split(","):
+                result = benchmark_mode(store, mode, bot_class, server, args.product_seconds)
+                if result is None:
+                    continue
+                results.append(result)
+                print(f"[{store}] {mode}: {result['pages_per_sec']:.2f} páginas/s, {result['products_per_sec']:.2f} produtos/s, "
+                      f"{result['round_trips']} chamadas ao WebDriver ({result['round_trips_per_page']:.1f} por página), "
+                      f"pico de {result['peak_rss_mb']:.0f} MB" + (f", erro: {result['error']}" if result["error"] else ""))
+        finally:
+            server.stop()
+
+    get_driver_pool().shutdown()
+
+    output = args.output or os.path.join(RESULTS_DIR, f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump({"created_at": datetime.now().isoformat(), "results": results}, file, indent=4, ensure_ascii=False)
+    print(f"Resultados gravados em {output}")
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} métricas pioraram mais de {args.tolerance:.0%} em relação a {args.baseline}")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import threading
+import os
+
+from botUtils.processInfo import process_tree_usage, driver_pid
+
+# Argumentos de cada perfil de navegador
+PROFILES = {
+    # Janela visível, como os bots sempre rodaram
+    "headed": [
+        "--window-size=1920,1080",
+    ],
+    # Sem janela, com o mesmo tamanho de tela (o layout das páginas não muda)
+    "headless": [
+        "--headless=new",
+        "--window-size=1920,1080",
+    ],
+    # Sem janela e com o mínimo de processos e serviços em segundo plano
+    "lowmem": [
+        "--headless=new",
+        "--window-size=1366,768",
+        "--renderer-process-limit=2",
+        "--disable-background-networking",
+        "--disable-component-update",
+        "--disable-default-apps",
+        "--disable-sync",
+        "--no-first-run",
+        "--mute-audio",
+        "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+        "--js-flags=--max-old-space-size=256",
+    ],
+}
+
+# Perfil usado pelas lojas que não têm um perfil próprio
+DEFAULT_PROFILE = os.getenv("BROWSER_PROFILE", "headless")
+
+# Lojas que precisam de um perfil específico
+STORE_PROFILES = {
+    # O slider do captcha é arrastado com o pyautogui, que precisa de uma janela visível
+    "aliexpress": "headed",
+}
+
+# A cada quantas medições de um perfil o consumo médio é mostrado
+REPORT_EVERY = 20
+
+
+# Perfil da loja: BROWSER_PROFILE_<LOJA> no ambiente, o perfil fixo da loja ou o perfil padrão
+def profile_for(store):
+    name = os.getenv(f"BROWSER_PROFILE_{store.upper()}") or STORE_PROFILES.get(store) or DEFAULT_PROFILE
+    if name not in PROFILES:
+        print(f"Perfil de navegador desconhecido '{name}' para {store}. Usando '{DEFAULT_PROFILE}'.")
+        name = DEFAULT_PROFILE
+    return name
+
+
+# Aplica o perfil da loja às opções do Chrome, substituindo o tamanho de janela e o modo headless já configurados
+def apply_profile(options, store):
+    name = profile_for(store)
+
+    for argument in list(options.arguments):
+        if argument.startswith(("--window-size", "--headless")):
+            options.arguments.remove(argument)
+
+    for argument in PROFILES[name]:
+        if argument not in options.arguments:
+            options.add_argument(argument)
+
+    options.profile_name = name
+    return name
+
+
+# {(perfil, loja): {"samples": n, "rss_mb": soma, "peak_rss_mb": maior, "cpu_seconds": soma, "pages": soma}}
+footprints = {}
+footprints_lock = threading.Lock()
+
+
+# Mede a memória e a CPU do navegador (chromedriver + Chrome + processos filhos) e acumula no perfil/loja dele.
+# Chamado quando o navegador volta para o pool, então cada medição cobre as páginas carregadas desde a anterior
+def record_footprint(driver):
+    profile = getattr(driver, "profile", None)
+    store = getattr(driver, "store", None)
+    if profile is None or store is None:
+        return
+
+    rss, cpu = process_tree_usage(driver_pid(driver))
+    if not rss:
+        return
+
+    cpu_delta = max(0, cpu - getattr(driver, "measured_cpu", 0))
+    pages_delta = max(0, driver.pages_loaded - getattr(driver, "measured_pages", 0))
+    driver.measured_cpu = cpu
+    driver.measured_pages = driver.pages_loaded
+
+    with footprints_lock:
+        footprint = footprints.setdefault((profile, store), {"samples": 0, "rss_mb": 0, "peak_rss_mb": 0, "cpu_seconds": 0, "pages": 0})
+        footprint["samples"] += 1
+        footprint["rss_mb"] += rss
+        footprint["peak_rss_mb"] = max(footprint["peak_rss_mb"], rss)
+        footprint["cpu_seconds"] += cpu_delta
+        footprint["pages"] += pages_delta
+        report = footprint["samples"] % REPORT_EVERY == 0
+        summary = dict(footprint)
+
+    if report:
+        print(f"[{store}] perfil {profile}: {summary['rss_mb'] / summary['samples']:.0f} MB em média (pico {summary['peak_rss_mb']:.0f} MB), "
+              f"{summary['cpu_seconds'] / max(summary['pages'], 1):.2f}s de CPU por página")
+
+
+# Consumo médio por perfil e loja, para escolher o perfil mais barato que ainda funciona em cada loja
+def footprint_stats():
+    with footprints_lock:
+        return {
+            f"{profile}:{store}": {
+                "samples": footprint["samples"],
+                "avg_rss_mb": footprint["rss_mb"] / footprint["samples"],
+                "peak_rss_mb": footprint["peak_rss_mb"],
+                "cpu_seconds_per_page": footprint["cpu_seconds"] / max(footprint["pages"], 1),
+                "pages": footprint["pages"],
+            }
+            for (profile, store), footprint in footprints.items()
+        }
@@ -0,0 +1,200 @@
+import threading
+import hashlib
+import random
+import re
+import os
+
+from time import sleep, time
+
+from botUtils.httpSession import fetch_page
+
+# Detecção de mudanças no monitoramento de um produto específico. Em vez de baixar e ler a página
+# inteira a cada volta do loop, cada produto guarda os validadores HTTP (ETag / Last-Modified) e uma
+# impressão digital da região do preço: uma resposta 304 ou um HTML com a mesma impressão digital é
+# reconhecido como "sem mudança" sem ler o produto nem notificar. Produtos que não mudam são
+# verificados com intervalos cada vez maiores.
+
+# Intervalo (em segundos) entre as verificações de um produto que acabou de mudar. É o mesmo intervalo
+# usado para atualizar a aba dos produtos monitorados no navegador (botUtils/productWatcher.py)
+WATCH_INTERVAL = float(os.getenv("WATCH_INTERVAL", "30"))
+
+# Variação aleatória do intervalo (0.2 = até 20% para mais ou para menos), para os produtos não serem verificados todos juntos
+WATCH_JITTER = float(os.getenv("WATCH_JITTER", "0.2"))
+
+# Intervalo máximo (em segundos) entre as verificações de um produto que nunca muda
+POLL_MAX_INTERVAL = float(os.getenv("POLL_MAX_INTERVAL", "300"))
+
+# Quantas verificações seguidas sem mudança até o intervalo dobrar
+POLL_BACKOFF_AFTER = int(os.getenv("POLL_BACKOFF_AFTER", "5"))
+
+# Quantas falhas seguidas (página sem título/preço, timeout, erro do navegador) até o intervalo dobrar
+POLL_FAILURE_BACKOFF_AFTER = int(os.getenv("POLL_FAILURE_BACKOFF_AFTER", "2"))
+
+# Trechos do HTML que definem o preço e o estoque: campos de preço/disponibilidade dos JSON embutidos
+# (Next.js, JSON-LD, estado da VTEX, inclusive quando estão escapados dentro de outra string JSON)
+# e os preços em reais do texto da página
+PRICE_REGION_PATTERN = re.compile(
+    r'\\?"(?:price|priceWithDiscount|bestPrice|lowPrice|highPrice|sellingPrice|spotPrice|Price|ListPrice|avista|final_price)\\?"\s*:\s*\\?"?[\d.,]+'
+    r'|\\?"(?:available|availability|stock_status|AvailableQuantity)\\?"\s*:\s*(?:\\?"[^"\\]*\\?"|true|false|\d+)'
+    r'|R\$(?:\s|&nbsp;)*[\d.]+,\d{2}'
+)
+
+
+# Impressão digital da região do preço: muda quando algum preço ou estoque da página muda
+def price_fingerprint(page_html):
+    digest = hashlib.sha1()
+    for match in PRICE_REGION_PATTERN.finditer(page_html):
+        digest.update(match.group(0).encode("utf-8", "ignore"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# Estado do monitoramento de um produto
+class ProductWatch():
+    def __init__(self, store, url):
+        self.store = store
+        self.url = url
+        self.etag = None
+        self.last_modified = None
+        self.fingerprint = None
+        self.product = None  # último produto lido da página
+        self.price = None  # último preço observado (HTTP ou navegador)
+        self.changed = True  # se a última verificação encontrou alguma mudança
+        self.checks = 0
+        self.changes = 0
+        self.not_modified = 0  # respostas 304
+        self.same_fingerprint = 0  # HTML baixado, mas com a região do preço igual
+        self.failures = 0  # verificações em que o produto não pôde ser lido
+        self.unchanged_streak = 0
+        self.failure_streak = 0
+        self.interval = WATCH_INTERVAL
+        self.waited = False  # a primeira verificação acontece sem esperar
+
+    # Baixa a página com uma requisição condicional e lê o produto com parse(html) só se a região do preço mudou.
+    # Retorna o produto (o anterior, quando nada mudou) ou None quando a página não pôde ser lida via HTTP
+    def poll(self, parse):
+        headers = {}
+        if self.product is not None:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+
+        response = fetch_page(self.url, headers=headers)
+        if response is None:
+            return None
+
+        if response.status_code == 304 and self.product is not None:
+            self.not_modified += 1
+            self.record(False)
+            return self.product
+
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+
+        fingerprint = price_fingerprint(response.text)
+        if fingerprint == self.fingerprint and self.product is not None:
+            self.same_fingerprint += 1
+            self.record(False)
+            return self.product
+
+        product = parse(response.text)
+        if product is None:
+            return None
+
+        self.fingerprint = fingerprint
+        self.product = product
+        self.changed = True
+        return product
+
+    # Registra o preço lido na verificação (via HTTP ou pelo navegador) e atualiza o intervalo
+    def observe(self, price):
+        self.record(price != self.price)
+        self.price = price
+
+    def record(self, changed):
+        self.checks += 1
+        self.changed = changed
+        self.failure_streak = 0
+
+        if changed:
+            self.changes += 1
+            self.unchanged_streak = 0
+            self.interval = WATCH_INTERVAL
+            return
+
+        self.unchanged_streak += 1
+        if self.unchanged_streak % POLL_BACKOFF_AFTER == 0:
+            self.interval = min(self.interval * 2, POLL_MAX_INTERVAL)
+
+    # Registra uma verificação em que o produto não pôde ser lido. Falhas seguidas aumentam o intervalo
+    def fail(self):
+        self.checks += 1
+        self.failures += 1
+        self.failure_streak += 1
+        self.changed = False
+
+        if self.failure_streak % POLL_FAILURE_BACKOFF_AFTER == 0:
+            self.interval = min(self.interval * 2, POLL_MAX_INTERVAL)
+
+    # Espera o intervalo atual do produto (com a variação aleatória), parando antes se should_stop() passar a
+    # retornar True. Chamado no começo de toda volta do loop: só a primeira verificação não espera
+    def wait(self, should_stop):
+        if not self.waited:
+            self.waited = True
+            return
+
+        deadline = time() + self.interval * random.uniform(1 - WATCH_JITTER, 1 + WATCH_JITTER)
+        while not should_stop() and time() < deadline:
+            sleep(min(0.5, max(0, deadline - time())))
+
+    # Fração das verificações em que o produto mudou
+    def change_rate(self):
+        return self.changes / self.checks if self.checks else 1.0
+
+    def describe(self):
+        return {
+            "checks": self.checks,
+            "changes": self.changes,
+            "change_rate": self.change_rate(),
+            "not_modified": self.not_modified,
+            "same_fingerprint": self.same_fingerprint,
+            "failures": self.failures,
+            "interval": self.interval,
+        }
+
+
+# Produtos monitorados no processo. Cada loop de monitoramento tem o seu ProductWatch (dois usuários
+# monitorando o mesmo produto não podem compartilhar os validadores, senão um deles só receberia 304)
+watches = set()
+watches_lock = threading.Lock()
+
+
+# Começa o monitoramento de um produto
+def start_watch(store, url):
+    watch = ProductWatch(store, url)
+    with watches_lock:
+        watches.add(watch)
+    return watch
+
+
+# Encerra o monitoramento do produto
+def stop_watch(watch):
+    with watches_lock:
+        watches.discard(watch)
+
+
+def watch_stats():
+    with watches_lock:
+        current = list(watches)
+
+    checks = sum(watch.checks for watch in current)
+    return {
+        "products": len(current),
+        "checks": checks,
+        "skipped": sum(watch.not_modified + watch.same_fingerprint for watch in current),
+        "not_modified": sum(watch.not_modified for watch in current),
+        "failures": sum(watch.failures for watch in current),
+        "avg_interval": sum(watch.interval for watch in current) / len(current) if current else 0,
+        "change_rate": sum(watch.changes for watch in current) / checks if checks else 0,
+    }
@@ -0,0 +1,354 @@
+import threading
+import atexit
+import os
+
+from collections import deque
+
+from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException
+
+from time import time
+
+from botUtils.driverResolver import build_service, invalidate_chromedriver, record_launch, get_startup_timings
+from botUtils.resourceBlocking import apply_blocking, record_page_load, resource_stats
+from botUtils.browserProfiles import record_footprint, footprint_stats
+from botUtils.metrics import get_metrics, timed, count_error, current_job_id
+from botUtils.resourceMonitor import ResourceMonitor
+from botUtils.processSupervisor import ProcessSupervisor
+
+# Quantidade máxima de navegadores Chrome abertos ao mesmo tempo no processo
+MAX_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "4"))
+
+# Tempo máximo (em segundos) que um bot espera por um navegador livre com o pool cheio antes de desistir
+CHECKOUT_TIMEOUT = float(os.getenv("DRIVER_CHECKOUT_TIMEOUT", "300"))
+
+# Quantidade de tempos de abertura e de checkout guardados para as estatísticas (os mais recentes)
+TIMINGS_HISTORY = 200
+
+# Quantidade de páginas carregadas por um navegador antes de ele ser reciclado
+MAX_PAGES_PER_DRIVER = int(os.getenv("DRIVER_MAX_PAGES", "300"))
+
+
+# O pool continuou cheio até o CHECKOUT_TIMEOUT, ou a busca foi interrompida enquanto esperava um navegador
+class DriverPoolExhausted(Exception):
+    pass
+
+
+# Chrome que conta as páginas carregadas, para o pool saber quando reciclar o navegador
+class PooledChrome(webdriver.Chrome):
+    def __init__(self, options_key, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.options_key = options_key
+        self.pages_loaded = 0
+        self.created_at = time()
+        self.store = None  # Loja do bot que está usando o navegador
+        self.blocking_store = None  # Loja cujas regras de bloqueio de recursos estão aplicadas
+        self.profile = None  # Perfil de navegador usado na criação (botUtils/browserProfiles.py)
+        self.job_id = None  # Busca que está com o navegador emprestado (None para a watchlist e os benchmarks)
+
+    def get(self, url):
+        self.pages_loaded += 1
+        try:
+            with timed("navigation", self.store):
+                super().get(url)
+        except Exception as e:
+            count_error(e, self.store)
+            raise
+        record_page_load(self)
+
+
+# Pool de navegadores compartilhado por todos os bots das lojas.
+# Os bots pegam um navegador emprestado (checkout) e devolvem ao final do ciclo (release),
+# assim o Chrome só é aberto de novo quando o pool está vazio ou o navegador precisa ser reciclado.
+class DriverPool():
+    def __init__(self, max_size=MAX_POOL_SIZE, max_pages=MAX_PAGES_PER_DRIVER):
+        self.max_size = max_size
+        self.max_pages = max_pages
+        self.idle = []  # Navegadores livres, prontos para serem reutilizados
+        self.in_use = set()  # Navegadores emprestados para algum bot
+        self.launching = 0  # Navegadores sendo abertos neste momento
+        self.condition = threading.Condition()
+        self.launch_times = deque(maxlen=TIMINGS_HISTORY)  # Tempo (em segundos) de abertura dos últimos navegadores
+        self.checkout_times = deque(maxlen=TIMINGS_HISTORY)  # Tempo (em segundos) de espera dos últimos checkouts
+        self.launches = 0
+        self.checkouts = 0
+        self.exhausted = 0  # Checkouts que desistiram com o pool cheio
+        self.monitor = ResourceMonitor(self)  # Memória e CPU dos navegadores (botUtils/resourceMonitor.py)
+        self.supervisor = ProcessSupervisor(self)  # Processos de cada navegador (botUtils/processSupervisor.py)
+
+    # Chave que identifica navegadores criados com as mesmas configurações
+    def options_key(self, options):
+        experimental = sorted((name, repr(value)) for name, value in options.experimental_options.items())
+        return (tuple(sorted(options.arguments)), tuple(experimental))
+
+    def size(self):
+        return len(self.idle) + len(self.in_use) + self.launching
+
+    # Pega um navegador do pool, abrindo um novo apenas quando não existe nenhum livre.
+    # Com a loja informada, o navegador recebe as regras de bloqueio de recursos dela.
+    # Com o pool cheio, espera até CHECKOUT_TIMEOUT segundos ou até should_stop() retornar True
+    # (ex.: !parar na busca) e lança DriverPoolExhausted
+    def checkout(self, options, store=None, should_stop=None, timeout=CHECKOUT_TIMEOUT):
+        started_at = time()
+        key = self.options_key(options)
+        waiting = False
+
+        while True:
+            driver = None
+            stale = None
+
+            with self.condition:
+                driver = self.pop_idle(key)
+
+                if driver is None:
+                    if self.size() >= self.max_size:
+                        if not self.idle:
+                            # Pool cheio: espera algum bot devolver um navegador
+                            if not waiting:
+                                waiting = True
+                                print(f"[{store or 'pool'}] Pool de navegadores cheio ({len(self.in_use)}/{self.max_size} em uso). Esperando um navegador livre...")
+                            self.wait_for_driver(store, started_at, should_stop, timeout)
+                            continue
+
+                        # Fecha um navegador livre com outra configuração para abrir espaço
+                        stale = self.idle.pop(0)
+
+                    self.launching += 1
+                else:
+                    self.in_use.add(driver)
+
+            if stale is not None:
+                self.quit_driver(stale)
+
+            if driver is not None:
+                if self.is_healthy(driver):
+                    self.record_checkout(started_at)
+                    return self.prepare(driver, store)
+
+                print("Navegador do pool não respondeu ao health check. Descartando...")
+                count_error("HealthCheckFailed", store)
+                self.discard(driver)
+                continue
+
+            try:
+                driver = self.launch(key, options, store)
+            except Exception as e:
+                count_error(e, store)
+                with self.condition:
+                    self.launching -= 1
+                    self.condition.notify()
+                raise
+
+            with self.condition:
+                self.launching -= 1
+                self.in_use.add(driver)
+
+            self.record_checkout(started_at)
+            return self.prepare(driver, store)
+
+    # Espera (com o lock do pool) um navegador ser devolvido, conferindo a cada segundo se a busca foi interrompida
+    def wait_for_driver(self, store, started_at, should_stop, timeout):
+        if should_stop is not None and should_stop():
+            self.exhausted += 1
+            raise DriverPoolExhausted("Busca interrompida enquanto esperava um navegador livre")
+
+        remaining = timeout - (time() - started_at)
+        if remaining <= 0:
+            self.exhausted += 1
+            print(f"[{store or 'pool'}] Nenhum navegador livre após {timeout:.0f}s ({len(self.in_use)}/{self.max_size} em uso)")
+            count_error("DriverPoolExhausted", store)
+            raise DriverPoolExhausted(f"Todos os {self.max_size} navegadores estão em uso há mais de {timeout:.0f}s. Tente novamente mais tarde.")
+
+        self.condition.wait(min(1, remaining))
+
+    def record_checkout(self, started_at):
+        with self.condition:
+            self.checkouts += 1
+            self.checkout_times.append(time() - started_at)
+
+    def prepare(self, driver, store):
+        driver.store = store
+        driver.job_id = current_job_id()
+        if store is not None:
+            apply_blocking(driver, store)
+        return driver
+
+    # Devolve o navegador ao pool (ou fecha, caso ele tenha passado dos limites de memória, CPU, páginas ou idade)
+    def release(self, driver):
+        if driver is None:
+            return
+
+        record_footprint(driver)
+
+        reason = self.monitor.check(driver, health=False)
+        recycle = reason is not None
+
+        if recycle:
+            self.monitor.record(driver, reason)
+        elif not self.reset(driver):
+            recycle = True
+
+        with self.condition:
+            if driver not in self.in_use:
+                return
+            self.in_use.discard(driver)
+            if not recycle:
+                self.idle.append(driver)
+            self.condition.notify()
+
+        if recycle:
+            self.quit_driver(driver)
+
+    # Fecha o navegador sem devolvê-lo ao pool (ex.: navegador travado ou sem memória)
+    def discard(self, driver):
+        if driver is None:
+            return
+
+        record_footprint(driver)
+
+        with self.condition:
+            self.in_use.discard(driver)
+            if driver in self.idle:
+                self.idle.remove(driver)
+            self.condition.notify()
+
+        self.quit_driver(driver)
+
+    # Fecha os navegadores que a busca não devolveu (ex.: a busca terminou com uma exceção antes do release_driver)
+    def reclaim(self, job_id):
+        with self.condition:
+            drivers = [driver for driver in self.in_use if driver.job_id == job_id]
+
+        for driver in drivers:
+            print(f"[{driver.store}] A busca #{job_id} terminou sem devolver o navegador. Fechando...")
+            self.discard(driver)
+
+        return len(drivers)
+
+    # Usado pelos bots depois de um erro do navegador: retorna True (e registra o motivo) quando o navegador
+    # parou de responder ou passou de algum limite e deve ser trocado com restart_driver(recycle=True)
+    def needs_recycle(self, driver):
+        reason = self.monitor.check(driver)
+        if reason is None:
+            return False
+        self.monitor.record(driver, reason)
+        return True
+
+    # Navegadores livres e emprestados neste momento (para as medições do monitor)
+    def snapshot(self):
+        with self.condition:
+            return list(self.idle), list(self.in_use)
+
+    # Tira um navegador livre do pool para fechá-lo. Retorna False se algum bot já pegou o navegador
+    def take_idle(self, driver):
+        with self.condition:
+            if driver not in self.idle:
+                return False
+            self.idle.remove(driver)
+            return True
+
+    def pop_idle(self, key):
+        for index, driver in enumerate(self.idle):
+            if driver.options_key == key:
+                return self.idle.pop(index)
+        return None
+
+    def launch(self, key, options, store=None):
+        started_at = time()
+
+        try:
+            driver = PooledChrome(key, service=build_service(), options=options)
+        except SessionNotCreatedException:
+            # O chromedriver em cache não é compatível com o Chrome instalado: resolve de novo uma vez
+            print("Chromedriver incompatível com o Chrome instalado. Resolvendo novamente...")
+            invalidate_chromedriver()
+            driver = PooledChrome(key, service=build_service(), options=options)
+
+        driver.profile = getattr(options, "profile_name", None)
+        driver.store = store
+        self.supervisor.track(driver)
+
+        seconds = time() - started_at
+        with self.condition:
+            self.launches += 1
+            self.launch_times.append(seconds)
+        record_launch(seconds)
+        get_metrics().observe("launch", seconds, store)
+        print(f"Novo navegador aberto em {seconds:.2f}s ({self.size()}/{self.max_size} no pool)")
+        return driver
+
+    # Verifica se o navegador ainda responde antes de entregá-lo para um bot
+    def is_healthy(self, driver):
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    # Limpa o estado deixado pelo bot anterior: fecha abas extras e volta para uma página em branco
+    def reset(self, driver):
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            # Usa o get original para não contar a página em branco como página carregada
+            webdriver.Chrome.get(driver, "about:blank")
+            return True
+        except Exception:
+            return False
+
+    # Fecha o navegador e encerra os processos dele que continuarem abertos depois do quit
+    def quit_driver(self, driver):
+        self.supervisor.refresh(driver)
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Erro ao fechar o navegador: {e}")
+        self.supervisor.reap(driver)
+
+    # Fecha todos os navegadores do pool (usado no encerramento do processo)
+    def shutdown(self):
+        with self.condition:
+            drivers = self.idle + list(self.in_use)
+            self.idle = []
+            self.in_use = set()
+
+        for driver in drivers:
+            self.quit_driver(driver)
+
+    def stats(self):
+        with self.condition:
+            return {
+                "idle": len(self.idle),
+                "in_use": len(self.in_use),
+                "launching": self.launching,
+                "max_size": self.max_size,
+                "launches": self.launches,
+                "checkouts": self.checkouts,
+                "exhausted": self.exhausted,
+                "startup": get_startup_timings(),
+                "resources": resource_stats(),
+                "profiles": footprint_stats(),
+                "monitor": self.monitor.stats(),
+                "supervisor": self.supervisor.stats(),
+            }
+
+
+driver_pool = None
+driver_pool_lock = threading.Lock()
+
+
+# Retorna o pool único do processo, criando-o na primeira chamada
+def get_driver_pool():
+    global driver_pool
+
+    with driver_pool_lock:
+        if driver_pool is None:
+            driver_pool = DriverPool()
+            driver_pool.monitor.start()
+            driver_pool.supervisor.start()
+            atexit.register(driver_pool.shutdown)
+
+    return driver_pool
@@ -0,0 +1,147 @@
+import threading
+import subprocess
+import json
+import os
+
+from selenium.webdriver.chrome.service import Service
+
+from time import time
+
+# Caminho fixo do chromedriver. Quando definido, o bot funciona offline: nada é baixado nem consultado na rede
+PINNED_DRIVER_PATH = os.getenv("CHROMEDRIVER_PATH")
+
+# Arquivo onde o caminho e a versão do chromedriver ficam salvos entre execuções
+CACHE_PATH = os.getenv("CHROMEDRIVER_CACHE", os.path.join(os.path.expanduser("~"), ".pricebot", "chromedriver.json"))
+
+resolved_driver = None  # Caminho e versão resolvidos neste processo
+resolve_lock = threading.Lock()
+timings_lock = threading.Lock()
+
+# Tempos de inicialização, para confirmar que a resolução do driver saiu do loop principal
+startup_timings = {
+    "resolve_source": None,  # pinned, cache ou download
+    "resolve_seconds": None,
+    "resolve_count": 0,
+    "launch_count": 0,
+    "launch_total_seconds": 0,
+    "launch_max_seconds": None,
+}
+
+
+# Retorna a versão do chromedriver (ex.: "124.0.6367.91") executando o binário
+def read_driver_version(path):
+    try:
+        result = subprocess.run([path, "--version"], capture_output=True, text=True, timeout=10)
+        parts = result.stdout.split()
+        return parts[1] if len(parts) > 1 else None
+    except Exception:
+        return None
+
+
+def load_cache():
+    try:
+        with open(CACHE_PATH, "r", encoding="utf-8") as cache_file:
+            cached = json.load(cache_file)
+        if cached.get("path") and os.path.exists(cached["path"]):
+            return cached
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def save_cache(path, version):
+    try:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        with open(CACHE_PATH, "w", encoding="utf-8") as cache_file:
+            json.dump({"path": path, "version": version, "resolved_at": time()}, cache_file)
+    except OSError as e:
+        print(f"Não foi possível salvar o cache do chromedriver: {e}")
+
+
+# Resolve o caminho do chromedriver uma única vez por processo.
+# Ordem: caminho fixo (CHROMEDRIVER_PATH) -> cache em disco -> download pelo webdriver_manager
+def resolve_chromedriver():
+    global resolved_driver
+
+    with resolve_lock:
+        if resolved_driver is not None:
+            return resolved_driver["path"]
+
+        started_at = time()
+
+        if PINNED_DRIVER_PATH:
+            if not os.path.exists(PINNED_DRIVER_PATH):
+                raise FileNotFoundError(f"CHROMEDRIVER_PATH aponta para um arquivo inexistente: {PINNED_DRIVER_PATH}")
+
+            cached = load_cache()
+            if cached and cached["path"] == PINNED_DRIVER_PATH:
+                version = cached.get("version")
+            else:
+                version = read_driver_version(PINNED_DRIVER_PATH)
+                save_cache(PINNED_DRIVER_PATH, version)
+
+            resolved_driver = {"path": PINNED_DRIVER_PATH, "version": version}
+            source = "pinned"
+        else:
+            cached = load_cache()
+            if cached:
+                resolved_driver = {"path": cached["path"], "version": cached.get("version")}
+                source = "cache"
+            else:
+                # Import tardio: o webdriver_manager só é necessário quando o cache está vazio
+                from webdriver_manager.chrome import ChromeDriverManager
+
+                path = ChromeDriverManager().install()
+                version = read_driver_version(path)
+                save_cache(path, version)
+                resolved_driver = {"path": path, "version": version}
+                source = "download"
+
+        startup_timings["resolve_source"] = source
+        startup_timings["resolve_seconds"] = time() - started_at
+        startup_timings["resolve_count"] += 1
+
+        print(f"Chromedriver {resolved_driver['version']} resolvido via {source} em {startup_timings['resolve_seconds']:.2f}s: {resolved_driver['path']}")
+
+        return resolved_driver["path"]
+
+
+# Descarta o caminho resolvido (ex.: o Chrome foi atualizado e o driver em cache ficou incompatível)
+def invalidate_chromedriver():
+    global resolved_driver
+
+    with resolve_lock:
+        resolved_driver = None
+        if not PINNED_DRIVER_PATH and os.path.exists(CACHE_PATH):
+            try:
+                os.remove(CACHE_PATH)
+            except OSError:
+                pass
+
+
+# Cria o Service do Selenium usando o chromedriver já resolvido
+def build_service():
+    service = Service(resolve_chromedriver())
+    service.log_path = os.devnull
+    return service
+
+
+# Acumula só contagem, soma e máximo (uma lista com o tempo de cada abertura cresceria para sempre)
+def record_launch(seconds):
+    with timings_lock:
+        startup_timings["launch_count"] += 1
+        startup_timings["launch_total_seconds"] += seconds
+        startup_timings["launch_max_seconds"] = max(startup_timings["launch_max_seconds"] or 0, seconds)
+
+
+def get_startup_timings():
+    launch_count = startup_timings["launch_count"]
+    return {
+        "resolve_source": startup_timings["resolve_source"],
+        "resolve_seconds": startup_timings["resolve_seconds"],
+        "resolve_count": startup_timings["resolve_count"],
+        "driver_version": resolved_driver["version"] if resolved_driver else None,
+        "launch_count": launch_count,
+        "launch_avg_seconds": startup_timings["launch_total_seconds"] / launch_count if launch_count else None,
+        "launch_max_seconds": startup_timings["launch_max_seconds"],
+    }
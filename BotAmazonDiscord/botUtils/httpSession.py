@@ -0,0 +1,72 @@
+import threading
+import os
+
+import requests
+
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from botUtils.metrics import timed, count_error
+
+# Carrega as variáveis de ambiente do arquivo .env
+load_dotenv()
+
+# Quantidade de conexões mantidas abertas por domínio (uma por bot rodando em paralelo é suficiente)
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+
+# Tempo máximo (em segundos) para conectar e para ler a resposta
+HTTP_TIMEOUT = (5, 15)
+
+http_session = None
+http_session_lock = threading.Lock()
+
+
+# Cria a sessão com pool de conexões (keep-alive) e novas tentativas para erros temporários do servidor
+def build_session():
+    session = requests.Session()
+
+    retries = Retry(total=2, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=["GET"])
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    session.headers.update({
+        "User-Agent": os.getenv("USER_AGENT") or requests.utils.default_user_agent(),
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "pt-BR,pt;q=0.9,en;q=0.8",
+    })
+
+    return session
+
+
+# Retorna a sessão HTTP única do processo, compartilhada por todos os bots
+def get_http_session():
+    global http_session
+
+    with http_session_lock:
+        if http_session is None:
+            http_session = build_session()
+
+    return http_session
+
+
+# Faz um GET usando a sessão compartilhada. Retorna None quando a página não pôde ser carregada
+def fetch_page(url, **kwargs):
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+
+    try:
+        with timed("http"):
+            response = get_http_session().get(url, **kwargs)
+    except requests.RequestException as e:
+        print(f"Erro ao acessar {url} via HTTP: {e}")
+        count_error(e)
+        return None
+
+    # 304 só acontece em requisições condicionais (If-None-Match / If-Modified-Since) e significa "não mudou"
+    if response.status_code not in (200, 304):
+        print(f"Erro ao acessar a página {url}: Status Code {response.status_code}")
+        count_error(f"HTTP{response.status_code}")
+        return None
+
+    return response
@@ -0,0 +1,147 @@
+import threading
+import json
+
+from time import time
+
+from selenium.common.exceptions import WebDriverException
+
+from botUtils.metrics import get_metrics, count_error
+
+# Seletores das páginas de listagem de cada loja. Cada campo tem uma lista de seletores CSS que são
+# testados em ordem (o primeiro que encontrar algo vence). ":scope" é o próprio card.
+#   card:  elementos de cada produto na página
+#   link:  elemento com o href do produto
+#   title: elemento com o título
+#   price: elemento com o preço
+#   stock: elemento que só aparece quando o produto está esgotado
+LISTINGS = {
+    "terabyte": {
+        "card": ["div.pbox"],
+        "link": ["a.commerce_columns_item_image", "a[href]"],
+        "title": ["h2"],
+        "price": ["div.prod-new-price span"],
+        "stock": [".tbt_esgotado"],
+    },
+    "casasbahia": {
+        "card": ["div.css-1enexmx div.styles__ProductCardWrapper-sc-43255755-3"],
+        "link": ["h3.product-card__title a"],
+        "title": ["h3.product-card__title a"],
+        "price": ["div.product-card__highlight-price"],
+        "stock": [],
+    },
+    "americanas": {
+        "card": ["div.inStockCard__Wrapper-sc-1ngt5zo-0.iRvjrG a", "div.src__Wrapper-sc-1wgxjb2-0.dUUAKQ a"],
+        "link": [":scope"],
+        "title": ["h3.product-name__Name-sc-1shovj0-0.gUjFDF", "span.product-name__Name-sc-n8j4w0-0.fcRttM"],
+        "price": ["span.price__PromotionalPrice-sc-h6xgft-1.ctBJlj", "span.price__PromotionalPrice-sc-1i4tohf-1.hjtXiU"],
+        "stock": [],
+    },
+    # Na Kabum a listagem só fornece os links; título e preço são lidos na página de cada produto
+    "kabum": {
+        "card": ["div.sc-cdc9b13f-7.gHEmMz.productCard a"],
+        "link": [":scope"],
+        "title": [],
+        "price": [],
+        "stock": [],
+    },
+}
+
+# Lê todos os cards da página de uma vez dentro do navegador e devolve uma lista de
+# [link, título, texto do preço, esgotado] para cada card
+LISTING_SCRIPT = """
+const spec = JSON.parse(arguments[0]);
+
+function pick(card, selectors) {
+    for (const selector of selectors) {
+        const element = selector === ':scope' ? card : card.querySelector(selector);
+        if (element) { return element; }
+    }
+    return null;
+}
+
+function text(element) {
+    return element ? (element.innerText || element.textContent || '').trim() : null;
+}
+
+let cards = [];
+for (const selector of spec.card) {
+    cards = document.querySelectorAll(selector);
+    if (cards.length) { break; }
+}
+
+const items = [];
+for (const card of cards) {
+    const link = pick(card, spec.link);
+    items.push([
+        link ? (link.href || link.getAttribute('href')) : null,
+        text(pick(card, spec.title)),
+        text(pick(card, spec.price)),
+        pick(card, spec.stock) !== null,
+    ]);
+}
+return items;
+"""
+
+# {loja: {"pages": n, "cards": total, "seconds": total}}
+extraction_stats = {}
+extraction_stats_lock = threading.Lock()
+
+
+# Converte "R$ 1.234,56" em 1234.56 (ou None se o texto não for um preço)
+def parse_price(price_text):
+    if not price_text:
+        return None
+    try:
+        return float(price_text.replace('R$', '').replace('.', '').replace(',', '.').strip())
+    except ValueError:
+        return None
+
+
+# Extrai os produtos da página de listagem aberta no navegador com uma única chamada ao execute_script.
+# Retorna uma lista de {"url", "title", "price", "out_of_stock"}, com price=None quando o card não tem um preço válido
+def extract_listing(driver, store):
+    spec = LISTINGS[store]
+    started_at = time()
+
+    try:
+        items = driver.execute_script(LISTING_SCRIPT, json.dumps(spec)) or []
+    except WebDriverException as e:
+        print(f"Erro ao extrair a listagem de {store}: {e}")
+        count_error(e, store)
+        return []
+
+    products = []
+    for link, title, price_text, out_of_stock in items:
+        if not link:
+            continue
+        products.append({
+            "url": link,
+            "title": title,
+            "price": parse_price(price_text),
+            "out_of_stock": out_of_stock,
+        })
+
+    elapsed = time() - started_at
+    get_metrics().observe("extract", elapsed, store)
+
+    with extraction_stats_lock:
+        stats = extraction_stats.setdefault(store, {"pages": 0, "cards": 0, "seconds": 0})
+        stats["pages"] += 1
+        stats["cards"] += len(products)
+        stats["seconds"] += elapsed
+
+    print(f"[{store}] {len(products)} produtos extraídos da listagem em {elapsed * 1000:.0f} ms")
+    return products
+
+
+# Tempo médio de extração por página de listagem de cada loja
+def listing_stats():
+    with extraction_stats_lock:
+        return {
+            store: {
+                "pages": stats["pages"],
+                "avg_cards": stats["cards"] / stats["pages"],
+                "avg_ms": stats["seconds"] / stats["pages"] * 1000,
+            }
+            for store, stats in extraction_stats.items() if stats["pages"]
+        }
@@ -0,0 +1,222 @@
+import threading
+import bisect
+import os
+
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from time import time
+
+# Métricas das etapas dos bots (abertura do navegador, navegação, esperas, extração, HTTP e notificações),
+# dos erros por tipo e dos produtos vistos/alterados, expostas no formato do Prometheus em um endpoint
+# local (http://127.0.0.1:METRICS_PORT/metrics) e resumidas por busca no !buscas.
+
+# Porta do endpoint de métricas (0 desliga o endpoint; as métricas continuam sendo coletadas)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9108"))
+
+# Endereço em que o endpoint escuta. Por padrão só a própria máquina acessa
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# Limites (em segundos) das faixas dos histogramas
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Nome de cada etapa no resumo das buscas
+STAGE_NAMES = {
+    "launch": "abertura do navegador",
+    "navigation": "navegação",
+    "wait": "espera",
+    "extract": "extração",
+    "http": "HTTP",
+    "notify": "notificação",
+    "discord_send": "envio ao Discord",
+}
+
+COUNTER_HELP = {
+    "errors": "Erros por loja e tipo",
+    "products_seen": "Produtos lidos pelos bots",
+    "products_changed": "Produtos novos ou com preço alterado",
+    "notifications": "Mensagens enviadas ao Discord por resultado",
+    "driver_recycles": "Navegadores reciclados por motivo",
+}
+
+# Busca e loja da thread atual, para as etapas medidas em funções que não conhecem a loja (ex.: HTTP)
+context = threading.local()
+
+
+# Define a busca e a loja da thread atual (as threads das buscas e das varreduras da watchlist)
+def set_job_context(job_id, store):
+    context.job_id = job_id
+    context.store = store
+
+
+def clear_job_context():
+    context.job_id = None
+    context.store = None
+
+
+def current_job_id():
+    return getattr(context, "job_id", None)
+
+
+class Histogram():
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        index = bisect.bisect_left(BUCKETS, value)
+        if index < len(BUCKETS):
+            self.buckets[index] += 1
+        self.count += 1
+        self.sum += value
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels):
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in labels) + "}"
+
+
+class Metrics():
+    def __init__(self):
+        self.histograms = {}  # {(etapa, loja): Histogram}
+        self.counters = {}  # {(nome, ((rótulo, valor), ...)): valor}
+        self.jobs = {}  # {id da busca: {etapa: [vezes, segundos]}}
+        self.lock = threading.Lock()
+
+    # Registra quanto tempo uma etapa levou. Sem a loja, usa a loja da busca da thread atual
+    def observe(self, stage, seconds, store=None):
+        store = store or getattr(context, "store", None) or "desconhecida"
+        job_id = getattr(context, "job_id", None)
+
+        with self.lock:
+            histogram = self.histograms.get((stage, store))
+            if histogram is None:
+                histogram = self.histograms[(stage, store)] = Histogram()
+            histogram.observe(seconds)
+
+            if job_id is not None:
+                totals = self.jobs.setdefault(job_id, {}).setdefault(stage, [0, 0])
+                totals[0] += 1
+                totals[1] += seconds
+
+    def increment(self, name, store=None, amount=1, **labels):
+        labels["store"] = store or getattr(context, "store", None) or "desconhecida"
+        key = (name, tuple(sorted(labels.items())))
+
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    # Tempo gasto em cada etapa por uma busca: {etapa: {"count", "seconds"}}
+    def job_summary(self, job_id):
+        with self.lock:
+            stages = dict(self.jobs.get(job_id, {}))
+        return {stage: {"count": count, "seconds": seconds} for stage, (count, seconds) in stages.items()}
+
+    def forget_job(self, job_id):
+        with self.lock:
+            self.jobs.pop(job_id, None)
+
+    # Todas as métricas no formato de texto do Prometheus
+    def render(self):
+        with self.lock:
+            histograms = {key: (list(histogram.buckets), histogram.count, histogram.sum) for key, histogram in self.histograms.items()}
+            counters = dict(self.counters)
+
+        lines = [
+            "# HELP pricemonitor_stage_seconds Tempo gasto em cada etapa dos bots",
+            "# TYPE pricemonitor_stage_seconds histogram",
+        ]
+
+        for (stage, store), (buckets, count, total) in sorted(histograms.items()):
+            labels = [("stage", stage), ("store", store)]
+            cumulative = 0
+            for limit, value in zip(BUCKETS, buckets):
+                cumulative += value
+                lines.append(f"pricemonitor_stage_seconds_bucket{format_labels(labels + [('le', limit)])} {cumulative}")
+            lines.append(f"pricemonitor_stage_seconds_bucket{format_labels(labels + [('le', '+Inf')])} {count}")
+            lines.append(f"pricemonitor_stage_seconds_sum{format_labels(labels)} {total}")
+            lines.append(f"pricemonitor_stage_seconds_count{format_labels(labels)} {count}")
+
+        for name in sorted({name for name, labels in counters}):
+            lines.append(f"# HELP pricemonitor_{name}_total {COUNTER_HELP.get(name, name)}")
+            lines.append(f"# TYPE pricemonitor_{name}_total counter")
+            for (counter, labels), value in sorted(counters.items()):
+                if counter == name:
+                    lines.append(f"pricemonitor_{name}_total{format_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = None
+metrics_lock = threading.Lock()
+
+
+# Retorna as métricas únicas do processo, criando-as na primeira chamada
+def get_metrics():
+    global metrics
+
+    with metrics_lock:
+        if metrics is None:
+            metrics = Metrics()
+
+    return metrics
+
+
+# Mede o tempo do bloco como uma etapa
+@contextmanager
+def timed(stage, store=None):
+    started_at = time()
+    try:
+        yield
+    finally:
+        get_metrics().observe(stage, time() - started_at, store)
+
+
+def count_error(error, store=None):
+    get_metrics().increment("errors", store, type=error if isinstance(error, str) else type(error).__name__)
+
+
+# Resumo de uma busca com as etapas que mais tomaram tempo: "navegação 12.3s (45x), espera 8.1s (45x)"
+def format_job_summary(job_id, limit=3):
+    stages = sorted(get_metrics().job_summary(job_id).items(), key=lambda item: item[1]["seconds"], reverse=True)
+    return ", ".join(f"{STAGE_NAMES.get(stage, stage)} {totals['seconds']:.1f}s ({totals['count']}x)" for stage, totals in stages[:limit])
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = get_metrics().render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Sobe o endpoint /metrics em uma thread separada. Retorna o servidor (ou None se estiver desligado)
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    if not port:
+        return None
+
+    try:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        print(f"Não foi possível abrir o endpoint de métricas em {host}:{port}: {e}")
+        return None
+
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"Métricas disponíveis em http://{host}:{server.server_address[1]}/metrics")
+    return server
@@ -0,0 +1,293 @@
+import json
+import re
+import os
+
+from time import sleep, time
+from urllib.parse import urljoin, urlparse, unquote, quote, parse_qsl, urlencode, urlunparse
+
+from selenium.common.exceptions import WebDriverException
+
+from botUtils.httpSession import fetch_page
+from botUtils.metrics import timed
+
+# Leitura dos produtos a partir do estado que os sites em Next.js embutem no HTML (<script id="__NEXT_DATA__">).
+# O JSON traz título, preço, disponibilidade e código de cada produto, e não depende das classes geradas
+# a cada deploy (sc-..., jss..., XPaths absolutos do #__next). Como o JSON vem no HTML do servidor,
+# na maioria das vezes um GET é suficiente; quando os dados não vêm, as funções retornam None e o bot
+# usa o navegador como antes.
+
+# Intervalo mínimo (em segundos) entre o início de dois ciclos de verificação das páginas de resultados via HTTP
+LISTING_HTTP_INTERVAL = float(os.getenv("LISTING_HTTP_INTERVAL", "60"))
+
+NEXT_DATA_PATTERN = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.S)
+
+NEXT_DATA_SCRIPT = """
+const element = document.getElementById('__NEXT_DATA__');
+return element ? element.textContent : null;
+"""
+
+# Onde cada loja guarda os campos do produto no JSON. Cada campo tem uma lista de caminhos testados em ordem
+# ("a.b" entra em objetos aninhados); "url" é uma lista de modelos montados com os campos do próprio produto.
+# "search" é o modelo da página de resultados da busca e "page" o parâmetro da URL com o número da página
+NEXT_STORES = {
+    "kabum": {
+        "base_url": "https://www.kabum.com.br/",
+        "id": ["code"],
+        "title": ["name"],
+        "price": ["priceWithDiscount", "offer.priceWithDiscount", "price"],
+        "available": ["available"],
+        "url": ["produto/{code}/{friendlyName}", "produto/{code}"],
+        "search": "busca/{query}",
+        "page": "page_number",
+    },
+    "magazineluiza": {
+        "base_url": "https://www.magazineluiza.com.br/",
+        "id": ["id", "sku"],
+        "title": ["title"],
+        "price": ["price.bestPrice", "price.price", "price"],
+        "available": ["available"],
+        "url": ["{url}", "{path}"],
+        "search": "busca/{query}/",
+        "page": "page",
+    },
+    "pichau": {
+        "base_url": "https://www.pichau.com.br/",
+        "id": ["sku", "id"],
+        "title": ["name"],
+        "price": ["pichau_prices.avista", "price_range.minimum_price.final_price.value", "pichau_prices.final_price"],
+        "available": ["stock_status"],
+        "url": ["{url_key}"],
+        "search": "search?q={query}",
+        "page": "page",
+    },
+}
+
+
+# Lê o JSON do __NEXT_DATA__ de um HTML. Retorna None se a página não tem o script
+def parse_next_data(page_html):
+    match = NEXT_DATA_PATTERN.search(page_html)
+    if match is None:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+
+# Lê o JSON do __NEXT_DATA__ da página aberta no navegador (uma única chamada, sem esperar elementos visíveis)
+def page_next_data(driver):
+    try:
+        text = driver.execute_script(NEXT_DATA_SCRIPT)
+    except WebDriverException:
+        return None
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+# Percorre todos os objetos do JSON. Algumas lojas (Kabum) guardam parte dos dados como uma string com outro JSON
+def walk(data):
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            yield value
+            stack.extend(reversed(list(value.values())))
+        elif isinstance(value, list):
+            stack.extend(reversed(value))
+        elif isinstance(value, str) and len(value) > 100 and value[:1] in "{[":
+            try:
+                stack.append(json.loads(value))
+            except ValueError:
+                pass
+
+
+def lookup(item, path):
+    for key in path.split("."):
+        if not isinstance(item, dict) or key not in item:
+            return None
+        item = item[key]
+    return item
+
+
+def first_value(item, paths, convert):
+    for path in paths:
+        value = convert(lookup(item, path))
+        if value is not None:
+            return value
+    return None
+
+
+# Converte 1299.9, "1299.90" ou "R$ 1.299,90" para 1299.9
+def to_price(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if value > 0 else None
+    if not isinstance(value, str):
+        return None
+    text = value.replace('R$', '').strip()
+    if ',' in text:
+        text = text.replace('.', '').replace(',', '.')
+    try:
+        price = float(text)
+    except ValueError:
+        return None
+    return price if price > 0 else None
+
+
+def to_text(value):
+    if isinstance(value, (str, int)) and not isinstance(value, bool) and str(value).strip():
+        return str(value).strip()
+    return None
+
+
+# Disponibilidade: true/false ou textos como "IN_STOCK"/"OUT_OF_STOCK". Sem o campo, o produto é considerado disponível
+def to_available(value):
+    if value is None:
+        return True
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float)):
+        return value > 0
+    return str(value).strip().upper() in ("IN_STOCK", "INSTOCK", "AVAILABLE", "TRUE", "1")
+
+
+def product_url(item, spec):
+    for template in spec["url"]:
+        try:
+            path = template.format(**item)
+        except (KeyError, IndexError, ValueError):
+            continue
+        if path:
+            return urljoin(spec["base_url"], path)
+    return None
+
+
+# Todos os produtos do JSON da página: [{"id", "title", "preço", "url", "available"}], sem repetições.
+# Com priced=False entram também os produtos sem preço (ex.: esgotados), com "preço" None e "available" False
+def extract_products(data, store, priced=True):
+    spec = NEXT_STORES[store]
+    products = {}
+
+    for item in walk(data):
+        product_id = first_value(item, spec["id"], to_text)
+        if product_id is None:
+            continue
+
+        # Um mesmo código pode aparecer antes em um objeto sem preço (ex.: breadcrumb); o que tem preço vence
+        previous = products.get(product_id)
+        if previous is not None and previous["preço"] is not None:
+            continue
+
+        title = first_value(item, spec["title"], to_text)
+        price = first_value(item, spec["price"], to_price)
+        if title is None or (price is None and (priced or previous is not None)):
+            continue
+
+        products[product_id] = {
+            "id": product_id,
+            "title": title,
+            "preço": price,
+            "url": product_url(item, spec),
+            "available": price is not None and to_available(first_value(item, spec["available"], lambda value: value)),
+        }
+
+    return list(products.values())
+
+
+# Partes do caminho de uma URL, sem barras nas pontas ("/produto/520369/mouse" -> ["produto", "520369", "mouse"])
+def path_segments(url):
+    return [segment for segment in unquote(urlparse(url).path).lower().split("/") if segment]
+
+
+# Produto principal de uma página de produto: o que tem o código igual a uma parte do caminho da URL (Kabum e
+# Magalu) ou o mesmo caminho da URL (Pichau, que usa o url_key). A página também traz recomendações, que nunca
+# são usadas no lugar dele: sem o produto principal, retorna None. Esgotado, ele vem com "available" False
+def find_product(data, store, url):
+    if data is None:
+        return None
+
+    segments = path_segments(url)
+
+    for product in extract_products(data, store, priced=False):
+        if product["id"].lower() in segments or (product["url"] and path_segments(product["url"]) == segments):
+            product["url"] = url
+            return product
+
+    return None
+
+
+# URL da página de resultados da busca na loja
+def next_search_url(store, query):
+    spec = NEXT_STORES[store]
+    return urljoin(spec["base_url"], spec["search"].format(query=quote(query)))
+
+
+# URL da página informada de uma busca/listagem (a primeira página fica sem o parâmetro)
+def listing_page_url(url, store, page):
+    name = NEXT_STORES[store]["page"]
+    parts = urlparse(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query) if key != name]
+    if page > 1:
+        query.append((name, str(page)))
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+
+def listing_products(data, store):
+    if data is None:
+        return None
+    products = [product for product in extract_products(data, store) if product["url"] and product["available"]]
+    return products or None
+
+
+# Lê os produtos de uma página de busca/listagem via HTTP, sem abrir o navegador.
+# Retorna None se a página não trouxe o JSON com os produtos
+def fetch_next_listing(url, store):
+    response = fetch_page(url)
+    if response is None:
+        return None
+
+    with timed("extract", store):
+        return listing_products(parse_next_data(response.text), store)
+
+
+# Lê os produtos da página de busca/listagem já aberta no navegador, sem baixá-la de novo.
+# Retorna None se a página não trouxe o JSON com os produtos
+def page_next_listing(driver, store):
+    with timed("extract", store):
+        return listing_products(page_next_data(driver), store)
+
+
+# Espera até LISTING_HTTP_INTERVAL depois do início do último ciclo via HTTP (started_at), parando antes
+# se should_stop() passar a ser verdadeiro
+def wait_listing_cycle(started_at, should_stop):
+    if started_at is None:
+        return
+
+    deadline = started_at + LISTING_HTTP_INTERVAL
+    while not should_stop() and time() < deadline:
+        sleep(min(0.5, max(0, deadline - time())))
+
+
+# Lê o produto do HTML de uma página de produto. Retorna None se a página não trouxe o JSON do produto
+def parse_next_product(page_html, store, url):
+    with timed("extract", store):
+        return find_product(parse_next_data(page_html), store, url)
+
+
+# Lê o produto de uma página de produto via HTTP. Retorna None se a página não trouxe o JSON do produto
+def fetch_next_product(url, store):
+    response = fetch_page(url)
+    if response is None:
+        return None
+    return parse_next_product(response.text, store, url)
+
+
+# Lê o produto da página de produto aberta no navegador
+def page_next_product(driver, store, url):
+    with timed("extract", store):
+        return find_product(page_next_data(driver), store, url)
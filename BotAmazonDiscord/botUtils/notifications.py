@@ -0,0 +1,208 @@
+import concurrent.futures
+import threading
+import asyncio
+import discord
+import os
+
+from time import monotonic
+
+from botUtils.metrics import get_metrics, timed, count_error
+
+# Quantidade máxima de mensagens esperando para serem enviadas. Com a fila cheia, a thread do bot
+# fica esperando (em vez de acumular tarefas no loop do Discord)
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "200"))
+
+# Janela (em segundos) em que as mensagens de um mesmo usuário são juntadas em um único resumo
+NOTIFY_WINDOW = float(os.getenv("NOTIFY_WINDOW", "3"))
+
+# Intervalo mínimo (em segundos) entre duas mensagens enviadas para o mesmo usuário
+NOTIFY_MIN_INTERVAL = float(os.getenv("NOTIFY_MIN_INTERVAL", "1"))
+
+# Tempo máximo que a thread do bot espera por uma vaga na fila antes de desistir da notificação
+SUBMIT_TIMEOUT = 120
+
+# Limite de caracteres de uma mensagem do Discord
+DISCORD_MESSAGE_LIMIT = 2000
+
+# Tentativas de envio quando o Discord responde 429 (limite de requisições)
+MAX_SEND_ATTEMPTS = 5
+
+
+# Junta as mensagens em resumos de até "limit" caracteres. Uma mensagem maior que o limite é dividida
+def build_digests(messages, limit=DISCORD_MESSAGE_LIMIT):
+    digests = []
+    current = ""
+
+    for message in messages:
+        while len(message) > limit:
+            if current:
+                digests.append(current)
+                current = ""
+            digests.append(message[:limit])
+            message = message[limit:]
+
+        if not message:
+            continue
+
+        if current and len(current) + 1 + len(message) > limit:
+            digests.append(current)
+            current = ""
+
+        current = f"{current}\n{message}" if current else message
+
+    if current:
+        digests.append(current)
+
+    return digests
+
+
+# Fila de notificações de um loop do Discord, compartilhada por todos os bots que usam esse loop.
+# As mensagens de cada usuário são juntadas durante NOTIFY_WINDOW segundos e enviadas como resumos
+# de até 2000 caracteres, respeitando um intervalo mínimo entre envios e o Retry-After das respostas 429.
+# A fila é limitada: quando enche, submit() bloqueia a thread do bot até haver espaço.
+class NotificationQueue():
+    def __init__(self, loop, max_size=NOTIFY_QUEUE_SIZE, window=NOTIFY_WINDOW, min_interval=NOTIFY_MIN_INTERVAL):
+        self.loop = loop
+        self.max_size = max_size
+        self.window = window
+        self.min_interval = min_interval
+        self.queue = None  # asyncio.Queue criada dentro do loop
+        self.worker = None
+        self.pending = {}  # {id do usuário: [usuário, mensagens, momento da primeira mensagem]}
+        self.last_sent = {}  # {id do usuário: momento do último envio}
+        self.sent = 0
+        self.digests = 0
+        self.rate_limited = 0
+        self.failed = 0
+
+    # Executa a corrotina de notificação no loop do Discord e espera ela ser aceita na fila.
+    # Chamado pelas threads dos bots no lugar de asyncio.run_coroutine_threadsafe sem acompanhamento
+    def submit(self, coroutine):
+        if self.loop is None:
+            coroutine.close()
+            return False
+
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+        try:
+            # Tempo que a thread do bot fica parada esperando a notificação entrar na fila
+            with timed("notify"):
+                future.result(timeout=SUBMIT_TIMEOUT)
+            return True
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            count_error("NotifyQueueFull")
+            print(f"Fila de notificações cheia há mais de {SUBMIT_TIMEOUT}s, notificação descartada")
+        except Exception as e:
+            print(f"Erro ao enfileirar a notificação: {e}")
+
+        return False
+
+    # Coloca a mensagem na fila (espera se a fila estiver cheia). Deve ser chamado dentro do loop
+    async def enqueue(self, user, message):
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.max_size)
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.ensure_future(self.run())
+        await self.queue.put((user, message))
+
+    async def run(self):
+        while True:
+            timeout = self.next_deadline()
+
+            try:
+                user, message = await asyncio.wait_for(self.queue.get(), timeout)
+                user_id = getattr(user, "id", id(user))
+                if user_id not in self.pending:
+                    self.pending[user_id] = [user, [], monotonic()]
+                self.pending[user_id][1].append(message)
+                self.queue.task_done()
+            except asyncio.TimeoutError:
+                pass
+
+            for user_id in self.due_users():
+                user, messages, _ = self.pending.pop(user_id)
+                for digest in build_digests(messages):
+                    await self.send(user_id, user, digest)
+                self.digests += 1
+
+    # Tempo até o próximo resumo precisar ser enviado (None quando não há nada pendente)
+    def next_deadline(self):
+        if not self.pending:
+            return None
+        first = min(started_at for _, _, started_at in self.pending.values())
+        return max(0, first + self.window - monotonic())
+
+    def due_users(self):
+        now = monotonic()
+        return [user_id for user_id, (_, _, started_at) in self.pending.items() if now - started_at >= self.window]
+
+    async def send(self, user_id, user, message):
+        for attempt in range(MAX_SEND_ATTEMPTS):
+            wait = self.last_sent.get(user_id, 0) + self.min_interval - monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            try:
+                started_at = monotonic()
+                await user.send(message)
+                self.last_sent[user_id] = monotonic()
+                self.sent += 1
+                get_metrics().observe("discord_send", self.last_sent[user_id] - started_at, "discord")
+                get_metrics().increment("notifications", "discord", result="sent")
+                return True
+            except discord.HTTPException as e:
+                self.last_sent[user_id] = monotonic()
+                if e.status != 429:
+                    print(f"Erro ao enviar notificação para {user}: {e}")
+                    self.failed += 1
+                    get_metrics().increment("notifications", "discord", result="failed")
+                    count_error(e, "discord")
+                    return False
+
+                self.rate_limited += 1
+                get_metrics().increment("notifications", "discord", result="rate_limited")
+                retry_after = getattr(e, "retry_after", None) or self.retry_after(e) or 2 ** attempt
+                print(f"Limite de envio do Discord atingido, tentando novamente em {retry_after:.1f}s")
+                await asyncio.sleep(retry_after)
+            except Exception as e:
+                print(f"Erro ao enviar notificação para {user}: {e}")
+                self.failed += 1
+                get_metrics().increment("notifications", "discord", result="failed")
+                count_error(e, "discord")
+                return False
+
+        self.failed += 1
+        get_metrics().increment("notifications", "discord", result="failed")
+        return False
+
+    def retry_after(self, error):
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            return float(headers.get("Retry-After"))
+        except (TypeError, ValueError):
+            return None
+
+    def stats(self):
+        return {
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "pending_users": len(self.pending),
+            "sent": self.sent,
+            "digests": self.digests,
+            "rate_limited": self.rate_limited,
+            "failed": self.failed,
+        }
+
+
+notification_queues = {}
+notification_queues_lock = threading.Lock()
+
+
+# Retorna a fila de notificações do loop informado, criando-a na primeira chamada
+def get_notification_queue(loop):
+    with notification_queues_lock:
+        key = id(loop)
+        if key not in notification_queues:
+            notification_queues[key] = NotificationQueue(loop)
+        return notification_queues[key]
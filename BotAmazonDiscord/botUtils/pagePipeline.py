@@ -0,0 +1,175 @@
+import os
+
+from collections import deque
+from urllib.parse import urlparse
+from selenium.common.exceptions import WebDriverException
+
+from botUtils.resourceBlocking import apply_blocking, record_page_load
+
+from time import sleep, time
+
+# Quantidade de páginas de produto carregadas ao mesmo tempo, em abas do mesmo navegador.
+# Com 1 as páginas são carregadas uma por vez, como os bots sempre fizeram
+PAGE_CONCURRENCY = int(os.getenv("PAGE_CONCURRENCY", "1"))
+
+# Tempo máximo (em segundos) esperando uma aba terminar de carregar antes de processá-la assim mesmo
+PAGE_LOAD_TIMEOUT = 30
+
+# Estado do carregamento e endereço do documento da aba (uma aba nova já começa com o about:blank "complete")
+TAB_STATE_SCRIPT = "return [document.readyState, document.URL];"
+
+
+# Carrega as páginas dos produtos e chama process(product) com o navegador posicionado em cada uma.
+# Com concurrency > 1 várias abas carregam ao mesmo tempo e cada página é processada assim que
+# termina de carregar, usando a mesma lógica de notificação/deduplicação do modo sequencial.
+# ready(driver) espera a página do produto ficar pronta; sem ele, espera-se 1s após o carregamento.
+def load_product_pages(driver, products, process, concurrency=PAGE_CONCURRENCY, ready=None, should_stop=None, before_load=None):
+    started_at = time()
+
+    if concurrency > 1 and len(products) > 1:
+        checked = load_in_tabs(driver, products, process, concurrency, ready, should_stop, before_load)
+    else:
+        checked = load_in_sequence(driver, products, process, ready, should_stop, before_load)
+
+    print(f"{checked} páginas de produto verificadas em {time() - started_at:.1f}s (concorrência {max(concurrency, 1)})")
+    return checked
+
+
+def wait_ready(driver, ready):
+    if ready:
+        ready(driver)
+    else:
+        sleep(1)
+
+
+def load_in_sequence(driver, products, process, ready, should_stop, before_load):
+    checked = 0
+
+    for product in products:
+        if should_stop and should_stop():
+            break
+        if before_load:
+            before_load()
+        driver.get(product["url"])
+        wait_ready(driver, ready)
+        process(product)
+        checked += 1
+
+    return checked
+
+
+def load_in_tabs(driver, products, process, concurrency, ready, should_stop, before_load):
+    main_window = driver.current_window_handle
+    # Sem uma condição de prontidão, a aba só é processada 1s depois de terminar de carregar
+    settle = 0 if ready else 1
+    pending = deque(products)
+    loading = []  # [handle, produto, início do carregamento, momento em que ficou pronto, URL pedida]
+    checked = 0
+
+    try:
+        while pending or loading:
+            if should_stop and should_stop():
+                break
+
+            # Abre novas abas até atingir o limite de concorrência
+            while pending and len(loading) < concurrency:
+                product = pending.popleft()
+                if before_load:
+                    before_load()
+                handle = open_tab(driver, main_window, product["url"])
+                if handle is not None:
+                    loading.append([handle, product, time(), None, product["url"]])
+
+            tab = next_ready_tab(driver, loading, settle)
+            if tab is None:
+                sleep(0.2)
+                continue
+
+            loading.remove(tab)
+            handle, product = tab[0], tab[1]
+
+            try:
+                driver.switch_to.window(handle)
+                if ready:
+                    ready(driver)
+                record_page_load(driver)
+                process(product)
+                checked += 1
+            finally:
+                close_tab(driver, handle, main_window)
+
+    finally:
+        # Fecha as abas que ficaram abertas (ex.: busca interrompida) e volta para a página de resultados
+        for tab in loading:
+            close_tab(driver, tab[0], main_window)
+
+    return checked
+
+
+# Abre a URL em uma nova aba sem esperar o carregamento terminar.
+# A aba começa em branco para receber as regras de bloqueio de recursos (que valem por aba) antes de navegar
+def open_tab(driver, main_window, url):
+    try:
+        driver.switch_to.window(main_window)
+        handles = set(driver.window_handles)
+        driver.execute_script("window.open('about:blank', '_blank');")
+        new_handles = [handle for handle in driver.window_handles if handle not in handles]
+
+        if new_handles:
+            driver.switch_to.window(new_handles[0])
+            if getattr(driver, "store", None) is not None:
+                apply_blocking(driver, driver.store, force=True)
+            driver.execute_script("window.location.href = arguments[0];", url)
+            driver.switch_to.window(main_window)
+    except WebDriverException as e:
+        print(f"Erro ao abrir uma nova aba para {url}: {e}")
+        return None
+
+    if not new_handles:
+        print(f"Não foi possível abrir uma nova aba para {url}")
+        return None
+
+    driver.pages_loaded += 1
+    return new_handles[0]
+
+
+# A aba já está no documento da URL pedida (o mesmo site, mesmo que a página tenha redirecionado para a URL
+# canônica do produto) e ele terminou de carregar. Enquanto a navegação não começou, o documento ainda é o about:blank
+def tab_loaded(driver, handle, url):
+    try:
+        driver.switch_to.window(handle)
+        state, current_url = driver.execute_script(TAB_STATE_SCRIPT)
+    except WebDriverException:
+        return False
+
+    return state == "complete" and urlparse(current_url).netloc == urlparse(url).netloc
+
+
+# Retorna a primeira aba que terminou de carregar a URL pedida há pelo menos "settle" segundos
+# (ou que estourou o tempo limite)
+def next_ready_tab(driver, loading, settle):
+    now = time()
+
+    for tab in loading:
+        handle, started_at, ready_at, url = tab[0], tab[2], tab[3], tab[4]
+
+        if ready_at is None:
+            ready = tab_loaded(driver, handle, url)
+
+            if ready or now - started_at > PAGE_LOAD_TIMEOUT:
+                tab[3] = ready_at = time()
+
+        if ready_at is not None and time() - ready_at >= settle:
+            return tab
+
+    return None
+
+
+def close_tab(driver, handle, main_window):
+    try:
+        if handle in driver.window_handles:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(main_window)
+    except WebDriverException as e:
+        print(f"Erro ao fechar a aba: {e}")
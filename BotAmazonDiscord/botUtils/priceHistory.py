@@ -0,0 +1,254 @@
+import threading
+import sqlite3
+import atexit
+import queue
+import os
+
+from time import time
+
+from botUtils.productStore import product_key
+
+# Arquivo do banco com o histórico de preços de todas as lojas
+PRICE_HISTORY_DB = os.getenv("PRICE_HISTORY_DB", "price_history.db")
+
+# Quantidade máxima de observações gravadas em uma única transação
+BATCH_SIZE = int(os.getenv("PRICE_HISTORY_BATCH", "500"))
+
+# Tempo máximo (em segundos) que uma observação espera na fila antes de ser gravada
+FLUSH_INTERVAL = 1
+
+# Limite da fila de gravação. Se o banco não acompanhar, as observações excedentes são descartadas
+# em vez de bloquear as threads dos bots
+MAX_PENDING = int(os.getenv("PRICE_HISTORY_MAX_PENDING", "100000"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    store TEXT,
+    url TEXT,
+    title TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY,
+    product_id INTEGER NOT NULL REFERENCES products(id),
+    price REAL NOT NULL,
+    observed_at REAL NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS observations_product_time ON observations (product_id, observed_at);
+CREATE INDEX IF NOT EXISTS observations_time ON observations (observed_at);
+CREATE INDEX IF NOT EXISTS products_store ON products (store);
+"""
+
+
+def connect(path):
+    connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+# Histórico de preços em SQLite (modo WAL) compartilhado por todos os bots do processo.
+# Os bots só colocam as observações em uma fila; uma thread em segundo plano grava em lote,
+# várias observações por transação, então a coleta nunca espera pelo disco.
+# As consultas abrem a própria conexão e, graças ao WAL, não bloqueiam nem são bloqueadas pelas gravações.
+class PriceHistory():
+    def __init__(self, path=PRICE_HISTORY_DB, batch_size=BATCH_SIZE, max_pending=MAX_PENDING):
+        self.path = path
+        self.batch_size = batch_size
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.product_ids = {}  # Cache {chave do produto: id} usado apenas pela thread de gravação
+        self.written = 0
+        self.dropped = 0
+        self.stopped = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = connect(path)
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+
+        self.read_local = threading.local()
+
+        self.writer = threading.Thread(target=self.write_loop, name="price-history-writer", daemon=True)
+        self.writer.start()
+
+    # Registra uma observação de preço. Não bloqueia: apenas coloca na fila de gravação
+    def record(self, store, url, title, price, observed_at=None):
+        try:
+            price = float(price)
+        except (TypeError, ValueError):
+            return False
+
+        observation = (product_key(url, title), store, url, title, price, observed_at or time())
+
+        try:
+            self.pending.put_nowait(observation)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                print(f"Fila do histórico de preços cheia: {self.dropped} observações descartadas até agora")
+            return False
+
+    def write_loop(self):
+        while True:
+            try:
+                first = self.pending.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                if self.stopped:
+                    return
+                continue
+
+            # Junta o que já estiver na fila para gravar tudo na mesma transação
+            batch = [first]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.pending.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self.write_batch(batch)
+            except sqlite3.Error as e:
+                print(f"Erro ao gravar {len(batch)} observações no histórico de preços: {e}")
+                self.product_ids.clear()
+            finally:
+                for _ in batch:
+                    self.pending.task_done()
+
+    def write_batch(self, batch):
+        # Última informação de cada produto do lote (título, URL e loja mais recentes)
+        latest = {}
+        for key, store, url, title, price, observed_at in batch:
+            if key in latest:
+                latest[key] = (store, url, title, min(latest[key][3], observed_at), max(latest[key][4], observed_at))
+            else:
+                latest[key] = (store, url, title, observed_at, observed_at)
+
+        with self.connection:
+            self.connection.executemany(
+                """
+                INSERT INTO products (key, store, url, title, first_seen, last_seen) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    store = excluded.store,
+                    url = excluded.url,
+                    title = COALESCE(excluded.title, products.title),
+                    last_seen = MAX(products.last_seen, excluded.last_seen)
+                """,
+                [(key, *values) for key, values in latest.items()]
+            )
+
+            unknown = [key for key in latest if key not in self.product_ids]
+            for start in range(0, len(unknown), 500):
+                chunk = unknown[start:start + 500]
+                rows = self.connection.execute(
+                    f"SELECT key, id FROM products WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+                )
+                self.product_ids.update(rows)
+
+            self.connection.executemany(
+                "INSERT INTO observations (product_id, price, observed_at) VALUES (?, ?, ?)",
+                [(self.product_ids[key], price, observed_at) for key, store, url, title, price, observed_at in batch]
+            )
+
+        self.written += len(batch)
+
+    # Espera as observações que já estão na fila serem gravadas
+    def flush(self):
+        self.pending.join()
+
+    def close(self):
+        self.flush()
+        self.stopped = True
+        self.writer.join(timeout=FLUSH_INTERVAL * 2)
+        self.connection.close()
+
+    # Conexão de leitura da thread atual
+    def reader(self):
+        connection = getattr(self.read_local, "connection", None)
+        if connection is None:
+            connection = self.read_local.connection = connect(self.path)
+            connection.row_factory = sqlite3.Row
+        return connection
+
+    # Últimos N preços de um produto (do mais recente para o mais antigo)
+    def last_prices(self, url, limit=10, title=None):
+        rows = self.reader().execute(
+            """
+            SELECT o.price, o.observed_at FROM observations o
+            JOIN products p ON p.id = o.product_id
+            WHERE p.key = ?
+            ORDER BY o.observed_at DESC
+            LIMIT ?
+            """,
+            (product_key(url, title), limit)
+        )
+        return [dict(row) for row in rows]
+
+    # Menor e maior preço já vistos de um produto, com a quantidade de observações
+    def price_range(self, url, title=None):
+        row = self.reader().execute(
+            """
+            SELECT MIN(o.price) AS min_price, MAX(o.price) AS max_price, COUNT(*) AS observations,
+                   MIN(o.observed_at) AS first_seen, MAX(o.observed_at) AS last_seen
+            FROM observations o
+            JOIN products p ON p.id = o.product_id
+            WHERE p.key = ?
+            """,
+            (product_key(url, title),)
+        ).fetchone()
+        if row is None or row["observations"] == 0:
+            return None
+        return dict(row)
+
+    # Mudanças de preço registradas desde o timestamp informado (opcionalmente de uma loja só)
+    def changes_since(self, timestamp, store=None, limit=1000):
+        rows = self.reader().execute(
+            """
+            SELECT p.key, p.store, p.title, p.url, c.previous_price, c.price, c.observed_at
+            FROM (
+                SELECT product_id, price, observed_at,
+                       LAG(price) OVER (PARTITION BY product_id ORDER BY observed_at) AS previous_price
+                FROM observations
+                WHERE product_id IN (SELECT DISTINCT product_id FROM observations WHERE observed_at >= ?)
+            ) c
+            JOIN products p ON p.id = c.product_id
+            WHERE c.observed_at >= ? AND c.previous_price IS NOT NULL AND c.previous_price != c.price
+              AND (? IS NULL OR p.store = ?)
+            ORDER BY c.observed_at DESC
+            LIMIT ?
+            """,
+            (timestamp, timestamp, store, store, limit)
+        )
+        return [dict(row) for row in rows]
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "pending": self.pending.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+
+price_history = None
+price_history_lock = threading.Lock()
+
+
+# Retorna o histórico único do processo, criando-o na primeira chamada
+def get_price_history():
+    global price_history
+
+    with price_history_lock:
+        if price_history is None:
+            price_history = PriceHistory()
+            atexit.register(price_history.close)
+
+    return price_history
@@ -0,0 +1,37 @@
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# PID do chromedriver de um navegador (o Chrome e os processos dele são filhos do chromedriver)
+def driver_pid(driver):
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+
+# Uso de memória (MB) e CPU (segundos) de um processo e de todos os processos filhos dele.
+# Sem o psutil instalado, retorna zeros
+def process_tree_usage(pid):
+    if psutil is None or pid is None:
+        return 0, 0
+
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return 0, 0
+
+    rss = 0
+    cpu = 0
+    for process in processes:
+        try:
+            rss += process.memory_info().rss
+            times = process.cpu_times()
+            cpu += times.user + times.system
+        except psutil.Error:
+            continue
+
+    return rss / (1024 * 1024), cpu
@@ -0,0 +1,309 @@
+import threading
+import json
+import os
+
+from time import time, sleep
+
+from botUtils.processInfo import psutil, driver_pid
+
+# Supervisor dos processos dos navegadores. Cada navegador aberto pelo pool tem a árvore de processos
+# (chromedriver, Chrome e os processos filhos dele) registrada em memória e em um arquivo por processo do
+# bot (SUPERVISOR_DIR/<pid>.json). Quando o navegador é fechado, a busca dona dele termina sem devolvê-lo
+# ou o chromedriver morre, os processos registrados que sobraram são encerrados, e só eles: nenhum outro
+# Chrome da máquina é tocado. Na inicialização, as árvores registradas por processos do bot que já
+# morreram (ex.: depois de um crash ou de um kill) são encerradas.
+
+# Pasta com os registros das árvores de processos de cada processo do bot
+SUPERVISOR_DIR = os.getenv("SUPERVISOR_DIR", ".chrome_processes")
+
+# Intervalo (em segundos) entre as varreduras de processos órfãos
+SUPERVISOR_INTERVAL = float(os.getenv("SUPERVISOR_INTERVAL", "60"))
+
+# Tempo (em segundos) que um processo tem para encerrar após o SIGTERM antes de receber o SIGKILL
+REAP_TIMEOUT = 5
+
+
+# Árvore de processos a partir do PID: [(pid, momento de criação)]. O momento de criação evita encerrar
+# outro processo que recebeu o mesmo PID depois
+def process_tree(pid):
+    if psutil is None or pid is None:
+        return []
+
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return []
+
+    tree = []
+    for process in processes:
+        try:
+            tree.append((process.pid, process.create_time()))
+        except psutil.Error:
+            continue
+    return tree
+
+
+# Encerra os processos da lista que ainda existem (SIGTERM e, depois de REAP_TIMEOUT, SIGKILL).
+# Os processos filhos do próprio bot que viraram zumbis são recolhidos no wait. Retorna quantos foram encerrados
+def kill_processes(processes, timeout=REAP_TIMEOUT):
+    if psutil is None:
+        return 0
+
+    alive = []
+    zombies = []
+    for pid, created_at in processes:
+        try:
+            process = psutil.Process(pid)
+            if abs(process.create_time() - created_at) > 1:
+                continue
+            if process.status() == psutil.STATUS_ZOMBIE:
+                zombies.append(process)
+                continue
+            process.terminate()
+            alive.append(process)
+        except psutil.Error:
+            continue
+
+    if zombies:
+        psutil.wait_procs(zombies, timeout=0)
+
+    if not alive:
+        return 0
+
+    _, survivors = psutil.wait_procs(alive, timeout=timeout)
+    for process in survivors:
+        try:
+            process.kill()
+        except psutil.Error:
+            continue
+    psutil.wait_procs(survivors, timeout=timeout)
+
+    return len(alive)
+
+
+# O processo do bot que gravou o registro ainda está rodando?
+def owner_alive(pid, created_at):
+    if psutil is None:
+        return True
+    try:
+        return abs(psutil.Process(pid).create_time() - created_at) <= 1
+    except psutil.Error:
+        return False
+
+
+# Encerra as árvores registradas por processos do bot que não estão mais rodando e apaga os registros.
+# Retorna quantos processos foram encerrados
+def reap_stale_records(directory=SUPERVISOR_DIR):
+    if psutil is None or not os.path.isdir(directory):
+        return 0
+
+    killed = 0
+    for file_name in os.listdir(directory):
+        path = os.path.join(directory, file_name)
+        try:
+            with open(path, encoding="utf-8") as file:
+                record = json.load(file)
+        except (OSError, ValueError):
+            continue
+
+        if record.get("pid") == os.getpid() or owner_alive(record.get("pid"), record.get("create_time", 0)):
+            continue
+
+        processes = [tuple(process) for tree in record.get("trees", {}).values() for process in tree["processes"]]
+        count = kill_processes(processes)
+        killed += count
+        if count:
+            print(f"{count} processos do Chrome deixados pelo processo {record.get('pid')} foram encerrados")
+
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    return killed
+
+
+class ProcessSupervisor():
+    def __init__(self, pool, directory=SUPERVISOR_DIR, interval=SUPERVISOR_INTERVAL):
+        self.pool = pool
+        self.directory = directory
+        self.interval = interval
+        self.trees = {}  # {pid do chromedriver: {"store", "job_id", "started_at", "processes": {pid: momento de criação}}}
+        self.job_active = None  # Função (id da busca) -> bool, definida pelo registro de buscas
+        self.lock = threading.Lock()
+        self.thread = None
+        self.reaped = 0  # Processos encerrados pelo supervisor
+        self.reclaimed = 0  # Navegadores de buscas que terminaram sem devolvê-los
+        self.zombies = 0
+
+    def state_file(self):
+        return os.path.join(self.directory, f"{os.getpid()}.json")
+
+    def start(self):
+        if psutil is None:
+            print("psutil não está instalado: os processos dos navegadores não serão supervisionados")
+            return self
+
+        self.reaped += reap_stale_records(self.directory)
+
+        if self.thread is None and self.interval > 0:
+            self.thread = threading.Thread(target=self.run, name="process-supervisor", daemon=True)
+            self.thread.start()
+        return self
+
+    def run(self):
+        while True:
+            sleep(self.interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Erro na varredura dos processos dos navegadores: {e}")
+
+    # Registra a árvore de processos de um navegador aberto pelo pool
+    def track(self, driver):
+        pid = driver_pid(driver)
+        if psutil is None or pid is None:
+            return
+
+        with self.lock:
+            self.trees[pid] = {
+                "store": getattr(driver, "store", None),
+                "job_id": getattr(driver, "job_id", None),
+                "started_at": time(),
+                "processes": dict(process_tree(pid)),
+            }
+        self.save()
+
+    # Junta à árvore registrada os processos que o Chrome abriu depois (abas, GPU, renderizadores).
+    # Retorna True quando apareceu algum processo novo
+    def refresh(self, driver):
+        pid = driver_pid(driver)
+        tree = process_tree(pid)
+
+        with self.lock:
+            record = self.trees.get(pid)
+            if record is None:
+                return False
+            changed = any(record["processes"].get(child) != created_at for child, created_at in tree)
+            record["processes"].update(tree)
+            record["store"] = getattr(driver, "store", None) or record["store"]
+            record["job_id"] = getattr(driver, "job_id", None)
+        return changed
+
+    # Encerra o que sobrou da árvore do navegador depois do quit (ou de um quit que falhou) e apaga o registro
+    def reap(self, driver):
+        pid = driver_pid(driver)
+
+        with self.lock:
+            record = self.trees.pop(pid, None)
+        if record is None:
+            return
+
+        count = kill_processes(record["processes"].items())
+        if count:
+            print(f"[{record['store'] or 'pool'}] {count} processos do navegador continuavam abertos depois do quit e foram encerrados")
+            with self.lock:
+                self.reaped += count
+        self.save()
+
+    # Varredura periódica: fecha os navegadores de buscas que já terminaram, encerra as árvores
+    # cujo chromedriver morreu ou cujo navegador saiu do pool sem ser fechado, e recolhe os filhos zumbis
+    def sweep(self):
+        idle, in_use = self.pool.snapshot()
+
+        for driver in in_use:
+            job_id = getattr(driver, "job_id", None)
+            if job_id is not None and self.job_active is not None and not self.job_active(job_id):
+                print(f"[{driver.store}] A busca #{job_id} terminou sem devolver o navegador. Fechando...")
+                with self.lock:
+                    self.reclaimed += 1
+                self.pool.discard(driver)
+
+        pooled = {driver_pid(driver) for driver in idle + in_use}
+        changed = False
+        for driver in idle + in_use:
+            changed = self.refresh(driver) or changed
+
+        with self.lock:
+            orphans = [
+                pid for pid, record in self.trees.items()
+                if (pid not in pooled and time() - record["started_at"] > self.interval)
+                or not self.running(pid, record)
+            ]
+            records = [(pid, self.trees.pop(pid)) for pid in orphans]
+
+        for pid, record in records:
+            count = kill_processes(record["processes"].items())
+            print(f"[{record['store'] or 'pool'}] Navegador órfão (chromedriver {pid}): {count} processos encerrados")
+            with self.lock:
+                self.reaped += count
+
+        self.reap_zombies()
+        # O registro em disco precisa dos processos abertos depois da abertura do navegador, senão eles
+        # escapam da limpeza feita na próxima inicialização caso o processo do bot morra
+        if records or changed:
+            self.save()
+
+    def running(self, pid, record):
+        created_at = record["processes"].get(pid)
+        if created_at is None:
+            return False
+        try:
+            process = psutil.Process(pid)
+            return abs(process.create_time() - created_at) <= 1 and process.status() != psutil.STATUS_ZOMBIE
+        except psutil.Error:
+            return False
+
+    # Recolhe os processos filhos do bot que terminaram e viraram zumbis (ex.: chromedriver que travou)
+    def reap_zombies(self):
+        try:
+            children = psutil.Process().children()
+        except psutil.Error:
+            return
+
+        zombies = []
+        for child in children:
+            try:
+                if child.status() == psutil.STATUS_ZOMBIE:
+                    zombies.append(child)
+            except psutil.Error:
+                continue
+
+        if zombies:
+            psutil.wait_procs(zombies, timeout=REAP_TIMEOUT)
+            with self.lock:
+                self.zombies += len(zombies)
+
+    # Grava as árvores registradas, para serem encerradas na próxima inicialização se o processo morrer
+    def save(self):
+        if psutil is None:
+            return
+
+        with self.lock:
+            trees = {str(pid): {**record, "processes": list(record["processes"].items())} for pid, record in self.trees.items()}
+
+        path = self.state_file()
+        try:
+            if not trees:
+                if os.path.exists(path):
+                    os.remove(path)
+                return
+
+            os.makedirs(self.directory, exist_ok=True)
+            record = {"pid": os.getpid(), "create_time": psutil.Process().create_time(), "trees": trees}
+            with open(path + ".tmp", "w", encoding="utf-8") as file:
+                json.dump(record, file)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            print(f"Erro ao gravar o registro dos processos dos navegadores: {e}")
+
+    def stats(self):
+        with self.lock:
+            return {
+                "tracked": len(self.trees),
+                "processes": sum(len(record["processes"]) for record in self.trees.values()),
+                "reaped": self.reaped,
+                "reclaimed": self.reclaimed,
+                "zombies": self.zombies,
+            }
@@ -0,0 +1,137 @@
+import json
+import re
+
+from selenium.common.exceptions import WebDriverException
+
+from botUtils.metrics import timed
+
+# Seletores das páginas de produto de cada loja (os mesmos do check_specific_product de cada bot).
+# Cada campo tem uma lista de seletores CSS testados em ordem (o primeiro que encontrar algo vence).
+#   title:       elemento com o título
+#   price:       elemento com o preço (ou com a parte inteira do preço, quando há "cents")
+#   cents:       elemento com os centavos, nas lojas que separam o preço em duas partes
+#   price_index: qual dos elementos de preço usar quando a página tem mais de um (ex.: "de" e "por")
+# A AliExpress fica de fora: a página do produto pode pedir o captcha deslizante, que só o bot da loja resolve
+PRODUCT_PAGES = {
+    "amazon": {
+        "title": ["#productTitle"],
+        "price": ["span.a-price-whole"],
+        "cents": ["span.a-price-fraction"],
+    },
+    "americanas": {
+        "title": ["h1.sc-fdfabab6-6.jNQQeD"],
+        "price": ["h4.sc-5492faee-2.ipHrwP.finalPrice"],
+    },
+    "carrefour": {
+        "title": [".vtex-store-components-3-x-productBrand"],
+        "price": [".carrefourbr-carrefour-components-0-x-sellingPriceValue"],
+        "price_index": 1,
+    },
+    "casasbahia": {
+        "title": ["h1.dsvia-heading.css-1xmpwke"],
+        "price": ["p.dsvia-text.css-1luipqs"],
+    },
+    "dafiti": {
+        "title": ["h1.sc-fdfabab6-6.jNQQeD"],
+        "price": ["h4.sc-5492faee-2.ipHrwP.finalPrice"],
+    },
+    "extra": {
+        "title": ["h1.css-16q9h28"],
+        "price": ["p.css-aesmfb span.css-1vmkvrm"],
+    },
+    "fast": {
+        "title": ["#auto_title_skeleton_box_empty > span"],
+        "price": ["span.price-fraction"],
+        "cents": ["span.price-cents"],
+    },
+    "kabum": {
+        "title": ["h1.sc-fdfabab6-6.jNQQeD"],
+        "price": ["h4.sc-5492faee-2.ipHrwP.finalPrice"],
+    },
+    "magazineluiza": {
+        "title": ["h1[data-testid='heading-product-title']"],
+        "price": ["#__next > div > main > section:nth-of-type(5) > div:nth-of-type(5) > div > div > div > div"],
+    },
+    "mercadolivre": {
+        "title": ["h1.ui-pdp-title"],
+        "price": ["span.andes-money-amount__fraction"],
+    },
+    "pichau": {
+        "title": ["h1.MuiTypography-root.jss39.MuiTypography-h6"],
+        "price": ["div.jss88"],
+    },
+    "pontofrio": {
+        "title": ["h1.dsvia-heading"],
+        "price": ["#product-price > span:nth-of-type(1)"],
+    },
+    "shopee": {
+        "title": ["h1.sc-fdfabab6-6.jNQQeD"],
+        "price": ["h4.sc-5492faee-2.ipHrwP.finalPrice"],
+    },
+    "terabyte": {
+        "title": ["h1.tit-prod"],
+        "price": ["p.val-prod.valVista"],
+    },
+}
+
+# Lê título, preço e centavos da página aberta com uma única chamada ao navegador
+PRODUCT_PAGE_SCRIPT = """
+const spec = JSON.parse(arguments[0]);
+
+function all(selectors) {
+    for (const selector of selectors || []) {
+        const found = document.querySelectorAll(selector);
+        if (found.length) { return Array.from(found); }
+    }
+    return [];
+}
+
+function text(element) {
+    return element ? (element.innerText || element.textContent || '').trim() : null;
+}
+
+const prices = all(spec.price);
+const index = spec.price_index || 0;
+
+return [
+    text(all(spec.title)[0]),
+    text(prices.length > index ? prices[index] : prices[0]),
+    text(all(spec.cents)[0]),
+];
+"""
+
+# Primeiro número no formato brasileiro do texto ("por R$ 1.299,90 no Pix" -> "1.299,90")
+PRICE_PATTERN = re.compile(r'\d[\d.]*(?:,\d+)?')
+
+
+# Converte o texto do preço para float, com o ponto como separador de milhar (como os bots fazem)
+def parse_price_text(price_text):
+    if not price_text:
+        return None
+    match = PRICE_PATTERN.search(price_text.replace('&nbsp;', ' '))
+    if match is None:
+        return None
+    price = float(match.group(0).replace('.', '').replace(',', '.'))
+    return price if price > 0 else None
+
+
+# Título e preço do produto da página aberta no navegador, pelos seletores da loja.
+# Retorna {"title", "preço", "available"} (sem preço o produto é considerado indisponível)
+# ou None quando nem o título foi encontrado
+def page_selector_product(driver, store):
+    spec = PRODUCT_PAGES[store]
+
+    try:
+        with timed("extract", store):
+            title, price_text, cents_text = driver.execute_script(PRODUCT_PAGE_SCRIPT, json.dumps(spec))
+    except (WebDriverException, TypeError, ValueError):
+        return None
+
+    if not title:
+        return None
+
+    if cents_text:
+        price_text = f"{(price_text or '').strip().rstrip(',')},{cents_text.replace(',', '').strip()}"
+
+    price = parse_price_text(price_text)
+    return {"title": title, "preço": price, "available": price is not None}
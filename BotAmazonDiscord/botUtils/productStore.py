@@ -0,0 +1,139 @@
+import threading
+import re
+import os
+
+from collections import OrderedDict
+from urllib.parse import urlparse, unquote
+
+from time import time
+
+from botUtils.metrics import get_metrics
+
+# Tempo (em segundos) que um produto fica no estado sem ser visto antes de ser descartado
+PRODUCT_TTL = float(os.getenv("PRODUCT_TTL_HOURS", "72")) * 3600
+
+# Quantidade máxima de produtos guardados por bot (os vistos há mais tempo saem primeiro)
+MAX_PRODUCTS = int(os.getenv("PRODUCT_STORE_MAX", "20000"))
+
+# Resultados de observe()
+NEW_PRODUCT = "new"
+PRICE_CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+AMAZON_ASIN = re.compile(r"/(?:dp|gp/product|gp/aw/d)/([A-Z0-9]{10})")
+MERCADO_LIVRE_ID = re.compile(r"MLB-?(\d+)", re.IGNORECASE)
+
+
+# Chave estável do produto: a mesma página de produto gera a mesma chave, mesmo com parâmetros de rastreio na URL
+def product_key(url, title=None):
+    if not url:
+        return f"title:{(title or '').strip().lower()}"
+
+    url = unquote(url)
+
+    if "amazon." in url:
+        asin = AMAZON_ASIN.search(url)
+        if asin:
+            return f"amazon:{asin.group(1)}"
+
+    if "mercadolivre." in url:
+        item_id = MERCADO_LIVRE_ID.search(url)
+        if item_id:
+            return f"mercadolivre:MLB{item_id.group(1)}"
+
+    parts = urlparse(url)
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return f"{host}{parts.path.rstrip('/')}"
+
+
+# Estado dos produtos vistos por um bot, indexado pela chave do produto.
+# Busca e atualização são O(1) e os produtos que não aparecem há mais de PRODUCT_TTL segundos
+# (ou que passam do limite MAX_PRODUCTS) são descartados, então a memória não cresce com o tempo de execução.
+class ProductStateStore():
+    def __init__(self, ttl=PRODUCT_TTL, max_size=MAX_PRODUCTS, sink=None, history=None, store=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.products = OrderedDict()  # Ordenado do produto visto há mais tempo para o mais recente
+        self.lock = threading.Lock()
+        self.sink = sink  # ResultSink opcional que recebe cada observação
+        self.history = history  # PriceHistory opcional onde cada preço observado é guardado
+        self.store = store  # Nome da loja usado no histórico de preços
+
+    # Registra que o produto foi visto com este preço.
+    # Retorna NEW_PRODUCT, PRICE_CHANGED ou UNCHANGED para o bot decidir qual notificação enviar
+    def observe(self, url, title, price):
+        key = product_key(url, title)
+        now = time()
+
+        with self.lock:
+            self.evict(now)
+
+            state = self.products.get(key)
+
+            if state is None:
+                state = self.products[key] = {
+                    "key": key,
+                    "title": title,
+                    "url": url,
+                    "price": price,
+                    "previous_price": None,
+                    "first_seen": now,
+                    "last_seen": now,
+                }
+                self.evict(now)
+                change = NEW_PRODUCT
+            else:
+                self.products.move_to_end(key)
+                state["title"] = title
+                state["url"] = url
+                state["last_seen"] = now
+
+                if state["price"] != price:
+                    state["previous_price"] = state["price"]
+                    state["price"] = price
+                    change = PRICE_CHANGED
+                else:
+                    change = UNCHANGED
+
+            previous_price = state["previous_price"] if change == PRICE_CHANGED else None
+
+        get_metrics().increment("products_seen", self.store)
+        if change != UNCHANGED:
+            get_metrics().increment("products_changed", self.store, change=change)
+
+        # Cada observação também é gravada no arquivo de resultados da busca
+        if self.sink is not None:
+            self.sink.write({"title": title, "price": price, "previous_price": previous_price, "change": change, "url": url})
+
+        if self.history is not None:
+            self.history.record(self.store, url, title, price)
+
+        return change
+
+    # Remove os produtos expirados e os excedentes. Como o dicionário fica ordenado pela última
+    # vez em que cada produto foi visto, basta olhar o início dele
+    def evict(self, now):
+        while self.products:
+            key, state = next(iter(self.products.items()))
+            if now - state["last_seen"] > self.ttl or len(self.products) > self.max_size:
+                self.products.popitem(last=False)
+            else:
+                break
+
+    def get(self, url, title=None):
+        with self.lock:
+            state = self.products.get(product_key(url, title))
+            return dict(state) if state else None
+
+    def values(self):
+        with self.lock:
+            return [dict(state) for state in self.products.values()]
+
+    def __contains__(self, url):
+        with self.lock:
+            return product_key(url) in self.products
+
+    def __len__(self):
+        return len(self.products)
@@ -0,0 +1,148 @@
+import threading
+import random
+import os
+
+from time import sleep, time
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from botUtils.processInfo import process_tree_usage, driver_pid
+from botUtils.driverPool import get_driver_pool
+from botUtils.changeDetector import WATCH_INTERVAL, WATCH_JITTER
+
+# Monitoramento de um produto específico com o navegador. Em vez de trocar de navegador e abrir a página
+# do zero a cada volta do loop, a página fica aberta na mesma aba e só é atualizada a cada intervalo
+# (com uma variação aleatória). O navegador só é trocado quando a atualização falha ou quando ele passa
+# dos limites do monitor de recursos do pool (memória, CPU, páginas ou idade). Cada monitoramento mede
+# as verificações por minuto e a CPU gasta por verificação.
+
+# A cada quantas verificações o consumo do monitoramento é mostrado
+WATCH_REPORT_EVERY = int(os.getenv("WATCH_REPORT_EVERY", "20"))
+
+
+# Mantém a página de um produto monitorado aberta no mesmo navegador e só a atualiza a cada intervalo.
+# O navegador só é trocado quando falha de verdade ou passa dos limites do monitor de recursos
+class ProductWatcher():
+    def __init__(self, bot, store, link, interval=WATCH_INTERVAL, jitter=WATCH_JITTER):
+        self.bot = bot
+        self.store = store
+        self.link = link
+        self.interval = interval
+        self.jitter = jitter
+        self.driver = None  # navegador em que a página do produto está aberta
+        self.checks = 0
+        self.recycles = 0
+        self.rss = 0
+        self.cpu_seconds = 0
+        self.measured_cpu = None
+        self.started_at = time()
+        self.attempts = 0  # Chamadas de load(), inclusive as que falharam
+
+    # Deixa a página do produto carregada e atualizada no navegador do bot. Toda carga depois da primeira espera
+    # o intervalo, inclusive depois de uma falha ou de uma troca de navegador. Na primeira vez (ou quando o
+    # navegador do bot mudou) abre a página; nas seguintes atualiza a aba
+    def load(self, wait=True):
+        if wait and self.attempts:
+            self.wait()
+        self.attempts += 1
+
+        if self.bot.driver is None:
+            self.bot.restart_driver()
+
+        if self.bot.driver is not self.driver:
+            self.open()
+        else:
+            # Mesmos limites usados na devolução dos navegadores ao pool (botUtils/resourceMonitor.py)
+            monitor = get_driver_pool().monitor
+            reason = monitor.check(self.driver, health=False)
+            if reason is not None:
+                monitor.record(self.driver, reason)
+                self.recycle()
+            else:
+                # Cada atualização conta como um ciclo nas medições de espera do bot (o intervalo fica de fora)
+                self.bot.waiter.next_cycle()
+                try:
+                    self.driver.refresh()
+                except TimeoutException:
+                    raise
+                except WebDriverException as e:
+                    print(f"[{self.store}] Erro ao atualizar a página do produto: {e}. Trocando o navegador...")
+                    self.recycle()
+
+        self.checks += 1
+        self.measure()
+
+        if self.checks % WATCH_REPORT_EVERY == 0:
+            self.report()
+
+    def open(self):
+        self.driver = self.bot.driver
+        self.measured_cpu = None
+        self.rss = 0
+        self.driver.get(self.link)
+
+    # Descarta o navegador atual (em vez de devolvê-lo ao pool) e abre a página em um novo
+    def recycle(self):
+        self.recycles += 1
+        self.bot.restart_driver(recycle=True)
+        self.open()
+
+    # Espera o intervalo (com a variação aleatória), parando antes se a busca for interrompida
+    def wait(self):
+        deadline = time() + self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+        while not self.bot.stop_search and time() < deadline:
+            sleep(min(0.5, max(0, deadline - time())))
+
+    # Memória atual e CPU gasta pelo navegador desde a última verificação
+    def measure(self):
+        rss, cpu = process_tree_usage(driver_pid(self.driver))
+        if not rss:
+            return
+        if self.measured_cpu is not None:
+            self.cpu_seconds += max(0, cpu - self.measured_cpu)
+        self.measured_cpu = cpu
+        self.rss = rss
+
+    def checks_per_minute(self):
+        return self.checks / max((time() - self.started_at) / 60, 1 / 60)
+
+    def describe(self):
+        return {
+            "store": self.store,
+            "link": self.link,
+            "checks": self.checks,
+            "checks_per_minute": self.checks_per_minute(),
+            "cpu_seconds": self.cpu_seconds,
+            "cpu_seconds_per_check": self.cpu_seconds / max(self.checks, 1),
+            "rss_mb": self.rss,
+            "recycles": self.recycles,
+        }
+
+    def report(self):
+        print(f"[{self.store}] {self.link}: {self.checks_per_minute():.1f} verificações/min, "
+              f"{self.cpu_seconds / max(self.checks, 1):.2f}s de CPU por verificação, {self.rss:.0f} MB, "
+              f"{self.recycles} trocas de navegador")
+
+
+# Monitoramentos ativos no processo
+watchers = set()
+watchers_lock = threading.Lock()
+
+
+# Começa a monitorar o produto no navegador do bot
+def start_watcher(bot, store, link):
+    watcher = ProductWatcher(bot, store, link)
+    with watchers_lock:
+        watchers.add(watcher)
+    return watcher
+
+
+def stop_watcher(watcher):
+    with watchers_lock:
+        watchers.discard(watcher)
+
+
+def watcher_stats():
+    with watchers_lock:
+        current = list(watchers)
+    return [watcher.describe() for watcher in current]
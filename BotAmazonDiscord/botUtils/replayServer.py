@@ -0,0 +1,170 @@
+import threading
+import hashlib
+import json
+import re
+import os
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+
+from botUtils.httpSession import fetch_page
+
+# Servidor local que reproduz páginas gravadas das lojas (listagens, buscas e páginas de produto), para
+# medir os bots sem acessar os sites de verdade. Cada loja tem uma pasta com as páginas gravadas e um
+# manifest.json. Na gravação, os links absolutos da loja viram {{BASE}}; ao servir, {{BASE}} vira o
+# endereço do servidor, então a navegação continua no servidor local.
+
+# Marcador que substitui o endereço da loja nas páginas gravadas
+PLACEHOLDER = "{{BASE}}"
+
+# Pasta com as páginas gravadas de cada loja
+FIXTURES_DIR = os.getenv("REPLAY_FIXTURES_DIR", os.path.join("benchmarks", "fixtures"))
+
+# Caminhos de arquivos estáticos, que nunca recebem a página de produto gravada
+ASSET_PATTERN = re.compile(r'\.(?:js|css|png|jpe?g|gif|webp|svg|ico|woff2?|ttf|json|map)$', re.IGNORECASE)
+
+
+# Troca os links absolutos da loja (de qualquer subdomínio, http ou https, inclusive escapados em JSON) pelo marcador
+def rewrite_links(page_html, base_url):
+    host = urlparse(base_url).netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    pattern = re.compile(r'https?:(?:\\?/){2}(?:[\w-]+\.)*' + re.escape(host) + r'(?![\w.-])', re.IGNORECASE)
+    return pattern.sub(PLACEHOLDER, page_html)
+
+
+# Grava as páginas de uma loja. config: {"base_url", "pages": {nome: url}, "query", "pages_to_check", "expected_price"}.
+# O nome "product" é a página de produto, usada também para as páginas de produto que não foram gravadas
+def record_store(store, config, fixtures_dir=FIXTURES_DIR):
+    directory = os.path.join(fixtures_dir, store)
+    os.makedirs(directory, exist_ok=True)
+
+    routes = {}
+    for name, url in config["pages"].items():
+        response = fetch_page(url)
+        if response is None:
+            print(f"[{store}] Não foi possível gravar a página '{name}' ({url})")
+            continue
+
+        file_name = f"{name}.html"
+        with open(os.path.join(directory, file_name), "w", encoding="utf-8") as file:
+            file.write(rewrite_links(response.text, config["base_url"]))
+
+        routes[urlparse(url).path or "/"] = file_name
+        print(f"[{store}] Página '{name}' gravada ({len(response.text) / 1024:.0f} KB)")
+
+    manifest = {
+        "base_url": config["base_url"],
+        "routes": routes,
+        "fallback": "product.html" if "product" in config["pages"] else None,
+        "paths": {name: urlparse(url).path for name, url in config["pages"].items()},
+        "query": config.get("query"),
+        "pages_to_check": config.get("pages_to_check", 1),
+        "expected_price": config.get("expected_price", 1000000),
+    }
+
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, indent=4, ensure_ascii=False)
+
+    return manifest
+
+
+# Lojas com páginas gravadas
+def recorded_stores(fixtures_dir=FIXTURES_DIR):
+    if not os.path.isdir(fixtures_dir):
+        return []
+    return sorted(name for name in os.listdir(fixtures_dir) if os.path.exists(os.path.join(fixtures_dir, name, "manifest.json")))
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        page = self.server.replay.page(urlparse(self.path).path)
+
+        if page is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body, etag = page
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Servidor das páginas gravadas de uma loja, em uma porta livre de 127.0.0.1
+class ReplayServer():
+    def __init__(self, store, fixtures_dir=FIXTURES_DIR):
+        self.store = store
+        self.directory = os.path.join(fixtures_dir, store)
+
+        with open(os.path.join(self.directory, "manifest.json"), encoding="utf-8") as file:
+            self.manifest = json.load(file)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ReplayHandler)
+        self.server.daemon_threads = True
+        self.server.replay = self
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.cache = {}  # {arquivo: (corpo, etag)}
+        self.lock = threading.Lock()
+        self.pages_served = 0
+        self.not_found = 0
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name=f"replay-{self.store}", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def url(self, name):
+        return self.base_url + self.manifest["paths"][name]
+
+    # Arquivo da rota mais específica que contém o caminho (ex.: "/s" atende "/s?k=..." e "/s/ref=..."),
+    # ou a página de produto gravada para os produtos que não foram gravados
+    def resolve(self, path):
+        routes = self.manifest["routes"]
+        if path in routes:
+            return routes[path]
+
+        prefixes = [route for route in routes if route != "/" and path.startswith(route.rstrip("/") + "/")]
+        if prefixes:
+            return routes[max(prefixes, key=len)]
+
+        # Arquivos (scripts, imagens, estilos) que não foram gravados ficam sem resposta
+        if ASSET_PATTERN.search(path):
+            return None
+
+        return self.manifest.get("fallback")
+
+    def page(self, path):
+        file_name = self.resolve(path)
+
+        with self.lock:
+            if file_name is None:
+                self.not_found += 1
+                return None
+
+            if file_name not in self.cache:
+                with open(os.path.join(self.directory, file_name), encoding="utf-8") as file:
+                    body = file.read().replace(PLACEHOLDER, self.base_url).encode("utf-8")
+                self.cache[file_name] = (body, f'"{hashlib.sha1(body).hexdigest()}"')
+
+            self.pages_served += 1
+            return self.cache[file_name]
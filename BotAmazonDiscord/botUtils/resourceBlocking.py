@@ -0,0 +1,154 @@
+import threading
+import os
+
+from selenium.common.exceptions import WebDriverException
+
+# Liga/desliga o bloqueio de recursos (imagens, fontes, vídeos e rastreadores) nos navegadores dos bots
+BLOCK_RESOURCES = os.getenv("BLOCK_RESOURCES", "1") != "0"
+
+# A cada quantas páginas carregadas o consumo médio de uma loja é mostrado
+REPORT_EVERY = int(os.getenv("RESOURCE_REPORT_EVERY", "50"))
+
+# Padrões de URL de cada tipo de recurso (o Network.setBlockedURLs aceita "*" como curinga)
+RESOURCE_TYPES = {
+    "image": ["*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.ico*", "*.bmp*"],
+    "font": ["*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*"],
+    "media": ["*.mp4*", "*.webm*", "*.m3u8*", "*.mp3*", "*.ogg*"],
+}
+
+# Domínios de analytics, anúncios e rastreamento, que não influenciam o preço mostrado na página
+TRACKER_DOMAINS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googleadservices.com",
+    "googlesyndication.com",
+    "doubleclick.net",
+    "connect.facebook.net",
+    "facebook.com/tr",
+    "hotjar.com",
+    "clarity.ms",
+    "criteo.com",
+    "criteo.net",
+    "analytics.tiktok.com",
+    "bat.bing.com",
+    "scorecardresearch.com",
+    "newrelic.com",
+    "nr-data.net",
+    "taboola.com",
+    "outbrain.com",
+    "smartlook.com",
+]
+
+# Regras padrão: bloqueia imagens, fontes, vídeos e rastreadores
+DEFAULT_RULES = {
+    "deny_types": ["image", "font", "media"],
+    "deny_domains": TRACKER_DOMAINS,
+    "allow_domains": [],
+}
+
+# Regras específicas de cada loja (as chaves informadas substituem as das regras padrão)
+STORE_RULES = {
+    # O slider do captcha e a página de cupons dependem das imagens
+    "aliexpress": {"deny_types": ["font", "media"]},
+}
+
+
+def rules_for(store):
+    rules = dict(DEFAULT_RULES)
+    rules.update(STORE_RULES.get(store, {}))
+    return rules
+
+
+# Lista de padrões de URL bloqueados para a loja
+def blocked_patterns(store):
+    rules = rules_for(store)
+    patterns = []
+
+    for resource_type in rules["deny_types"]:
+        patterns.extend(RESOURCE_TYPES[resource_type])
+
+    for domain in rules["deny_domains"]:
+        if not any(allowed in domain for allowed in rules["allow_domains"]):
+            patterns.append(f"*{domain}*")
+
+    return patterns
+
+
+# Aplica as regras de bloqueio da loja à aba atual do navegador via CDP.
+# O navegador é compartilhado pelo pool, então as regras são reaplicadas sempre que ele muda de loja.
+# Abas novas não herdam as regras, por isso usam force=True
+def apply_blocking(driver, store, force=False):
+    if not BLOCK_RESOURCES or (not force and getattr(driver, "blocking_store", None) == store):
+        return
+
+    patterns = blocked_patterns(store)
+
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        try:
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        except WebDriverException:
+            # Versões mais novas do Chrome usam "urlPatterns" no lugar de "urls"
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urlPatterns": [{"urlPattern": pattern, "block": True} for pattern in patterns]})
+        if not force:
+            driver.blocking_store = store
+    except WebDriverException as e:
+        print(f"Não foi possível aplicar o bloqueio de recursos para {store}: {e}")
+
+
+# Bytes transferidos e tempo de carregamento da página atual, segundo a Performance API.
+# Recursos de outros domínios sem Timing-Allow-Origin aparecem com 0 bytes, então o total é uma estimativa mínima
+PAGE_METRICS_SCRIPT = """
+const navigation = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+let bytes = navigation ? navigation.transferSize : 0;
+for (const resource of resources) { bytes += resource.transferSize || 0; }
+const loadTime = navigation ? (navigation.loadEventEnd || navigation.duration) : 0;
+return [bytes, loadTime, resources.length];
+"""
+
+# {(loja, bloqueio ativo): {"pages": n, "bytes": total, "load_ms": total, "requests": total}}
+page_metrics = {}
+page_metrics_lock = threading.Lock()
+
+
+# Registra o consumo da página que acabou de carregar no navegador
+def record_page_load(driver):
+    store = getattr(driver, "store", None)
+    if store is None:
+        return
+
+    try:
+        bytes_transferred, load_ms, requests = driver.execute_script(PAGE_METRICS_SCRIPT)
+    except (WebDriverException, TypeError, ValueError):
+        return
+
+    key = (store, BLOCK_RESOURCES)
+
+    with page_metrics_lock:
+        metrics = page_metrics.setdefault(key, {"pages": 0, "bytes": 0, "load_ms": 0, "requests": 0})
+        metrics["pages"] += 1
+        metrics["bytes"] += bytes_transferred or 0
+        metrics["load_ms"] += load_ms or 0
+        metrics["requests"] += requests or 0
+        report = metrics["pages"] % REPORT_EVERY == 0
+        summary = dict(metrics)
+
+    if report:
+        state = "ativado" if BLOCK_RESOURCES else "desativado"
+        print(f"[{store}] {summary['pages']} páginas: média de {summary['bytes'] / summary['pages'] / 1024:.0f} KB, "
+              f"{summary['requests'] / summary['pages']:.0f} requisições e {summary['load_ms'] / summary['pages'] / 1000:.1f}s por página (bloqueio {state})")
+
+
+# Médias por loja e por estado do bloqueio, para comparar execuções com BLOCK_RESOURCES=0 e 1
+def resource_stats():
+    with page_metrics_lock:
+        return {
+            f"{store}:{'blocked' if blocking else 'unblocked'}": {
+                "pages": metrics["pages"],
+                "avg_kb": metrics["bytes"] / metrics["pages"] / 1024,
+                "avg_requests": metrics["requests"] / metrics["pages"],
+                "avg_load_seconds": metrics["load_ms"] / metrics["pages"] / 1000,
+            }
+            for (store, blocking), metrics in page_metrics.items() if metrics["pages"]
+        }
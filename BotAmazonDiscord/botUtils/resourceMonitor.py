@@ -0,0 +1,142 @@
+import threading
+import os
+
+from time import time, sleep
+
+from botUtils.processInfo import psutil, process_tree_usage, driver_pid
+from botUtils.metrics import get_metrics
+
+# Acompanha a memória (RSS) e a CPU da árvore de processos de cada navegador do pool (chromedriver, Chrome
+# e os processos filhos dele) e decide quando o navegador deve ser reciclado: acima do limite de memória,
+# de uso de CPU, de páginas carregadas ou de idade, ou quando ele para de responder. Os navegadores livres
+# são fechados pela thread do monitor; os emprestados são reciclados na próxima devolução ao pool ou quando
+# o bot pergunta (DriverPool.needs_recycle), sempre na thread do próprio bot.
+
+# Memória máxima (MB) da árvore de processos de um navegador
+DRIVER_MAX_RSS_MB = float(os.getenv("DRIVER_MAX_RSS_MB", "1500"))
+
+# Uso máximo de CPU (% de um núcleo, média entre duas medições) de um navegador. 0 desliga o limite
+DRIVER_MAX_CPU_PERCENT = float(os.getenv("DRIVER_MAX_CPU_PERCENT", "0"))
+
+# Idade máxima (em minutos) de um navegador. 0 desliga o limite
+DRIVER_MAX_AGE = float(os.getenv("DRIVER_MAX_AGE_MINUTES", "0")) * 60
+
+# Intervalo (em segundos) entre as medições dos navegadores do pool
+RESOURCE_CHECK_INTERVAL = float(os.getenv("RESOURCE_CHECK_INTERVAL", "15"))
+
+
+# Mede a árvore de processos do navegador e guarda no próprio driver: resource_rss (MB), resource_cpu (segundos
+# acumulados) e resource_cpu_percent (média desde a medição anterior)
+def measure_driver(driver):
+    rss, cpu = process_tree_usage(driver_pid(driver))
+    if not rss:
+        return None
+
+    now = time()
+    previous = getattr(driver, "resource_sample", None)
+    if previous is not None and now > previous[0]:
+        driver.resource_cpu_percent = max(0, cpu - previous[1]) / (now - previous[0]) * 100
+
+    driver.resource_sample = (now, cpu)
+    driver.resource_rss = rss
+    driver.resource_cpu = cpu
+    return rss, cpu
+
+
+class ResourceMonitor():
+    def __init__(self, pool, interval=RESOURCE_CHECK_INTERVAL, max_rss=DRIVER_MAX_RSS_MB, max_cpu_percent=DRIVER_MAX_CPU_PERCENT, max_age=DRIVER_MAX_AGE):
+        self.pool = pool
+        self.interval = interval
+        self.max_rss = max_rss
+        self.max_cpu_percent = max_cpu_percent
+        self.max_age = max_age
+        self.thread = None
+        self.lock = threading.Lock()
+        self.samples = 0
+        self.peak_rss = 0
+        self.recycles = {}  # {motivo: quantidade}
+        self.events = []  # Últimas reciclagens: (momento, loja, motivo)
+
+    def start(self):
+        if self.thread is None and self.interval > 0:
+            self.thread = threading.Thread(target=self.run, name="resource-monitor", daemon=True)
+            self.thread.start()
+        return self
+
+    def run(self):
+        while True:
+            sleep(self.interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Erro ao medir os navegadores do pool: {e}")
+
+    # Mede todos os navegadores do pool. Os livres que passaram de algum limite são fechados na hora;
+    # os emprestados ficam marcados e são reciclados quando o bot devolver o navegador
+    def sweep(self):
+        idle, in_use = self.pool.snapshot()
+
+        for driver in idle + in_use:
+            measure_driver(driver)
+            driver.recycle_reason = self.limit_reason(driver)
+
+        for driver in idle:
+            if driver.recycle_reason and self.pool.take_idle(driver):
+                self.record(driver, driver.recycle_reason)
+                self.pool.discard(driver)
+
+    # Motivo para reciclar o navegador pelas medições já feitas: (tipo, descrição), ou None quando está dentro dos limites
+    def limit_reason(self, driver):
+        rss = getattr(driver, "resource_rss", 0)
+        cpu_percent = getattr(driver, "resource_cpu_percent", 0)
+        age = time() - driver.created_at
+
+        with self.lock:
+            self.samples += 1
+            self.peak_rss = max(self.peak_rss, rss)
+
+        if self.max_rss and rss > self.max_rss:
+            return "memory", f"memória em {rss:.0f} MB, limite de {self.max_rss:.0f} MB"
+        if self.max_cpu_percent and cpu_percent > self.max_cpu_percent:
+            return "cpu", f"CPU em {cpu_percent:.0f}%, limite de {self.max_cpu_percent:.0f}%"
+        if driver.pages_loaded >= self.pool.max_pages:
+            return "pages", f"{driver.pages_loaded} páginas carregadas, limite de {self.pool.max_pages}"
+        if self.max_age and age > self.max_age:
+            return "age", f"aberto há {age / 60:.0f} min, limite de {self.max_age / 60:.0f} min"
+        return None
+
+    # Mede o navegador agora (na thread do bot que está com ele) e retorna o motivo para reciclá-lo.
+    # Com health=True também verifica se ele ainda responde (ex.: aba que travou por falta de memória)
+    def check(self, driver, health=True):
+        if driver is None:
+            return None
+
+        if health and not self.pool.is_healthy(driver):
+            return "unresponsive", "o navegador não responde"
+
+        measure_driver(driver)
+        return getattr(driver, "recycle_reason", None) or self.limit_reason(driver)
+
+    def record(self, driver, reason):
+        kind, description = reason
+        store = getattr(driver, "store", None) or "pool"
+        print(f"[{store}] Reciclando o navegador: {description} "
+              f"({getattr(driver, 'resource_rss', 0):.0f} MB, {driver.pages_loaded} páginas, aberto há {(time() - driver.created_at) / 60:.0f} min)")
+
+        with self.lock:
+            self.recycles[kind] = self.recycles.get(kind, 0) + 1
+            self.events = (self.events + [(time(), store, description)])[-20:]
+        get_metrics().increment("driver_recycles", store, reason=kind)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "psutil": psutil is not None,
+                "max_rss_mb": self.max_rss,
+                "max_cpu_percent": self.max_cpu_percent,
+                "max_age_minutes": self.max_age / 60,
+                "samples": self.samples,
+                "peak_rss_mb": self.peak_rss,
+                "recycles": dict(self.recycles),
+                "recent": [{"at": at, "store": store, "reason": reason} for at, store, reason in self.events[-5:]],
+            }
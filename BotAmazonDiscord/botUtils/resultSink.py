@@ -0,0 +1,132 @@
+import threading
+import unicodedata
+import json
+import csv
+import os
+import re
+
+from collections import deque
+from datetime import datetime
+
+from time import time
+
+# Pasta onde os resultados de cada busca são gravados (um arquivo por loja/busca)
+RESULTS_DIR = os.getenv("RESULTS_DIR", "results")
+
+# Formato dos arquivos de resultado: "ndjson" (um JSON por linha) ou "csv"
+RESULTS_FORMAT = os.getenv("RESULTS_FORMAT", "ndjson").lower()
+
+# Tamanho máximo de cada arquivo antes da rotação e quantos arquivos antigos são mantidos
+RESULTS_MAX_BYTES = int(float(os.getenv("RESULTS_MAX_MB", "10")) * 1024 * 1024)
+RESULTS_BACKUPS = int(os.getenv("RESULTS_BACKUPS", "3"))
+
+# Quantidade de resultados recentes mantidos em memória (o restante fica apenas no arquivo)
+RESULTS_WINDOW = int(os.getenv("RESULTS_WINDOW", "200"))
+
+# As linhas são gravadas em lote: a cada FLUSH_ROWS linhas ou a cada FLUSH_INTERVAL segundos
+FLUSH_ROWS = 50
+FLUSH_INTERVAL = 5
+
+# Colunas do CSV (no NDJSON todas as chaves da linha são gravadas)
+CSV_FIELDS = ["time", "store", "query", "title", "price", "previous_price", "change", "url"]
+
+
+# Nome de arquivo seguro a partir do texto da busca
+def slugify(text):
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode()
+    slug = re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+    return slug[:80] or "links"
+
+
+# Grava os resultados de um bot aos poucos, enquanto a busca roda, em vez de acumular tudo em uma lista.
+# As linhas ficam em um buffer pequeno que é descarregado no arquivo periodicamente, o arquivo é
+# rotacionado quando passa de RESULTS_MAX_BYTES e só os últimos RESULTS_WINDOW resultados ficam
+# em memória, então o uso de memória é constante mesmo em buscas por tempo indeterminado.
+class ResultSink():
+    def __init__(self, store, query=None, directory=RESULTS_DIR, file_format=RESULTS_FORMAT, max_bytes=RESULTS_MAX_BYTES, backups=RESULTS_BACKUPS, window=RESULTS_WINDOW):
+        self.store = store
+        self.query = query
+        self.file_format = "csv" if file_format == "csv" else "ndjson"
+        self.path = os.path.join(directory, store, f"{slugify(query)}.{self.file_format}")
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.window = deque(maxlen=window)  # Últimos resultados, para consulta enquanto a busca roda
+        self.buffer = []
+        self.last_flush = time()
+        self.rows_written = 0
+        self.lock = threading.Lock()
+
+    # Registra um resultado. A linha vai para o arquivo no próximo descarregamento do buffer
+    def write(self, row):
+        row = dict(row)
+        row.setdefault("time", datetime.now().isoformat(timespec="seconds"))
+        row.setdefault("store", self.store)
+        row.setdefault("query", self.query)
+
+        with self.lock:
+            self.window.append(row)
+            self.buffer.append(row)
+
+            if len(self.buffer) >= FLUSH_ROWS or time() - self.last_flush >= FLUSH_INTERVAL:
+                self.flush_buffer()
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    # Grava no arquivo as linhas que ainda estão no buffer
+    def flush(self):
+        with self.lock:
+            self.flush_buffer()
+
+    def flush_buffer(self):
+        self.last_flush = time()
+
+        if not self.buffer:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.rotate()
+
+            new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+
+            with open(self.path, "a", encoding="utf-8", newline="") as file:
+                if self.file_format == "csv":
+                    writer = csv.DictWriter(file, fieldnames=CSV_FIELDS, extrasaction="ignore")
+                    if new_file:
+                        writer.writeheader()
+                    writer.writerows(self.buffer)
+                else:
+                    for row in self.buffer:
+                        file.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+
+            self.rows_written += len(self.buffer)
+        except OSError as e:
+            print(f"Erro ao gravar os resultados em {self.path}: {e}")
+
+        # Em caso de erro as linhas são descartadas para o buffer não crescer indefinidamente
+        self.buffer = []
+
+    # Quando o arquivo atual passa do limite, renomeia para .1 (o .1 vira .2 e assim por diante)
+    def rotate(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < self.max_bytes:
+            return
+
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    # Últimos resultados registrados (no máximo RESULTS_WINDOW)
+    def recent(self):
+        with self.lock:
+            return list(self.window)
+
+    def __len__(self):
+        return self.rows_written + len(self.buffer)
@@ -0,0 +1,169 @@
+import threading
+import json
+import os
+
+from selenium.common.exceptions import WebDriverException
+
+from botUtils.nextData import walk, to_price
+from botUtils.metrics import timed
+
+# Leitura do produto a partir dos dados estruturados do schema.org (JSON-LD e microdata) que as lojas
+# embutem na página para os buscadores. Título, preço e disponibilidade vêm prontos, sem esperar os
+# elementos visuais do preço nem montar o preço a partir de partes (a-price-whole + a-price-fraction).
+
+# A cada quantas páginas de uma loja a taxa de acerto é mostrada
+REPORT_EVERY = int(os.getenv("STRUCTURED_REPORT_EVERY", "50"))
+
+# Lê todos os blocos JSON-LD e os produtos em microdata da página com uma única chamada ao navegador
+STRUCTURED_DATA_SCRIPT = """
+const blocks = Array.from(document.querySelectorAll('script[type="application/ld+json"]')).map(s => s.textContent);
+
+const microdata = [];
+for (const scope of document.querySelectorAll('[itemtype*="schema.org/Product"]')) {
+    const value = (prop) => {
+        const element = scope.querySelector('[itemprop="' + prop + '"]');
+        if (!element) { return null; }
+        return element.getAttribute('content') || element.getAttribute('href') || (element.innerText || element.textContent || '').trim();
+    };
+    microdata.push({name: value('name'), price: value('price') || value('lowPrice'), availability: value('availability')});
+}
+
+return [blocks, microdata];
+"""
+
+# {loja: {"pages": n, "json-ld": acertos, "microdata": acertos}}
+structured_stats_by_store = {}
+structured_stats_lock = threading.Lock()
+
+
+def is_product(item):
+    types = item.get("@type")
+    if isinstance(types, str):
+        types = [types]
+    return isinstance(types, list) and "Product" in types
+
+
+# "https://schema.org/InStock", "InStock", "http://schema.org/OutOfStock"... Sem o campo, o produto é considerado disponível
+def to_available(value):
+    if not value:
+        return True
+    return str(value).rstrip("/").rsplit("/", 1)[-1].lower() in ("instock", "limitedavailability", "onlineonly", "instoreonly", "presale", "preorder")
+
+
+# Preço e disponibilidade das ofertas do produto (Offer, lista de Offer ou AggregateOffer).
+# Quando há mais de uma oferta disponível, usa a de menor preço
+def best_offer(offers):
+    if isinstance(offers, dict):
+        offers = [offers]
+    if not isinstance(offers, list):
+        return None, True
+
+    prices = []
+    available = False
+
+    for offer in offers:
+        if not isinstance(offer, dict):
+            continue
+
+        specification = offer.get("priceSpecification")
+        if isinstance(specification, list):
+            specification = specification[0] if specification else None
+
+        price = to_price(offer.get("price")) or to_price(offer.get("lowPrice"))
+        if price is None and isinstance(specification, dict):
+            price = to_price(specification.get("price"))
+
+        offer_available = to_available(offer.get("availability"))
+        available = available or offer_available
+
+        if price is not None and offer_available:
+            prices.append(price)
+
+    if prices:
+        return min(prices), True
+    return None, available
+
+
+def json_ld_product(blocks):
+    for block in blocks:
+        try:
+            data = json.loads(block, strict=False)
+        except ValueError:
+            continue
+
+        for item in walk(data):
+            if not is_product(item) or not item.get("name"):
+                continue
+
+            price, available = best_offer(item.get("offers"))
+            if price is None and available:
+                continue
+
+            return {"title": str(item["name"]).strip(), "preço": price, "available": available}
+
+    return None
+
+
+def microdata_product(items):
+    for item in items:
+        if not item.get("name"):
+            continue
+
+        price = to_price(item.get("price"))
+        available = to_available(item.get("availability"))
+        if price is None and available:
+            continue
+
+        return {"title": item["name"].strip(), "preço": price, "available": available}
+
+    return None
+
+
+def record_lookup(store, source):
+    with structured_stats_lock:
+        stats = structured_stats_by_store.setdefault(store, {"pages": 0, "json-ld": 0, "microdata": 0})
+        stats["pages"] += 1
+        if source is not None:
+            stats[source] += 1
+        report = stats["pages"] % REPORT_EVERY == 0
+        summary = dict(stats)
+
+    if report:
+        hits = summary["json-ld"] + summary["microdata"]
+        print(f"[{store}] dados estruturados encontrados em {hits / summary['pages']:.0%} de {summary['pages']} páginas "
+              f"(JSON-LD: {summary['json-ld']}, microdata: {summary['microdata']})")
+
+
+# Título, preço e disponibilidade do produto da página aberta no navegador, segundo o JSON-LD ou a microdata.
+# Retorna {"title", "preço", "available"} (preço None quando o produto está indisponível) ou None
+# quando a página não traz os dados, para o bot usar os seletores
+def page_structured_product(driver, store):
+    with timed("extract", store):
+        try:
+            blocks, microdata = driver.execute_script(STRUCTURED_DATA_SCRIPT)
+        except (WebDriverException, TypeError, ValueError):
+            return None
+
+        product = json_ld_product(blocks or [])
+        source = "json-ld"
+
+        if product is None:
+            product = microdata_product(microdata or [])
+            source = "microdata"
+
+    record_lookup(store, source if product is not None else None)
+    return product
+
+
+# Taxa de acerto do caminho rápido em cada loja
+def structured_stats():
+    with structured_stats_lock:
+        return {
+            store: {
+                "pages": stats["pages"],
+                "json_ld": stats["json-ld"],
+                "microdata": stats["microdata"],
+                "hit_rate": (stats["json-ld"] + stats["microdata"]) / stats["pages"],
+            }
+            for store, stats in structured_stats_by_store.items() if stats["pages"]
+        }
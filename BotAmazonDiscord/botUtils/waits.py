@@ -0,0 +1,182 @@
+import threading
+import os
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+from time import time
+
+from botUtils.metrics import get_metrics, count_error
+
+# Limites (em segundos) para os tempos de espera aprendidos
+MIN_TIMEOUT = float(os.getenv("WAIT_MIN_TIMEOUT", "3"))
+MAX_TIMEOUT = float(os.getenv("WAIT_MAX_TIMEOUT", "30"))
+
+# Tempo de espera usado enquanto a loja ainda não tem nenhuma medição
+DEFAULT_TIMEOUT = 15
+
+# Peso da medição mais recente na média móvel do tempo de carregamento
+SMOOTHING = 0.3
+
+# Tempo (em segundos) sem mudanças para considerar a lista de produtos ou a rede estáveis
+QUIET_PERIOD = 0.5
+
+# Tempo médio que cada condição leva para ser satisfeita, por loja: {(loja, condição): segundos}
+learned_timings = {}
+learned_timings_lock = threading.Lock()
+
+
+# Condição: o documento terminou de carregar
+def document_ready(driver):
+    return driver.execute_script("return document.readyState") == "complete"
+
+
+# Condição: a quantidade de elementos encontrados parou de mudar (a lista terminou de ser renderizada)
+def items_stable(locator, quiet=QUIET_PERIOD):
+    state = {"count": -1, "since": time()}
+
+    def condition(driver):
+        count = len(driver.find_elements(*locator))
+        now = time()
+        if count != state["count"]:
+            state["count"] = count
+            state["since"] = now
+            return False
+        return count > 0 and now - state["since"] >= quiet
+
+    return condition
+
+
+# Condição: a página não iniciou nenhuma requisição nova durante o período informado
+def network_idle(quiet=QUIET_PERIOD):
+    state = {"count": -1, "since": time()}
+
+    def condition(driver):
+        count = driver.execute_script(
+            "performance.setResourceTimingBufferSize(5000);"
+            "return document.readyState === 'complete' ? performance.getEntriesByType('resource').length : -1;"
+        )
+        now = time()
+        if count < 0 or count != state["count"]:
+            state["count"] = count
+            state["since"] = now
+            return False
+        return now - state["since"] >= quiet
+
+    return condition
+
+
+# Camada de espera de uma loja: substitui os sleep() fixos por condições de prontidão,
+# ajusta o tempo limite de cada condição com base nos tempos observados e contabiliza
+# quanto de cada ciclo foi gasto esperando e quanto foi gasto trabalhando.
+class StoreWaiter():
+    def __init__(self, store, results=None, product=None):
+        self.store = store
+        self.results_locator = results  # Localizador dos cards da página de resultados
+        self.product_locator = product  # Localizador do preço na página do produto
+        self.cycle_started_at = None
+        self.cycle_waiting = 0
+        self.cycles = 0
+        self.total_waiting = 0
+        self.total_working = 0
+        self.timeouts = 0
+
+    # Tempo limite atual de uma condição: algumas vezes o tempo médio observado, dentro dos limites
+    def timeout_for(self, name):
+        with learned_timings_lock:
+            average = learned_timings.get((self.store, name))
+        if average is None:
+            return DEFAULT_TIMEOUT
+        return min(MAX_TIMEOUT, max(MIN_TIMEOUT, average * 3))
+
+    def learn(self, name, seconds):
+        with learned_timings_lock:
+            average = learned_timings.get((self.store, name))
+            if average is None:
+                learned_timings[(self.store, name)] = seconds
+            else:
+                learned_timings[(self.store, name)] = average + SMOOTHING * (seconds - average)
+
+    # Espera a condição ser satisfeita. Retorna False se o tempo limite acabar (sem lançar exceção)
+    def until(self, driver, name, condition):
+        timeout = self.timeout_for(name)
+        started_at = time()
+
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=0.2).until(condition)
+            ready = True
+        except TimeoutException:
+            print(f"[{self.store}] Tempo de espera esgotado ({timeout:.1f}s) aguardando '{name}'")
+            self.timeouts += 1
+            count_error("WaitTimeout", self.store)
+            ready = False
+        except WebDriverException as e:
+            print(f"[{self.store}] Erro ao aguardar '{name}': {e}")
+            count_error(e, self.store)
+            ready = False
+
+        elapsed = time() - started_at
+        self.learn(name, elapsed)
+        get_metrics().observe("wait", elapsed, self.store)
+        self.cycle_waiting += elapsed
+        return ready
+
+    def page_ready(self, driver):
+        return self.until(driver, "page", document_ready)
+
+    # Espera os cards da página de resultados aparecerem e pararem de mudar
+    def results_ready(self, driver):
+        if self.results_locator is None:
+            return self.page_ready(driver)
+        return self.until(driver, "results", items_stable(self.results_locator))
+
+    # Espera o preço aparecer na página do produto
+    def product_ready(self, driver):
+        if self.product_locator is None:
+            return self.page_ready(driver)
+        return self.until(driver, "product", EC.presence_of_element_located(self.product_locator))
+
+    def element_present(self, driver, name, locator):
+        return self.until(driver, name, EC.presence_of_element_located(locator))
+
+    def element_clickable(self, driver, name, locator):
+        return self.until(driver, name, EC.element_to_be_clickable(locator))
+
+    # Espera a página parar de fazer requisições (ex.: depois de rolar para carregar mais produtos)
+    def network_idle(self, driver):
+        return self.until(driver, "network", network_idle())
+
+    # Encerra o ciclo atual (se houver) e começa a contabilizar um novo
+    def next_cycle(self):
+        self.end_cycle()
+        self.cycle_started_at = time()
+        self.cycle_waiting = 0
+
+    # Mostra quanto tempo do ciclo foi gasto esperando e quanto foi gasto trabalhando
+    def end_cycle(self):
+        if self.cycle_started_at is None:
+            return
+
+        total = time() - self.cycle_started_at
+        waiting = min(self.cycle_waiting, total)
+        working = total - waiting
+
+        self.cycles += 1
+        self.total_waiting += waiting
+        self.total_working += working
+        self.cycle_started_at = None
+
+        print(f"[{self.store}] Ciclo concluído em {total:.1f}s: {waiting:.1f}s esperando e {working:.1f}s trabalhando")
+
+    def stats(self):
+        with learned_timings_lock:
+            timeouts = {name: round(min(MAX_TIMEOUT, max(MIN_TIMEOUT, seconds * 3)), 2) for (store, name), seconds in learned_timings.items() if store == self.store}
+        return {
+            "store": self.store,
+            "cycles": self.cycles,
+            "waiting_seconds": self.total_waiting,
+            "working_seconds": self.total_working,
+            "timeouts": self.timeouts,
+            "learned_timeouts": timeouts,
+        }
@@ -0,0 +1,362 @@
+import concurrent.futures
+import threading
+import re
+import os
+
+from urllib.parse import unquote
+from selenium.common.exceptions import WebDriverException
+
+from time import time
+
+from botUtils.driverPool import get_driver_pool
+from botUtils.changeDetector import start_watch, stop_watch
+from botUtils.productStore import product_key
+from botUtils.nextData import NEXT_STORES, page_next_product
+from botUtils.structuredData import page_structured_product
+from botUtils.productExtractor import PRODUCT_PAGES, page_selector_product
+from botUtils.pagePipeline import load_product_pages
+from botUtils.metrics import get_metrics, set_job_context, clear_job_context
+
+# Watchlist: monitoramento de muitos produtos específicos (!pesquisar(link=..., preco_limite=...)) sem um
+# navegador e uma thread por produto. Os links são normalizados e cada produto é lido uma única vez por
+# intervalo, não importa quantos usuários o monitorem: o preço lido é repassado para cada inscrito, com o
+# seu próprio limite de preço e estado de notificação. Os produtos são agrupados por loja e verificados em
+# varreduras: cada varredura tenta ler via HTTP os produtos da loja que já estão na hora e abre o restante
+# em abas de um único navegador do pool. A memória depende de WATCHLIST_BROWSERS, não da quantidade de links,
+# e as requisições dependem da quantidade de produtos diferentes, não da quantidade de inscritos.
+
+# Quantidade de varreduras (e de navegadores) ao mesmo tempo
+WATCHLIST_BROWSERS = int(os.getenv("WATCHLIST_BROWSERS", "2"))
+
+# Quantidade de abas carregando ao mesmo tempo no navegador de uma varredura
+WATCHLIST_TABS = int(os.getenv("WATCHLIST_TABS", "4"))
+
+# Intervalo mínimo (em segundos) entre duas verificações do mesmo produto. Produtos que não mudam
+# são verificados com menos frequência, seguindo o intervalo do botUtils/changeDetector.py
+WATCHLIST_INTERVAL = float(os.getenv("WATCHLIST_INTERVAL", "60"))
+
+# Com 0, cada produto monitorado volta a ter o próprio bot, navegador e thread
+WATCHLIST_ENABLED = os.getenv("WATCHLIST_ENABLED", "1") == "1"
+
+# Código do produto nas URLs das lojas em que o mesmo produto aparece com textos diferentes no caminho
+# (Amazon e Mercado Livre já são tratados pelo product_key)
+PRODUCT_CODES = {
+    "kabum": re.compile(r"/produto/(\d+)"),
+    "magazineluiza": re.compile(r"/p/([0-9a-z]+)/", re.IGNORECASE),
+}
+
+
+# Lojas cujos produtos podem entrar na watchlist
+def watchlist_supports(store):
+    return WATCHLIST_ENABLED and store in PRODUCT_PAGES
+
+
+# Chave da inscrição: links diferentes da mesma página de produto (parâmetros de rastreio, www, barra
+# no final, texto do produto no caminho) caem no mesmo produto monitorado
+def subscription_key(store, link):
+    pattern = PRODUCT_CODES.get(store)
+    if pattern is not None:
+        code = pattern.search(unquote(link) + "/")
+        if code:
+            return f"{store}:{code.group(1).lower()}"
+    return product_key(link)
+
+
+# Inscrição de um usuário em um produto. Usa o bot da loja (sem navegador próprio) para o histórico de
+# preços e as notificações, e guarda o estado que o check_specific_product guardava em variáveis locais
+class WatchlistEntry():
+    def __init__(self, store, bot, link, expected_price):
+        self.store = store
+        self.bot = bot
+        self.link = link
+        self.expected_price = float(expected_price)
+        self.last_price = None
+        self.notified_for_price_drop = False
+        self.first_notification = True
+        self.in_stock = True
+        self.checks = 0
+        self.stopped = False
+        self.future = concurrent.futures.Future()  # concluído quando o monitoramento termina
+
+    # Chamado pelo !parar (mesma interface dos bots das lojas)
+    def stop_searching(self):
+        get_watchlist().remove(self)
+
+    def finish(self):
+        self.stopped = True
+        if not self.future.done():
+            self.future.set_result(None)
+
+    # Trata o produto lido na varredura: histórico, primeira notificação e notificação de queda de preço
+    def process(self, product):
+        self.checks += 1
+
+        if product is None or not product["available"] or product["preço"] is None:
+            print(f"Não foi possível encontrar o título ou preço para a URL: {self.link}")
+            if self.in_stock:
+                self.bot.notifier.submit(self.bot.notify_discord_about_error())
+                self.in_stock = False
+            return
+
+        title = product["title"]
+        price = product["preço"]
+
+        if self.last_price is None:
+            self.last_price = price
+
+        if self.first_notification:
+            self.bot.notifier.submit(self.bot.notify_discord_about_monitoring_new_product(title, price, self.link))
+            self.first_notification = False
+
+        # Condição para enviar notificação apenas quando o preço diminuir ou for menor que o esperado
+        if price < self.last_price or (price < self.expected_price and not self.notified_for_price_drop):
+            self.bot.notifier.submit(self.bot.notify_discord_about_monitoring_new_price(title, price, self.link))
+            print(f"Preço encontrado para '{title}' \nPreço: R${price}\n\n")
+            self.last_price = price
+            self.notified_for_price_drop = True
+
+        self.in_stock = True
+
+
+# Produto monitorado: lido uma vez por intervalo e repassado para todos os inscritos
+class WatchedProduct():
+    def __init__(self, store, key, link):
+        self.store = store
+        self.key = key
+        self.link = link  # link do primeiro inscrito, usado para ler a página
+        self.subscribers = []
+        self.detector = start_watch(store, link)  # validadores HTTP e intervalo entre as verificações
+        self.last = None  # último produto lido, entregue a quem se inscreve depois
+        self.next_check_at = 0
+        self.reads = 0
+        self.deliveries = 0
+
+    # Repassa o produto lido para os inscritos (a cópia da lista tirada com o lock da watchlist). Quando nada
+    # mudou desde a última leitura, só quem ainda não recebeu nenhuma leitura (inscritos novos) precisa dele
+    def publish(self, product, subscribers, changed=True):
+        if changed:
+            self.reads += 1
+            self.detector.observe(product["preço"] if product is not None and product["available"] else None)
+            if product is not None:
+                self.last = product
+                get_metrics().increment("products_seen", self.store)
+                # Guarda o preço no histórico uma vez por leitura (a gravação acontece em segundo plano)
+                if product["available"] and product["preço"] is not None:
+                    subscribers[0].bot.price_history.record(self.store, self.link, product["title"], product["preço"])
+
+        subscribers = [entry for entry in subscribers if changed or not entry.checks]
+        for entry in subscribers:
+            entry.process(product if changed else self.last)
+        self.deliveries += len(subscribers)
+
+    def schedule(self):
+        self.next_check_at = time() + max(WATCHLIST_INTERVAL, self.detector.interval)
+
+
+# Lê o produto da aba aberta: JSON do Next.js, dados estruturados e, por último, os seletores da loja
+def read_product_page(driver, store, link):
+    product = None
+    if store in NEXT_STORES:
+        product = page_next_product(driver, store, link)
+    if product is None:
+        product = page_structured_product(driver, store)
+    if product is None:
+        product = page_selector_product(driver, store)
+    return product
+
+
+class Watchlist():
+    def __init__(self, browsers=WATCHLIST_BROWSERS, tabs=WATCHLIST_TABS):
+        self.browsers = browsers
+        self.tabs = tabs
+        self.products = {}  # {loja: {chave da inscrição: WatchedProduct}}
+        self.sweeping = set()  # Lojas com uma varredura em andamento
+        self.condition = threading.Condition()
+        self.threads = []
+        self.sweeps = 0
+        self.sweep_seconds = 0
+        self.pages = 0  # Produtos lidos no navegador
+        self.http_reads = 0  # Produtos lidos via HTTP
+
+    # Inscreve o usuário no produto, criando o produto monitorado se ninguém o acompanhava ainda
+    def add(self, entry):
+        key = subscription_key(entry.store, entry.link)
+
+        with self.condition:
+            products = self.products.setdefault(entry.store, {})
+            product = products.get(key)
+
+            if product is None:
+                product = products[key] = WatchedProduct(entry.store, key, entry.link)
+            else:
+                # Antecipa a próxima leitura para o novo inscrito receber o produto logo (para os outros
+                # inscritos, uma página sem mudanças não gera notificação)
+                product.next_check_at = 0
+
+            product.subscribers.append(entry)
+            self.start_threads()
+            self.condition.notify()
+
+        return entry
+
+    def remove(self, entry):
+        key = subscription_key(entry.store, entry.link)
+
+        with self.condition:
+            products = self.products.get(entry.store, {})
+            product = products.get(key)
+
+            if product is not None and entry in product.subscribers:
+                product.subscribers.remove(entry)
+                if not product.subscribers:
+                    del products[key]
+                    stop_watch(product.detector)
+
+        entry.finish()
+
+    # Cópia dos inscritos do produto (a lista muda quando alguém entra ou sai da watchlist)
+    def subscribers(self, product):
+        with self.condition:
+            return list(product.subscribers)
+
+    # As threads das varreduras só são criadas quando o primeiro produto entra na watchlist
+    def start_threads(self):
+        while len(self.threads) < self.browsers:
+            thread = threading.Thread(target=self.run, name=f"watchlist-{len(self.threads) + 1}", daemon=True)
+            self.threads.append(thread)
+            thread.start()
+
+    def run(self):
+        while True:
+            store, due = self.next_sweep()
+            set_job_context(None, store)
+            try:
+                self.sweep(store, due)
+            except Exception as e:
+                print(f"[{store}] Erro na varredura da watchlist: {e}")
+            finally:
+                clear_job_context()
+                with self.condition:
+                    for product in due:
+                        product.schedule()
+                    self.sweeping.discard(store)
+                    self.condition.notify_all()
+
+    # Espera até alguma loja (que não esteja sendo varrida) ter produtos na hora de verificar
+    def next_sweep(self):
+        with self.condition:
+            while True:
+                now = time()
+                earliest = None
+
+                for store, products in self.products.items():
+                    if store in self.sweeping or not products:
+                        continue
+                    due = [product for product in products.values() if product.next_check_at <= now]
+                    if due:
+                        self.sweeping.add(store)
+                        return store, due
+                    next_at = min(product.next_check_at for product in products.values())
+                    earliest = next_at if earliest is None else min(earliest, next_at)
+
+                self.condition.wait(None if earliest is None else max(0.1, earliest - now))
+
+    # Verifica os produtos de uma loja: primeiro via HTTP (quando a loja permite) e o restante
+    # em abas de um único navegador do pool
+    def sweep(self, store, due):
+        started_at = time()
+        in_browser = []
+
+        for product in due:
+            subscribers = self.subscribers(product)
+            if not subscribers:
+                continue
+
+            parse = getattr(subscribers[0].bot, "parse_product_html", None)
+            result = product.detector.poll(lambda page_html: parse(page_html, product.link)) if parse else None
+
+            if result is None:
+                in_browser.append({"url": product.link, "product": product})
+                continue
+
+            self.http_reads += 1
+            # Com 304 ou a região do preço igual à da última leitura, só os inscritos novos recebem o produto
+            product.publish(result, subscribers, changed=product.detector.changed)
+
+        if in_browser:
+            self.sweep_in_browser(store, in_browser)
+
+        elapsed = time() - started_at
+        self.sweeps += 1
+        self.sweep_seconds += elapsed
+        print(f"[{store}] Varredura da watchlist: {len(due)} produtos ({len(in_browser)} no navegador, "
+              f"{sum(len(self.subscribers(product)) for product in due)} inscritos) em {elapsed:.1f}s")
+
+    def sweep_in_browser(self, store, items):
+        with self.condition:
+            bots = [item["product"].subscribers[0].bot for item in items if item["product"].subscribers]
+        if not bots:
+            return
+
+        bot = bots[0]
+        driver_pool = get_driver_pool()
+        driver = driver_pool.checkout(bot.options, store=store)
+
+        def process(item):
+            self.pages += 1
+            product = item["product"]
+            subscribers = self.subscribers(product)
+            if subscribers:
+                product.publish(read_product_page(driver, store, item["url"]), subscribers)
+
+        # As varreduras não pertencem a nenhuma busca (job_id None), então nem o registro de buscas nem o
+        # supervisor recuperariam o navegador: ele sempre volta ao pool (ou é descartado) aqui
+        broken = False
+        try:
+            load_product_pages(driver, items, process, concurrency=self.tabs, ready=bot.waiter.product_ready,
+                               should_stop=lambda: not any(self.subscribers(item["product"]) for item in items))
+        except WebDriverException as e:
+            print(f"[{store}] Erro no navegador da watchlist: {e}. Descartando o navegador...")
+            broken = True
+        finally:
+            if broken:
+                driver_pool.discard(driver)
+            else:
+                driver_pool.release(driver)
+
+    def stats(self):
+        with self.condition:
+            products = [product for store_products in self.products.values() for product in store_products.values()]
+            stores = {store: len(store_products) for store, store_products in self.products.items() if store_products}
+
+        subscribers = sum(len(product.subscribers) for product in products)
+        reads = sum(product.reads for product in products)
+
+        return {
+            "products": len(products),
+            "subscribers": subscribers,
+            "fan_out": subscribers / len(products) if products else 0,
+            "stores": stores,
+            "browsers": self.browsers,
+            "sweeps": self.sweeps,
+            "avg_sweep_seconds": self.sweep_seconds / self.sweeps if self.sweeps else 0,
+            "reads": reads,
+            "deliveries": sum(product.deliveries for product in products),
+            "browser_pages": self.pages,
+            "http_reads": self.http_reads,
+        }
+
+
+watchlist = None
+watchlist_lock = threading.Lock()
+
+
+# Retorna a watchlist única do processo, criando-a na primeira chamada
+def get_watchlist():
+    global watchlist
+
+    with watchlist_lock:
+        if watchlist is None:
+            watchlist = Watchlist()
+
+    return watchlist
@@ -0,0 +1,112 @@
+import os
+
+from lxml import html
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qsl, urlencode
+
+from botUtils.httpSession import fetch_page
+
+# Busca e leitura das páginas do Carrefour sem abrir o navegador.
+# As páginas do Carrefour (VTEX) já vêm renderizadas do servidor, então um GET + XPath
+# é suficiente na maioria dos casos. Quando os nós de preço não aparecem no HTML, as funções
+# retornam None e o bot usa o Selenium como alternativa.
+
+BASE_URL = "https://www.carrefour.com.br"
+
+# Intervalo mínimo (em segundos) entre o início de dois ciclos de verificação das páginas de resultados via HTTP
+HTTP_CYCLE_INTERVAL = float(os.getenv("CARREFOUR_HTTP_CYCLE_INTERVAL", "60"))
+
+
+# XPath que verifica se o elemento possui exatamente a classe informada
+def has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+CARD_XPATH = f"//div[{has_class('carrefourbr-carrefour-components-0-x-galleryItem')}]"
+CARD_TITLE_XPATH = f".//h2[{has_class('carrefourbr-carrefour-components-0-x-productName')}]"
+CARD_PRICE_XPATH = f".//span[{has_class('vtex-product-price-1-x-spotPriceValue')}]"
+PRODUCT_TITLE_XPATH = f"//*[{has_class('vtex-store-components-3-x-productBrand')}]"
+PRODUCT_PRICE_XPATH = f"//div[{has_class('carrefourbr-carrefour-components-0-x-sellingPriceValue')}]"
+
+
+# Converte textos como "R$ 1.299,90" para 1299.9
+def parse_price(price_text):
+    return float(price_text.replace('R$', '').replace('.', '').replace(',', '.').strip())
+
+
+def load_tree(url):
+    response = fetch_page(url)
+    if response is None:
+        return None
+    return html.fromstring(response.content)
+
+
+# Retorna a URL da página de resultados informada (o Carrefour pagina com o parâmetro "page")
+def page_url(url, page):
+    parts = urlparse(url)
+    query = [(key, value) for key, value in parse_qsl(parts.query) if key != "page"]
+    if page > 1:
+        query.append(("page", str(page)))
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+
+# Lê os produtos de uma página de busca/listagem. Retorna None se a página não trouxe os cards com preço
+def fetch_listing(url):
+    tree = load_tree(url)
+    if tree is None:
+        return None
+
+    products = []
+
+    for card in tree.xpath(CARD_XPATH):
+        links = card.xpath(".//a/@href")
+        titles = card.xpath(CARD_TITLE_XPATH)
+        prices = card.xpath(CARD_PRICE_XPATH)
+
+        if not links or not titles or not prices:
+            continue
+
+        try:
+            price = parse_price(prices[0].text_content())
+        except ValueError:
+            print(f"Formato de preço inválido para '{titles[0].text_content().strip()}'")
+            continue
+
+        products.append({
+            "url": urljoin(BASE_URL, links[0]),
+            "title": titles[0].text_content().strip(),
+            "preço": price
+        })
+
+    if not products:
+        return None
+
+    return products
+
+
+# Lê o título e o preço de uma página de produto. Retorna None se os nós de preço não estão no HTML
+def fetch_product(url):
+    response = fetch_page(url)
+    if response is None:
+        return None
+    return parse_product(response.content)
+
+
+# Lê o título e o preço do HTML de uma página de produto
+def parse_product(page_html):
+    tree = html.fromstring(page_html)
+
+    titles = tree.xpath(PRODUCT_TITLE_XPATH)
+    prices = tree.xpath(PRODUCT_PRICE_XPATH)
+
+    if not titles or not prices:
+        return None
+
+    # Mesmo critério da versão com Selenium: quando há mais de um preço, o segundo é o preço de venda
+    price_element = prices[1] if len(prices) > 1 else prices[0]
+
+    try:
+        price = parse_price(price_element.text_content())
+    except ValueError:
+        return None
+
+    return titles[0].text_content().strip(), price
@@ -1,20 +1,26 @@
-import pandas as pd
 import asyncio
 import os
 
 from dotenv import load_dotenv
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 
 from time import sleep, time
 
+from botUtils.driverPool import get_driver_pool
+from botUtils.browserProfiles import apply_profile
+from botUtils.productStore import ProductStateStore, NEW_PRODUCT, PRICE_CHANGED
+from botUtils.resultSink import ResultSink
+from botUtils.priceHistory import get_price_history
+from botUtils.notifications import get_notification_queue
+from botUtils.waits import StoreWaiter
+from botUtils.structuredData import page_structured_product
+from carrefourPriceBot.carrefourHttp import fetch_listing, parse_product, page_url, HTTP_CYCLE_INTERVAL
+from botUtils.changeDetector import start_watch, stop_watch
+from botUtils.productWatcher import start_watcher, stop_watcher
+
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
 
@@ -26,58 +32,61 @@ class CarrefourPriceBot():
     def __init__(self, search_query, expected_price, pages, user, loop, times):
         self.url = "https://www.carrefour.com.br"
         self.search_query = search_query
-        self.priceList = []  # Lista para armazenar os preços encontrados
+        self.results = ResultSink("carrefour", search_query)  # Resultados gravados em disco durante a busca (só os mais recentes ficam em memória)
+        self.price_history = get_price_history()  # Histórico de preços em SQLite compartilhado por todos os bots
         self.expected_price = expected_price
         self.pages = pages  # Número de páginas a serem verificadas
         self.user = user  # Objeto para enviar notificações para o usuário
         self.loop = loop
+        self.notifier = get_notification_queue(loop)  # Fila que junta as notificações em resumos e controla o ritmo de envio
         self.times = times
         self.url_busca = None
         self.stop_search = False  # Controle de interrupção
-        self.products_info = []
-        self.product_names = []
+        self.http_cycle_at = None  # Início do último ciclo feito via HTTP
+        self.product_store = ProductStateStore(sink=self.results, history=self.price_history, store="carrefour")  # Produtos já vistos, indexados pela chave do produto
 
         # Configurações do navegador Chrome
         self.options = Options()
         user_agent = userAgent
         self.options.add_argument(f'user-agent={user_agent}')
-        #options.add_argument('--headless')
         self.options.add_argument('--disable-gpu')
-        self.options.add_argument('--window-size=1920x1080')
         self.options.add_argument('--disable-dev-shm-usage')
         self.options.add_argument('--no-sandbox')
         self.options.add_argument('--ignore-certificate-errors')
         self.options.add_experimental_option('excludeSwitches', ['enable-logging'])
         self.options.add_argument("--disable-blink-features=AutomationControlled")
         self.options.add_argument('--disable-extensions')
-        self.options.add_argument('--disable-images')
+
+        # Perfil do navegador da loja (headless, memória reduzida...), definido em botUtils/browserProfiles.py
+        apply_profile(self.options, "carrefour")
         
 
-        service = Service(ChromeDriverManager().install())
-        service.log_path = 'NUL'
+        # O navegador é emprestado do pool compartilhado a cada ciclo (ver restart_driver)
+        self.driver = None
 
-        self.driver = webdriver.Chrome(service=service, options=self.options)
+        # Espera pelos cards da busca e pelo título da página do produto em vez de pausas fixas
+        self.waiter = StoreWaiter("carrefour", results=(By.CSS_SELECTOR, "div.carrefourbr-carrefour-components-0-x-galleryItem"), product=(By.CLASS_NAME, "vtex-store-components-3-x-productBrand"))
 
     async def notify_discord_about_new_product(self, title, price, url):
         message = "-" * 70 + f"\n\n**Novo Produto!**\n**Produto:** {title}\n**Preço Abaixo do Esperado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_change_in_price(self, title, price, url):
         message = "-" * 70 + f"\n\n**Mudança no preço**\n**Produto:** {title}\n**Preço Abaixo do Esperado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
 
     async def notify_discord_about_monitoring_new_product(self, title, price, url):
         message = "-" * 70 + f"\n\n**Novo Produto!**\n**Produto:** {title}\n**Preço Monitorado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_monitoring_new_price(self, title, price, url):
         message = "-" * 70 + f"\n\n**Mudança no preço!**\n**Produto:** {title}\n**Preço Monitorado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_error(self):
         message = "-" * 70 + f"\n\nOcorreu um erro ao monitorar o produto. \n\nO produto pode estar sem estoque, a página pode estar indisponível ou a estrutura do site mudou!\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     # Método para realizar a pesquisa do produto na Carrefour
     def search_product(self):
@@ -92,7 +101,7 @@ class CarrefourPriceBot():
 
         try:
             # Obtém os links dos produtos na página atual
-            sleep(3)
+            self.waiter.results_ready(self.driver)
             product_cards = self.driver.find_elements(By.CSS_SELECTOR, "div.carrefourbr-carrefour-components-0-x-galleryItem")
 
             print(f"\nEncontrados {len(product_cards)} produtos na página atual.\n")
@@ -129,46 +138,7 @@ class CarrefourPriceBot():
                         "preço": price
                     }
 
-                    # Verifica se o produto já foi processado
-
-                    if product_data not in self.products_info:
-                        # Adiciona o produto à lista de produtos
-                        self.products_info.append(product_data)
-                        self.product_names.append(product_data["title"])
-
-                        if self.expected_price == None:
-                            
-                            asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_product(product_data['title'], price, product_data["url"]), self.loop)
-                            
-                            print(f"Novo produto!\nPreço encontrado para '{product_data['title']}' \nPreço: R${price}\n\n")
-
-                        elif price <= self.expected_price:
-
-                            asyncio.run_coroutine_threadsafe(self.notify_discord_about_new_product(product_data['title'], price, product_data["url"]), self.loop)
-
-                            print(f"Novo produto!\nPreço encontrado para '{product_data['title']}' \nPreço: R${price}\n\n")                        
-                    
-                    else:
-                        # Verifica se o preço do produto mudou
-                        for product in self.products_info:
-
-                            if product["title"] == product_data["title"]:
-
-                                if product["preço"] != product_data["preço"]:
-
-                                    product["preço"] = product_data["preço"]
-
-                                    if self.expected_price == None:
-                                        
-                                        asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_price(product['title'], price, product["url"]), self.loop)
-                                        
-                                        print(f"Preço mudou para '{product['title']}' \nPreço: R${price}\n\n")
-
-                                    elif price <= self.expected_price:
-
-                                        asyncio.run_coroutine_threadsafe(self.notify_discord_about_change_in_price(product['title'], price, product["url"]), self.loop)
-
-                                        print(f"Preço mudou para '{product['title']}' \nPreço: R${price}\n\n")                                    
+                    self.process_product(product_data)
 
                 except NoSuchElementException:
                     print(f"Não foi possível encontrar o título ou preço para a URL: {product_data['url']}")
@@ -184,14 +154,99 @@ class CarrefourPriceBot():
             print(f"Ocorreu um erro geral ao tentar buscar os produtos e preços: {e}")
 
         # Armazena e retorna a lista de produtos e preços
-        print(self.products_info)
-        return self.products_info
+        print(f"{len(self.product_store)} produtos monitorados.")
+        return self.product_store.values()
     
+    # Verifica se o produto é novo ou se o preço mudou e envia a notificação correspondente
+    def process_product(self, product_data):
+        price = product_data["preço"]
+
+        # Consulta o estado do produto pela chave (busca O(1)) para saber se ele é novo ou se o preço mudou
+        change = self.product_store.observe(product_data['url'], product_data['title'], price)
+
+        if change == NEW_PRODUCT:
+
+            if self.expected_price is None:
+
+                self.notifier.submit(self.notify_discord_about_monitoring_new_product(product_data['title'], price, product_data['url']))
+
+                print(f"Novo produto!\nPreço encontrado para '{product_data['title']}' \nPreço: R${price}\n\n")
+
+            elif price <= self.expected_price:
+
+                self.notifier.submit(self.notify_discord_about_new_product(product_data['title'], price, product_data['url']))
+
+                print(f"Novo produto!\nPreço encontrado para '{product_data['title']}' \nPreço: R${price}\n\n")
+
+        elif change == PRICE_CHANGED:
+
+            if self.expected_price is None:
+
+                self.notifier.submit(self.notify_discord_about_monitoring_new_price(product_data['title'], price, product_data['url']))
+
+                print(f"Preço mudou para '{product_data['title']}' \nPreço: R${price}\n\n")
+
+            elif price <= self.expected_price:
+
+                self.notifier.submit(self.notify_discord_about_change_in_price(product_data['title'], price, product_data['url']))
+
+                print(f"Preço mudou para '{product_data['title']}' \nPreço: R${price}\n\n")
+
+    # Verifica as páginas de resultados via HTTP, sem abrir o navegador. Entre dois ciclos via HTTP espera
+    # HTTP_CYCLE_INTERVAL (contado do início do ciclo anterior), para não pedir a busca à loja sem parar.
+    # Retorna False quando a primeira página não trouxe os preços no HTML, para o ciclo ser feito pelo Selenium
+    def check_pages_http(self, url):
+        self.wait_http_cycle()
+        if self.stop_search:
+            return True
+
+        self.http_cycle_at = time()
+        self.waiter.next_cycle()
+
+        for page in range(1, self.pages + 1):
+            if self.stop_search:
+                break
+
+            products = fetch_listing(page_url(url, page))
+
+            if products is None:
+                if page == 1:
+                    print("Preços não encontrados no HTML da página. Usando o navegador...")
+                    return False
+                print("Próxima página não encontrada.")
+                break
+
+            print(f"Monitorando página {page} de {self.pages}")
+            print(f"\nEncontrados {len(products)} produtos na página atual.\n")
+
+            for product_data in products:
+                if self.stop_search:
+                    break
+                self.process_product(product_data)
+
+        # Fim do ciclo: grava os resultados e devolve o navegador que sobrou de um ciclo anterior feito pelo
+        # Selenium (ele não é necessário enquanto o HTTP funcionar)
+        self.results.flush()
+        self.waiter.end_cycle()
+        if self.driver is not None:
+            get_driver_pool().release(self.driver)
+            self.driver = None
+        return True
+
+    # Espera o intervalo entre os ciclos via HTTP, parando antes se a busca for interrompida
+    def wait_http_cycle(self):
+        if self.http_cycle_at is None:
+            return
+
+        deadline = self.http_cycle_at + HTTP_CYCLE_INTERVAL
+        while not self.stop_search and time() < deadline:
+            sleep(min(0.5, max(0, deadline - time())))
+
      # Método para navegar para a próxima página de resultados   
     def next_page(self):
         try:
             self.driver.execute_script("window.scrollBy(0, 1000)")
-            sleep(1)
+            self.waiter.network_idle(self.driver)
             button = self.driver.find_element(By.CSS_SELECTOR, '.carrefourbr-carrefour-components-0-x-Pagination_NextButtonContainer a')
             self.driver.get(button.get_attribute('href'))
             return True
@@ -207,40 +262,42 @@ class CarrefourPriceBot():
         print(f"Monitorando a busca por '{self.search_query}' no Carrefour")    
         if self.times == "indeterminado":
             while not self.stop_search:
+                if self.check_pages_http(f"{self.url}/busca/{self.search_query}"):
+                    continue
                 self.restart_driver()
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
                 self.driver.fullscreen_window()
                 for _ in range(self.pages):
                     print(f"Monitorando página {_ + 1} de {self.pages}")
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)  
                     if not self.next_page():
                         break
-                    sleep(1)
+                    self.waiter.results_ready(self.driver)
         else:
             for _ in range(self.times):
                 if self.stop_search:
                     break
+                if self.check_pages_http(f"{self.url}/busca/{self.search_query}"):
+                    continue
                 self.restart_driver()
                 self.driver.get(self.url)
-                sleep(0.7)
+                self.waiter.page_ready(self.driver)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
 
                 for _ in range(self.pages):
                     print(f"Monitorando página {_ + 1} de {self.pages}")
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     if not self.next_page():
                         break
-                    sleep(1)
+                    self.waiter.results_ready(self.driver)
         
-        self.driver.quit()
+        self.release_driver()
 
     
     # Método para realizar a busca de preços de forma síncrona
@@ -248,11 +305,13 @@ class CarrefourPriceBot():
         print(f"Monitorando link: {link}")
         if self.times == "indeterminado":
             while not self.stop_search:
+                if self.check_pages_http(link):
+                    continue
                 self.restart_driver()
                 self.driver.get(link)
                 self.driver.fullscreen_window()
                 self.driver.execute_script("window.scrollTo(0, 700)")
-                sleep(0.7)
+                self.waiter.network_idle(self.driver)
                 search_url = self.driver.current_url
 
                 for _ in range(self.pages):
@@ -260,40 +319,60 @@ class CarrefourPriceBot():
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url)
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         else:
             for _ in range(self.times):
                 print(f"Monitorando página {_ + 1} de {self.pages}")
                 if self.stop_search:
                     break
+                if self.check_pages_http(link):
+                    continue
                 self.restart_driver()
                 self.driver.get(link)
                 self.driver.fullscreen_window()
                 self.driver.execute_script("window.scrollTo(0, 700)")
-                sleep(0.7)
+                self.waiter.network_idle(self.driver)
                 search_url = self.driver.current_url
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url)
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         
-        self.driver.quit()
-
-    def restart_driver(self):
-        self.driver.quit()
-        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=self.options)
+        self.release_driver()
+
+    # Devolve o navegador atual ao pool e pega outro (reaproveitado, se houver algum livre)
+    def restart_driver(self, recycle=False):
+        self.waiter.next_cycle()
+        driver_pool = get_driver_pool()
+        if recycle:
+            driver_pool.discard(self.driver)
+        else:
+            driver_pool.release(self.driver)
+        self.driver = driver_pool.checkout(self.options, store="carrefour", should_stop=lambda: self.stop_search)
+
+    def release_driver(self):
+        self.results.flush()
+        self.waiter.end_cycle()
+        get_driver_pool().release(self.driver)
+        self.driver = None
+
+    # Lê o produto do HTML da página (usado pela watchlist, que baixa as páginas via HTTP)
+    def parse_product_html(self, page_html, link):
+        product = parse_product(page_html)
+        if product is None:
+            return None
+        title, price = product
+        return {"title": title, "preço": price, "available": True}
 
     # Função para monitorar um link de um produto específico e se o preço dele mudou   
     def check_specific_product(self, link, expected_price):
@@ -308,63 +387,108 @@ class CarrefourPriceBot():
 
         in_stock = True
 
+        # Validadores HTTP, impressão digital da região do preço e intervalo entre as verificações deste produto
+        watch = start_watch("carrefour", link)
+
+        # Aba do produto mantida aberta entre as verificações
+        watcher = start_watcher(self, "carrefour", link)
+
         while not self.stop_search:
-            try:
-                # Tente carregar a página
-                self.restart_driver()
-                self.driver.get(link)
-                sleep(3)
-            except TimeoutException:
-                # Se ocorrer um timeout, recarregue a página e vá para a próxima iteração
-                print(f"Timeout ao carregar {link}, tentando recarregar.")
+            # Espera o intervalo do produto em toda volta do loop (só a primeira verificação não espera).
+            # O intervalo cresce enquanto o preço não muda e quando a leitura falha seguidamente
+            watch.wait(lambda: self.stop_search)
+            if self.stop_search:
+                break
+
+            # Tenta primeiro via HTTP, com requisição condicional; o navegador só é usado quando o HTML não traz o preço
+            product = watch.poll(parse_product)
+
+            if product is not None:
+                # Devolve o navegador só se uma verificação anterior precisou dele
+                if self.driver is not None:
+                    self.release_driver()
+                if not watch.changed:
+                    # 304 ou região do preço igual à da última leitura: nada a ler nem a notificar
+                    continue
+                title, price = product
+            else:
                 try:
-                    self.driver.refresh()
-                except Exception as e:
-                    print(f"Erro ao tentar recarregar a página: {e}")
-                    continue  # Pula para a próxima iteração do loop
-                continue
-
-            try:
-                # Tenta localizar o título do produto
-                title_element = self.driver.find_element(By.CLASS_NAME, "vtex-store-components-3-x-productBrand")
-                title = title_element.text
-
-                # Tenta localizar o preço do produto
+                    # Abre a página do produto no navegador (ou atualiza a aba que já está aberta)
+                    watcher.load(wait=False)
+                    self.waiter.product_ready(self.driver)
+                except TimeoutException:
+                    watch.fail()
+                    # Se ocorrer um timeout, recarregue a página e vá para a próxima iteração
+                    print(f"Timeout ao carregar {link}, tentando recarregar.")
+                    try:
+                        self.driver.refresh()
+                    except Exception as e:
+                        print(f"Erro ao tentar recarregar a página: {e}")
+                        continue  # Pula para a próxima iteração do loop
+                    continue
+
                 try:
-                    price_element = self.driver.find_elements(By.CLASS_NAME, "carrefourbr-carrefour-components-0-x-sellingPriceValue")[1]
-                except IndexError:
-                    price_element = self.driver.find_element(By.CLASS_NAME, "carrefourbr-carrefour-components-0-x-sellingPriceValue")
+                    # Tenta os dados estruturados (JSON-LD/microdata) da página antes dos seletores
+                    structured = page_structured_product(self.driver, "carrefour")
 
-                price_text = price_element.text.replace('R$', '').replace('.', '').replace(',', '.').strip()
+                    if structured is not None and not structured["available"]:
+                        raise NoSuchElementException("Produto indisponível")
+
+                    if structured is not None:
+                        title = structured["title"]
+                        price = structured["preço"]
+                    else:
+                        # Tenta localizar o título do produto
+                        title_element = self.driver.find_element(By.CLASS_NAME, "vtex-store-components-3-x-productBrand")
+                        title = title_element.text
+
+                        # Tenta localizar o preço do produto
+                        try:
+                            price_element = self.driver.find_elements(By.CLASS_NAME, "carrefourbr-carrefour-components-0-x-sellingPriceValue")[1]
+                        except IndexError:
+                            price_element = self.driver.find_element(By.CLASS_NAME, "carrefourbr-carrefour-components-0-x-sellingPriceValue")
+
+                        price_text = price_element.text.replace('R$', '').replace('.', '').replace(',', '.').strip()
+
+                        price = float(price_text)
+
+                except NoSuchElementException:
+                    watch.fail()
+                    print(f"Não foi possível encontrar o título ou preço para a URL: {link}")
+                    if in_stock:
+                        self.notifier.submit(self.notify_discord_about_error())
+                        in_stock = False
+                    continue
+                    
+                except WebDriverException:
+                    watch.fail()
+                    # Troca o navegador se ele parou de responder ou passou dos limites de memória/CPU (botUtils/resourceMonitor.py)
+                    if get_driver_pool().needs_recycle(self.driver):
+                        self.restart_driver(recycle=True)
+                    continue
 
-                price = float(price_text)
+            watch.observe(price)
 
-                if last_price is None:
-                    last_price = price
+            # Guarda o preço no histórico (a gravação acontece em segundo plano)
+            self.price_history.record("carrefour", link, title, price)
 
-                if first_notification:
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_product(title, price, link), self.loop)
-                    first_notification = False
+            if last_price is None:
+                last_price = price
 
-                # Condição modificada para enviar notificação apenas quando o preço diminuir ou for menor que o esperado
-                if price < last_price or (price < expected_price and not notified_for_price_drop):
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_price(title, price, link), self.loop)
-                    print(f"Preço encontrado para '{title}' \nPreço: R${price}\n\n")
-                    last_price = price  # Atualiza o último preço verificado
-                    notified_for_price_drop = True
+            if first_notification:
+                self.notifier.submit(self.notify_discord_about_monitoring_new_product(title, price, link))
+                first_notification = False
 
-            except NoSuchElementException:
-                print(f"Não foi possível encontrar o título ou preço para a URL: {link}")
-                if in_stock:
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_error(), self.loop)
-                    in_stock = False
-                continue
-                
-            except WebDriverException as e:
-                if "Out of Memory" in str(e):
-                    print("Detectado erro 'Out of Memory'. Reiniciando o driver...")
-                    self.restart_driver()
+            # Condição modificada para enviar notificação apenas quando o preço diminuir ou for menor que o esperado
+            if price < last_price or (price < expected_price and not notified_for_price_drop):
+                self.notifier.submit(self.notify_discord_about_monitoring_new_price(title, price, link))
+                print(f"Preço encontrado para '{title}' \nPreço: R${price}\n\n")
+                last_price = price  # Atualiza o último preço verificado
+                notified_for_price_drop = True
 
+        stop_watch(watch)
+        stop_watcher(watcher)
+        self.release_driver()
 
     async def search_specific_product(self, link, expected_price):
         await asyncio.get_event_loop().run_in_executor(None, self.check_specific_product, link, expected_price)
@@ -375,9 +499,8 @@ class CarrefourPriceBot():
     async def search_link_prices(self, link):
         await asyncio.get_event_loop().run_in_executor(None, self.check_link_prices, link)
 
-    # Método para salvar os dados em um arquivo CSV
-    def data_to_csv(self): 
-        df = pd.DataFrame(self.priceList)
-        df = df.dropna(how='all')
-        df.to_csv(f"{self.search_query}.csv", index=False)
+    # Método para gravar no arquivo de resultados as linhas que ainda estão em memória
+    def data_to_csv(self):
+        self.results.flush()
+        return self.results.path
 
@@ -1,20 +1,24 @@
-import pandas as pd
 import threading
 import asyncio
 import os
 
 from dotenv import load_dotenv
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 
-from time import sleep, time
+
+from botUtils.driverPool import get_driver_pool
+from botUtils.browserProfiles import apply_profile
+from botUtils.productStore import ProductStateStore, NEW_PRODUCT, PRICE_CHANGED
+from botUtils.resultSink import ResultSink
+from botUtils.priceHistory import get_price_history
+from botUtils.notifications import get_notification_queue
+from botUtils.waits import StoreWaiter
+from botUtils.listingExtractor import extract_listing
+from botUtils.structuredData import page_structured_product
+from botUtils.productWatcher import start_watcher, stop_watcher
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -27,56 +31,59 @@ class CasasBahiaPriceBot():
     def __init__(self, search_query, expected_price, pages, user, loop, times):
         self.url = "https://www.casasbahia.com.br"
         self.search_query = search_query
-        self.priceList = []  # Lista para armazenar os preços encontrados
+        self.results = ResultSink("casasbahia", search_query)  # Resultados gravados em disco durante a busca (só os mais recentes ficam em memória)
+        self.price_history = get_price_history()  # Histórico de preços em SQLite compartilhado por todos os bots
         self.expected_price = expected_price
         self.pages = pages  # Número de páginas a serem verificadas
         self.user = user  # Objeto para enviar notificações para o usuário
         self.loop = loop
+        self.notifier = get_notification_queue(loop)  # Fila que junta as notificações em resumos e controla o ritmo de envio
         self.times = times
         self.stop_search = False  # Controle de interrupção
         self.processed_links = set()  # Conjunto para armazenar URLs já processados neste ciclo
-        self.product_info = {}  # Dicionário para armazenar informações dos produtos
+        self.product_store = ProductStateStore(sink=self.results, history=self.price_history, store="casasbahia")  # Produtos já vistos, indexados pela chave do produto
 
         # Configurações do navegador Chrome
         self.options = Options() 
         self.user_agent = userAgent
         self.options.add_argument(f'user-agent={self.user_agent}')
-        #self.options.add_argument('--headless')
         self.options.add_argument('--disable-gpu')
-        self.options.add_argument('--window-size=1920x1080')
         self.options.add_argument('--disable-dev-shm-usage')
         self.options.add_argument('--no-sandbox')
         self.options.add_argument('--ignore-certificate-errors')
         self.options.add_experimental_option('excludeSwitches', ['enable-logging'])
         self.options.add_argument('--disable-blink-features=AutomationControlled')
         self.options.add_argument('--disable-extensions')
-        self.options.add_argument('--disable-images')
 
-        service = Service(ChromeDriverManager().install())
-        service.log_path = 'NUL'
+        # Perfil do navegador da loja (headless, memória reduzida...), definido em botUtils/browserProfiles.py
+        apply_profile(self.options, "casasbahia")
+
+        # O navegador é emprestado do pool compartilhado a cada ciclo (ver restart_driver)
+        self.driver = None
 
-        self.driver = webdriver.Chrome(service=service, options=self.options)
+        # Espera pelos cards da busca e pelo título da página do produto em vez de pausas fixas
+        self.waiter = StoreWaiter("casasbahia", results=(By.CSS_SELECTOR, "div.css-1enexmx div.styles__ProductCardWrapper-sc-43255755-3"), product=(By.CSS_SELECTOR, "h1.dsvia-heading.css-1xmpwke"))
 
     async def notify_discord_about_new_product(self, title, price, url):
         message = "-" * 70 + f"\n\n**Novo Produto!**\n**Produto:** {title}\n**Preço Abaixo do Esperado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_change_in_price(self, title, price, url):
         message = "-" * 70 + f"\n\n**Mudança no preço**\n**Produto:** {title}\n**Preço Abaixo do Esperado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
 
     async def notify_discord_about_monitoring_new_product(self, title, price, url):
         message = "-" * 70 + f"\n\n**Novo Produto!**\n**Produto:** {title}\n**Preço Monitorado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_monitoring_new_price(self, title, price, url):
         message = "-" * 70 + f"\n\n**Mudança no preço!**\n**Produto:** {title}\n**Preço Monitorado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_error(self):
         message = "-" * 70 + f"\n\nOcorreu um erro ao monitorar o produto. \n\nO produto pode estar sem estoque, a página pode estar indisponível ou a estrutura do site mudou!\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     # Método para realizar a pesquisa do produto na Casas Bahia
     def search_product(self):
@@ -92,72 +99,58 @@ class CasasBahiaPriceBot():
         try:
             for scroll in range(scrolls):
                 self.driver.execute_script("window.scrollBy(0, 200)")
-                sleep(1)  # Espera para a página carregar mais itens
+                self.waiter.network_idle(self.driver)
                     
-                # Verifica novos product cards
-                product_cards = self.driver.find_elements(By.CSS_SELECTOR, "div.css-1enexmx div.styles__ProductCardWrapper-sc-43255755-3")
-                for card in product_cards:
-                    link_element = card.find_element(By.CSS_SELECTOR, "h3.product-card__title a").get_attribute('href')
+                # Verifica novos product cards (todos lidos com uma única chamada ao navegador)
+                for product in extract_listing(self.driver, "casasbahia"):
+                    link_element = product['url']
 
                     if link_element in self.processed_links:
                         continue  # Ignora se o produto já foi processado neste ciclo
 
                     self.processed_links.add(link_element)
-                    title_element = card.find_element(By.CSS_SELECTOR, "h3.product-card__title a")
-                    price_element = card.find_element(By.CSS_SELECTOR, "div.product-card__highlight-price")
-                    title = title_element.text.strip()
-                    price_text = price_element.text.replace('R$', '').replace('.', '').replace(',', '.').strip()
-                    price = float(price_text)
-
-                    product_data = {
-                        "title": title,
-                        "price": price,
-                        "url": link_element
-                    }
+                    title = product['title']
+                    price = product['price']
 
-                    # Verifica se o produto já foi processado antes e se o preço mudou
-                    if link_element in self.product_info:
+                    if price is None:
+                        print(f"Formato de preço inválido para '{title}'")
+                        continue
 
-                        if self.product_info[link_element]['price'] != price:
+                    # Consulta o estado do produto pela chave (busca O(1)) para saber se ele é novo ou se o preço mudou
+                    change = self.product_store.observe(link_element, title, price)
 
-                            self.product_info[link_element]['price'] = price
+                    if change == NEW_PRODUCT:
+                        if self.expected_price == None:
                             
-                            if self.expected_price == None:
+                            self.notifier.submit(self.notify_discord_about_monitoring_new_product(title, price, link_element))
+                                
+                            print(f"Novo Preço encontrado para '{title}' \nPreço: R${price}\n\n")
 
-                                asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_price(title, price, link_element), self.loop)
-                                    
-                                print(f"Preço mudou para '{title}' \nPreço: R${price}\n\n")
+                        elif price <= self.expected_price:
 
-                            elif price <= self.expected_price:
+                            self.notifier.submit(self.notify_discord_about_new_product(title, price, link_element))
 
-                                asyncio.run_coroutine_threadsafe(self.notify_discord_about_change_in_price(title, price, link_element), self.loop)
+                            print(f"Novo Preço encontrado para '{title}' \nPreço: R${price}\n\n")
 
-                                print(f"Preço mudou para '{title}' \nPreço: R${price}\n\n")
-                    else:
-                        # Novo produto encontrado
+                    elif change == PRICE_CHANGED:
                         if self.expected_price == None:
-                            
-                            asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_product(title, price, link_element), self.loop)
+
+                            self.notifier.submit(self.notify_discord_about_monitoring_new_price(title, price, link_element))
                                 
-                            print(f"Novo Preço encontrado para '{title}' \nPreço: R${price}\n\n")
+                            print(f"Preço mudou para '{title}' \nPreço: R${price}\n\n")
 
                         elif price <= self.expected_price:
 
-                            asyncio.run_coroutine_threadsafe(self.notify_discord_about_new_product(title, price, link_element), self.loop)
-
-                            print(f"Novo Preço encontrado para '{title}' \nPreço: R${price}\n\n")
+                            self.notifier.submit(self.notify_discord_about_change_in_price(title, price, link_element))
 
-                    # Atualiza as informações do produto no dicionário
-                    self.product_info[link_element] = product_data
+                            print(f"Preço mudou para '{title}' \nPreço: R${price}\n\n")
                             
-            print(f"Encontrados {len(self.product_info)} produtos.")
+            print(f"Encontrados {len(self.product_store)} produtos.")
 
         except Exception as e:
             print(f"Ocorreu um erro ao buscar produtos: {e}")
 
-        self.priceList = list(self.product_info.values())
-        print(self.priceList)
-        return self.priceList
+        return self.results.recent()
     
     # Método para navegar para a próxima página de resultados
     def next_page(self):
@@ -207,20 +200,19 @@ class CasasBahiaPriceBot():
                 self.restart_driver()
                 self.driver.get(self.url)
                 self.driver.fullscreen_window()
-                sleep(0.7)
+                self.waiter.page_ready(self.driver)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.driver.fullscreen_window() 
                     self.check_prices()
-                    sleep(1)
         
                     if not self.next_page():
                         break
-                    sleep(1)
+                    self.waiter.results_ready(self.driver)
         else:
             for _ in range(self.times):
                 if self.stop_search:
@@ -228,22 +220,21 @@ class CasasBahiaPriceBot():
                 self.restart_driver()
                 self.driver.get(self.url)
                 self.driver.fullscreen_window()
-                sleep(0.7)
+                self.waiter.page_ready(self.driver)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.driver.fullscreen_window() 
                     self.check_prices()
-                    sleep(1)
 
                     if not self.next_page():
                         break
-                    sleep(1)
+                    self.waiter.results_ready(self.driver)
         
-        self.driver.quit()
+        self.release_driver()
 
     
     # Método para realizar a busca de preços de forma síncrona
@@ -253,7 +244,7 @@ class CasasBahiaPriceBot():
                 self.restart_driver()
                 self.driver.get(link)
                 self.driver.fullscreen_window()
-                sleep(0.7)
+                self.waiter.results_ready(self.driver)
 
                 for _ in range(self.pages):
                     if self.stop_search:
@@ -264,11 +255,11 @@ class CasasBahiaPriceBot():
                     
                     # Rola para o final da página após verificar os preços
                     self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    sleep(1)  # Dá tempo para a página carregar após a rolagem
+                    self.waiter.network_idle(self.driver)
 
                     if not self.next_page():
                         break
-                    sleep(1)
+                    self.waiter.results_ready(self.driver)
         else:
             for _ in range(self.times):
                 if self.stop_search:
@@ -276,7 +267,7 @@ class CasasBahiaPriceBot():
                 self.restart_driver()
                 self.driver.get(link)
                 self.driver.fullscreen_window()
-                sleep(0.7)
+                self.waiter.results_ready(self.driver)
 
                 for _ in range(self.pages):
                     if self.stop_search:
@@ -287,17 +278,29 @@ class CasasBahiaPriceBot():
 
                     # Rola para o final da página após verificar os preços
                     self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                    sleep(1)
+                    self.waiter.network_idle(self.driver)
 
                     if not self.next_page():
                         break
-                    sleep(1)
+                    self.waiter.results_ready(self.driver)
         
-        self.driver.quit()
+        self.release_driver()
+
+    # Devolve o navegador atual ao pool e pega outro (reaproveitado, se houver algum livre)
+    def restart_driver(self, recycle=False):
+        self.waiter.next_cycle()
+        driver_pool = get_driver_pool()
+        if recycle:
+            driver_pool.discard(self.driver)
+        else:
+            driver_pool.release(self.driver)
+        self.driver = driver_pool.checkout(self.options, store="casasbahia", should_stop=lambda: self.stop_search)
 
-    def restart_driver(self):
-        self.driver.quit()
-        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=self.options)
+    def release_driver(self):
+        self.results.flush()
+        self.waiter.end_cycle()
+        get_driver_pool().release(self.driver)
+        self.driver = None
 
     # Função para monitorar um link de um produto específico e se o preço dele mudou   
     def check_specific_product(self, link, expected_price):
@@ -307,11 +310,14 @@ class CasasBahiaPriceBot():
         first_notification = True
         in_stock = True
 
+        # Aba do produto mantida aberta entre as verificações
+        watcher = start_watcher(self, "casasbahia", link)
+
         while not self.stop_search:
             try:
-                self.restart_driver()
-                self.driver.get(link)
-                sleep(1)
+                # Abre a página do produto na primeira volta; nas seguintes espera o intervalo e atualiza a mesma aba
+                watcher.load()
+                self.waiter.product_ready(self.driver)
             except TimeoutException:
                 print(f"Timeout ao carregar {link}, tentando recarregar.")
                 try:
@@ -322,27 +328,40 @@ class CasasBahiaPriceBot():
                 continue
 
             try:
-                # Localizando o título do produto com o novo seletor CSS
-                title_element = self.driver.find_element(By.CSS_SELECTOR, "h1.dsvia-heading.css-1xmpwke")
-                title = title_element.text
-
-                # Localizando o preço do produto com o novo seletor CSS
-                price_element = self.driver.find_element(By.CSS_SELECTOR, "p.dsvia-text.css-1luipqs")
-                price_text = price_element.text.replace('R$', '').replace('.', '').replace(',', '.').strip()
-                price = float(price_text)
+                # Tenta primeiro os dados estruturados (JSON-LD/microdata) da página; os seletores ficam como alternativa
+                product = page_structured_product(self.driver, "casasbahia")
+
+                if product is not None and not product["available"]:
+                    raise NoSuchElementException("Produto indisponível")
+
+                if product is not None:
+                    title = product["title"]
+                    price = product["preço"]
+                else:
+                    # Localizando o título do produto com o novo seletor CSS
+                    title_element = self.driver.find_element(By.CSS_SELECTOR, "h1.dsvia-heading.css-1xmpwke")
+                    title = title_element.text
+
+                    # Localizando o preço do produto com o novo seletor CSS
+                    price_element = self.driver.find_element(By.CSS_SELECTOR, "p.dsvia-text.css-1luipqs")
+                    price_text = price_element.text.replace('R$', '').replace('.', '').replace(',', '.').strip()
+                    price = float(price_text)
 
                 print(f"Preço encontrado para '{title}' \nPreço: R${price}\n\n")
 
+                # Guarda o preço no histórico (a gravação acontece em segundo plano)
+                self.price_history.record("casasbahia", link, title, price)
+
                 if last_price is None:
                     last_price = price
 
                 if first_notification:
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_product(title, price, link), self.loop)
+                    self.notifier.submit(self.notify_discord_about_monitoring_new_product(title, price, link))
                     first_notification = False
 
                 # Condição modificada para enviar notificação apenas quando o preço diminuir ou for menor que o esperado
                 if price < last_price or (price < expected_price and not notified_for_price_drop):
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_price(title, price, link), self.loop)
+                    self.notifier.submit(self.notify_discord_about_monitoring_new_price(title, price, link))
                     print(f"Preço encontrado para '{title}' \nPreço: R${price}\n\n")
                     last_price = price  # Atualiza o último preço verificado
                     notified_for_price_drop = True
@@ -352,15 +371,17 @@ class CasasBahiaPriceBot():
             except NoSuchElementException:
                 print(f"Não foi possível encontrar o título ou preço para a URL: {link}")
                 if in_stock:
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_error(), self.loop)
+                    self.notifier.submit(self.notify_discord_about_error())
                     in_stock = False    
                 continue
 
-            except WebDriverException as e:
-                if "Out of Memory" in str(e):
-                    print("Detectado erro 'Out of Memory'. Reiniciando o driver...")
-                    self.restart_driver()
+            except WebDriverException:
+                # Troca o navegador se ele parou de responder ou passou dos limites de memória/CPU (botUtils/resourceMonitor.py)
+                if get_driver_pool().needs_recycle(self.driver):
+                    self.restart_driver(recycle=True)
 
+        stop_watcher(watcher)
+        self.release_driver()
 
     async def search_specific_product(self, link, expected_price):
         await asyncio.get_event_loop().run_in_executor(None, self.check_specific_product, link, expected_price)
@@ -371,8 +392,7 @@ class CasasBahiaPriceBot():
     async def search_link_prices(self, link):
         await asyncio.get_event_loop().run_in_executor(None, self.check_link_prices, link)
 
-    # Método para salvar os dados em um arquivo CSV
+    # Método para gravar no arquivo de resultados as linhas que ainda estão em memória
     def data_to_csv(self):
-        df = pd.DataFrame(self.priceList)
-        df = df.dropna(how='all')
-        df.to_csv(f"{self.search_query}.csv", index=False)
\ No newline at end of file
+        self.results.flush()
+        return self.results.path
\ No newline at end of file
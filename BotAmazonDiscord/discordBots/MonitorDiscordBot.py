@@ -1,131 +1,127 @@
+import importlib
 import re
 import asyncio
 
 from discord.ext import commands
 
-from amazonPriceBot.amazonPriceBot import AmazonPriceBot
-from kabumPriceBot.kabumPriceBot import KabumPriceBot
-from americanasPriceBot.americanasPriceBot import AmericanasPriceBot
-from aliexpressPriceBot.aliexpressPriceBot import AliExpressPriceBot
-from casasbahiaPriceBot.casasbahiaPriceBot import CasasBahiaPriceBot
-from terabytePriceBot.terabytePriceBot import TerabytePriceBot
-from carrefourPriceBot.carrefourPriceBot import CarrefourPriceBot
-from pichauPriceBot.pichauPriceBot import PichauPriceBot
-from mercadoLivrePriceBot.mercadoLivrePriceBot import MercadoLivrePriceBot
-from pontofrioPriceBot.pontofrioPriceBot import PontoFrioPriceBot
-from extraPriceBot.extraPriceBot import ExtraPriceBot
-from magazineluizaPriceBot.magazineLuizaPriceBot import MagazineLuizaPriceBot
-from fastPriceBot.fastPriceBot import FastPriceBot
+from discordBots.jobRegistry import get_job_registry, JobLimitError
+from discordBots.storeRegistry import find_store, load_store
 
+from time import time
 
-class MonitorDiscordBot(commands.Bot):
-    def __init__(self, command_prefix, intents):
-        super().__init__(command_prefix=command_prefix, intents=intents)
-
-        self.amazon_bot_instance = None
-
-        self.kabum_bot_instance = None
-
-        self.americanas_bot_instance = None
-
-        self.ali_express_bot_instance = None
+# Momento em que o processo começou a carregar o bot (para medir o tempo até o on_ready)
+started_at = time()
 
-        self.casas_bahia_bot_instance = None
 
-        self.terabyte_bot_instance = None
-
-        self.carrefour_bot_instance = None
-
-        self.pichau_bot_instance = None
-
-        self.mercado_livre_bot_instance = None
-
-        self.ponto_frio_bot_instance = None
+class MonitorDiscordBot(commands.Bot):
+    def __init__(self, command_prefix, intents, name=None, channels=None):
+        super().__init__(command_prefix=command_prefix, intents=intents)
 
-        self.extra_bot_instance = None
+        self.name = name or "monitor"  # Nome do tenant no runner (usado nos relatórios)
 
-        self.magazine_luiza_bot_instance = None
+        self.channels = set(channels) if channels else None  # Canais atendidos por este bot (None = todos)
 
-        self.fast_bot_instance = None
-        
+        self.jobs = get_job_registry()  # Buscas em andamento (compartilhado por todos os tenants do processo)
 
     async def on_ready(self):
-        print(f"Bot está pronto, estou conectado como {self.user}")
-
-    async def on_message(self, message):
-        if message.author == self.user:
-            return
+        print(f"Bot está pronto, estou conectado como {self.user} ({time() - started_at:.1f}s após o início)")
 
-        # Comando para parar a busca
-        if message.content in ['!stop', '!parar']:
+    # Retorna a loja citada no site e a classe do bot dela, importando o módulo da loja no primeiro uso.
+    # A importação roda fora do loop para não travar o gateway do Discord
+    async def load_store(self, message, site):
+        store = find_store(site)
 
-            if self.amazon_bot_instance:
-                self.amazon_bot_instance.stop_searching()
+        if store is None:
+            await message.channel.send(f"O site {site} não é suportado.")
+            return None, None
 
-            if self.kabum_bot_instance:
-                self.kabum_bot_instance.stop_searching()
+        try:
+            bot_class = await asyncio.get_running_loop().run_in_executor(None, load_store, store)
+        except Exception as e:
+            print(f"Erro ao carregar a loja {store}: {e}")
+            await message.channel.send(f"Não foi possível carregar a loja {store}.")
+            return store, None
 
-            if self.americanas_bot_instance:
-                self.americanas_bot_instance.stop_searching()
+        return store, bot_class
 
-            if self.ali_express_bot_instance: 
-                self.ali_express_bot_instance.stop_searching()
+    # Bots das lojas com busca ativa neste tenant: {id da busca: instância}
+    def store_bots(self):
+        return {job.id: job.bot for job in self.jobs.list(tenant=self.name)}
 
-            if self.casas_bahia_bot_instance:
-                self.casas_bahia_bot_instance.stop_searching()
+    # Registra a busca, executa no pool de buscas e espera ela terminar (sem bloquear o loop)
+    async def run_job(self, message, store, mode, bot, function, *args):
+        try:
+            job = self.jobs.start(message.author, self.name, store, mode, bot, function, *args)
+        except JobLimitError as e:
+            await message.channel.send(str(e))
+            return None
 
-            if self.terabyte_bot_instance:
-                self.terabyte_bot_instance.stop_searching()
+        await message.channel.send(f"Busca #{job.id} iniciada. Use !parar {job.id} para interrompê-la.")
 
-            if self.carrefour_bot_instance:
-                self.carrefour_bot_instance.stop_searching()
+        await self.jobs.wait(job)
 
-            if self.pichau_bot_instance:
-                self.pichau_bot_instance.stop_searching()
+        if job.error is not None:
+            await message.channel.send(f"A busca #{job.id} foi encerrada por um erro: {job.error}")
 
-            if self.mercado_livre_bot_instance:
-                self.mercado_livre_bot_instance.stop_searching()
+        return job
 
-            if self.ponto_frio_bot_instance:
-                self.ponto_frio_bot_instance.stop_searching()
+    # Importa a watchlist no primeiro uso, fora do loop: ela carrega o selenium e o pool de navegadores,
+    # que só devem ser carregados quando alguma loja é usada
+    async def load_watchlist(self):
+        return await asyncio.get_running_loop().run_in_executor(None, importlib.import_module, "botUtils.watchlist")
 
-            if self.extra_bot_instance:
-                self.extra_bot_instance.stop_searching()
-            
-            if self.magazine_luiza_bot_instance:
-                self.magazine_luiza_bot_instance.stop_searching()
+    # Coloca o produto na watchlist (varreduras compartilhadas por todos os produtos da loja) e espera o monitoramento terminar
+    async def run_watch(self, message, store, bot, link, expected_price):
+        watchlist = await self.load_watchlist()
+        entry = watchlist.WatchlistEntry(store, bot, link, expected_price)
 
-            if self.fast_bot_instance:
-                self.fast_bot_instance.stop_searching()
+        try:
+            job = self.jobs.track(message.author, self.name, store, "produto", entry, entry.future)
+        except JobLimitError as e:
+            entry.finish()
+            await message.channel.send(str(e))
+            return None
 
-            await message.channel.send("Busca interrompida.")
+        watchlist.get_watchlist().add(entry)
 
-            # Resetar as instâncias para None depois de parar
-            self.amazon_bot_instance = None
+        await message.channel.send(f"Busca #{job.id} iniciada. Use !parar {job.id} para interrompê-la.")
 
-            self.kabum_bot_instance = None
+        await self.jobs.wait(job)
 
-            self.americanas_bot_instance = None
+        return job
 
-            self.ali_express_bot_instance = None
-
-            self.casas_bahia_bot_instance = None
-
-            self.terabyte_bot_instance = None
+    async def on_message(self, message):
+        if message.author == self.user:
+            return
 
-            self.carrefour_bot_instance = None
+        if self.channels is not None and message.channel.id not in self.channels:
+            return
 
-            self.pichau_bot_instance = None
+        # Comando para listar as buscas ativas do usuário
+        if message.content in ['!buscas', '!jobs']:
+            jobs = self.jobs.list(message.author.id, self.name)
 
-            self.mercado_livre_bot_instance = None
+            if not jobs:
+                await message.channel.send("Você não tem buscas ativas.")
+            else:
+                await message.channel.send("\n".join(job.describe() for job in jobs))
 
-            self.ponto_frio_bot_instance = None
+            return
 
-            self.extra_bot_instance = None
+        # Comando para parar uma busca específica (!parar 3) ou todas as buscas do usuário (!parar)
+        stop_match = re.fullmatch(r"!(?:stop|parar)(?:\s+#?(\d+))?", message.content.strip())
+        if stop_match:
 
-            self.magazine_luiza_bot_instance = None
+            if stop_match.group(1):
+                job = self.jobs.stop(int(stop_match.group(1)), message.author.id)
+                stopped = [job] if job else []
+            else:
+                stopped = self.jobs.stop_all(message.author.id, self.name)
 
-            self.fast_bot_instance = None
+            if stopped:
+                await message.channel.send(f"Busca interrompida: {', '.join(f'#{job.id}' for job in stopped)}.")
+            else:
+                await message.channel.send("Nenhuma busca ativa encontrada para interromper.")
 
             return
 
@@ -146,96 +142,14 @@ class MonitorDiscordBot(commands.Bot):
 
             await message.channel.send(f"Olá, {message.author.name}! Começando a busca pelos preços do produto {product} abaixo de R${price} no site {site}.{repeat_message}")
 
-            if "amazon" in site:
-                loop = asyncio.get_running_loop()
-
-                self.amazon_bot_instance = AmazonPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.amazon_bot_instance.search_prices()
-            
-            elif "kabum" in site:
-                loop = asyncio.get_running_loop()
-
-                self.kabum_bot_instance = KabumPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.kabum_bot_instance.search_prices()
-
-            elif "americanas" in site:
-                loop = asyncio.get_running_loop()
-
-                self.americanas_bot_instance = AmericanasPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.americanas_bot_instance.search_prices()
-
-            elif "aliexpress" in site:
-                loop = asyncio.get_running_loop()
-
-                self.ali_express_bot_instance = AliExpressPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.ali_express_bot_instance.search_prices()
-
-            elif "casasbahia" in site:
-                loop = asyncio.get_running_loop()
-
-                self.casas_bahia_bot_instance = CasasBahiaPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.casas_bahia_bot_instance.search_prices()
-
-            elif "terabyte" in site:
-                loop = asyncio.get_running_loop()
-
-                self.terabyte_bot_instance = TerabytePriceBot(product, price, pages, message.author, loop, times)
+            loop = asyncio.get_running_loop()
 
-                await self.terabyte_bot_instance.search_prices()
+            store, bot_class = await self.load_store(message, site)
 
-            elif "carrefour" in site:
-                loop = asyncio.get_running_loop()
-
-                self.carrefour_bot_instance = CarrefourPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.carrefour_bot_instance.search_prices()
-
-            elif "pichau" in site:
-                loop = asyncio.get_running_loop()
+            if bot_class is not None:
+                bot = bot_class(product, price, pages, message.author, loop, times)
 
-                self.pichau_bot_instance = PichauPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.pichau_bot_instance.search_prices()
-
-            elif "mercadolivre" in site:
-                loop = asyncio.get_running_loop()
-
-                self.mercado_livre_bot_instance = MercadoLivrePriceBot(product, price, pages, message.author, loop, times)
-
-                await self.mercado_livre_bot_instance.search_prices()
-
-            elif "pontofrio" in site:
-                loop = asyncio.get_running_loop()
-
-                self.ponto_frio_bot_instance = PontoFrioPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.ponto_frio_bot_instance.search_prices()
-
-            elif "extra" in site:
-                loop = asyncio.get_running_loop()
-
-                self.extra_bot_instance = ExtraPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.extra_bot_instance.search_prices()
-            
-            elif "magazineluiza" in site:
-                loop = asyncio.get_running_loop()
-
-                self.magazine_luiza_bot_instance = MagazineLuizaPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.magazine_luiza_bot_instance.search_prices()
-
-            elif "fast" in site:
-                loop = asyncio.get_running_loop()
-
-                self.fast_bot_instance = FastPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.fast_bot_instance.search_prices()
+                await self.run_job(message, store, "busca", bot, bot.search_prices_sync)
 
             await self.process_commands(message)
 
@@ -254,96 +168,14 @@ class MonitorDiscordBot(commands.Bot):
 
             await message.channel.send(f"Monitorando produtos no {site} com {pages} páginas e repetindo {times} vezes.")
 
-            if "kabum" in site:
-                loop = asyncio.get_running_loop()
-
-                self.kabum_bot_instance = KabumPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.kabum_bot_instance.search_link_prices(link)
-
-            elif "amazon" in site:
-                loop = asyncio.get_running_loop()
+            loop = asyncio.get_running_loop()
 
-                self.amazon_bot_instance = AmazonPriceBot(product, price, pages, message.author, loop, times)
+            store, bot_class = await self.load_store(message, site)
 
-                await self.amazon_bot_instance.search_link_prices(link)
-            
-            elif "americanas" in site:
-                loop = asyncio.get_running_loop()
-
-                self.americanas_bot_instance = AmericanasPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.americanas_bot_instance.search_link_prices(link)
-
-            elif "aliexpress" in site:
-                loop = asyncio.get_running_loop()
+            if bot_class is not None:
+                bot = bot_class(product, price, pages, message.author, loop, times)
 
-                self.ali_express_bot_instance = AliExpressPriceBot(product, price, pages, message.author, loop, times)
-                
-                await self.ali_express_bot_instance.search_link_prices(link)
-
-            elif "casasbahia" in site:
-                loop = asyncio.get_running_loop()
-
-                self.casas_bahia_bot_instance = CasasBahiaPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.casas_bahia_bot_instance.search_link_prices(link)
-
-            elif "terabyte" in site:
-                loop = asyncio.get_running_loop()
-
-                self.terabyte_bot_instance = TerabytePriceBot(product, price, pages, message.author, loop, times)
-
-                await self.terabyte_bot_instance.search_link_prices(link)
-
-            elif "carrefour" in site:
-                loop = asyncio.get_running_loop()
-
-                self.carrefour_bot_instance = CarrefourPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.carrefour_bot_instance.search_link_prices(link)
-
-            elif "pichau" in site:
-                loop = asyncio.get_running_loop()
-
-                self.pichau_bot_instance = PichauPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.pichau_bot_instance.search_link_prices(link)
-
-            elif "mercadolivre" in site:
-                loop = asyncio.get_running_loop()
-
-                self.mercado_livre_bot_instance = MercadoLivrePriceBot(product, price, pages, message.author, loop, times)
-
-                await self.mercado_livre_bot_instance.search_link_prices(link)
-
-            elif "pontofrio" in site:
-                loop = asyncio.get_running_loop()
-
-                self.ponto_frio_bot_instance = PontoFrioPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.ponto_frio_bot_instance.search_link_prices(link)
-
-            elif "extra" in site:
-                loop = asyncio.get_running_loop()
-
-                self.extra_bot_instance = ExtraPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.extra_bot_instance.search_link_prices(link)
-
-            elif "magazineluiza" in site:
-                loop = asyncio.get_running_loop()
-
-                self.magazine_luiza_bot_instance = MagazineLuizaPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.magazine_luiza_bot_instance.search_link_prices(link)
-
-            elif "fast" in site:
-                loop = asyncio.get_running_loop()
-
-                self.fast_bot_instance = FastPriceBot(product, price, pages, message.author, loop, times)
-
-                await self.fast_bot_instance.search_link_prices(link)
+                await self.run_job(message, store, "listagem", bot, bot.check_link_prices, link)
 
             await self.process_commands(message)
 
@@ -362,96 +194,19 @@ class MonitorDiscordBot(commands.Bot):
 
             await message.channel.send(f"Olá, {message.author.name}! Monitorando o produto no {site} por {times} vezes.")
 
-            if "kabum" in site:
-                loop = asyncio.get_running_loop()
-
-                self.kabum_bot_instance = KabumPriceBot(product, price, None, message.author, loop, times)
+            loop = asyncio.get_running_loop()
 
-                await self.kabum_bot_instance.search_specific_product(link_produto, preco_limite)
-            
-            elif "amazon" in site:
-                loop = asyncio.get_running_loop()
+            store, bot_class = await self.load_store(message, site)
 
-                self.amazon_bot_instance = AmazonPriceBot(product, price, None, message.author, loop, times)
-
-                await self.amazon_bot_instance.search_specific_product(link_produto, preco_limite)
-            
-            elif "americanas" in site:
-                loop = asyncio.get_running_loop()
+            if bot_class is not None:
+                bot = bot_class(product, price, None, message.author, loop, times)
 
-                self.americanas_bot_instance = AmericanasPriceBot(product, price, None, message.author, loop, times)
+                watchlist = await self.load_watchlist()
 
-                await self.americanas_bot_instance.search_specific_product(link_produto, preco_limite)   
-
-            elif "aliexpress" in site:
-                loop = asyncio.get_running_loop()
-
-                self.ali_express_bot_instance = AliExpressPriceBot(product, price, None, message.author, loop, times)
-                
-                await self.ali_express_bot_instance.search_specific_product(link_produto, preco_limite)   
-
-            elif "casasbahia" in site:
-                loop = asyncio.get_running_loop()
-
-                self.casas_bahia_bot_instance = CasasBahiaPriceBot(product, price, None, message.author, loop, times)
-
-                await self.casas_bahia_bot_instance.search_specific_product(link_produto, preco_limite)
-
-            elif "terabyte" in site:
-                loop = asyncio.get_running_loop()
-
-                self.terabyte_bot_instance = TerabytePriceBot(product, price, None, message.author, loop, times)
-
-                await self.terabyte_bot_instance.search_specific_product(link_produto, preco_limite)
-
-            elif "carrefour" in site:
-                loop = asyncio.get_running_loop()
-
-                self.carrefour_bot_instance = CarrefourPriceBot(product, price, None, message.author, loop, times)
-
-                await self.carrefour_bot_instance.search_specific_product(link_produto, preco_limite)
-
-            elif "pichau" in site:
-                loop = asyncio.get_running_loop()
-
-                self.pichau_bot_instance = PichauPriceBot(product, price, None, message.author, loop, times)
-
-                await self.pichau_bot_instance.search_specific_product(link_produto, preco_limite)      
-
-            elif "mercadolivre" in site:
-                loop = asyncio.get_running_loop()
-
-                self.mercado_livre_bot_instance = MercadoLivrePriceBot(product, price, None, message.author, loop, times)
-
-                await self.mercado_livre_bot_instance.search_specific_product(link_produto, preco_limite)      
-
-            elif "pontofrio" in site:
-                loop = asyncio.get_running_loop()
-
-                self.ponto_frio_bot_instance = PontoFrioPriceBot(product, price, None, message.author, loop, times)
-
-                await self.ponto_frio_bot_instance.search_specific_product(link_produto, preco_limite)
-
-            elif "extra" in site:
-                loop = asyncio.get_running_loop()
-
-                self.extra_bot_instance = ExtraPriceBot(product, price, None, message.author, loop, times)
-
-                await self.extra_bot_instance.search_specific_product(link_produto, preco_limite)
-
-            elif "magazineluiza" in site:
-                loop = asyncio.get_running_loop()
-
-                self.magazine_luiza_bot_instance = MagazineLuizaPriceBot(product, price, None, message.author, loop, times)
-
-                await self.magazine_luiza_bot_instance.search_specific_product(link_produto, preco_limite)
-
-            elif "fast" in site:
-                loop = asyncio.get_running_loop()
-
-                self.fast_bot_instance = FastPriceBot(product, price, None, message.author, loop, times)
-
-                await self.fast_bot_instance.search_specific_product(link_produto, preco_limite)
+                if watchlist.watchlist_supports(store):
+                    await self.run_watch(message, store, bot, link_produto, preco_limite)
+                else:
+                    await self.run_job(message, store, "produto", bot, bot.check_specific_product, link_produto, preco_limite)
 
             await self.process_commands(message) 
 
@@ -469,9 +224,12 @@ class MonitorDiscordBot(commands.Bot):
             if "aliexpress" in site:
                 loop = asyncio.get_running_loop()
 
-                self.ali_express_bot_instance = AliExpressPriceBot(None, None, None, message.author, loop, None)
+                store, bot_class = await self.load_store(message, "aliexpress")
+
+                if bot_class is not None:
+                    bot = bot_class(None, None, None, message.author, loop, None)
 
-                await self.ali_express_bot_instance.search_for_coupons(urls)
+                    await self.run_job(message, "aliexpress", "cupons", bot, bot.find_coupons, urls)
 
 
             await self.process_commands(message) 
\ No newline at end of file
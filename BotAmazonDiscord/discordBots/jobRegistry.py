@@ -0,0 +1,225 @@
+import concurrent.futures
+import itertools
+import threading
+import asyncio
+import os
+
+from time import time
+
+from botUtils.metrics import get_metrics, set_job_context, clear_job_context, count_error, format_job_summary
+
+# Quantidade máxima de buscas ativas de um mesmo usuário
+JOB_MAX_PER_USER = int(os.getenv("JOB_MAX_PER_USER", "3"))
+
+# Quantidade máxima de buscas ativas no processo (também é o tamanho do pool de threads das buscas)
+JOB_MAX_TOTAL = int(os.getenv("JOB_MAX_TOTAL", "16"))
+
+# Quantidade máxima de produtos de um mesmo usuário na watchlist (eles não ocupam threads nem navegadores próprios)
+JOB_MAX_WATCHES_PER_USER = int(os.getenv("JOB_MAX_WATCHES_PER_USER", "50"))
+
+# Estados de uma busca
+RUNNING = "executando"
+STOPPING = "parando"
+FINISHED = "concluída"
+STOPPED = "interrompida"
+FAILED = "falhou"
+
+
+class JobLimitError(Exception):
+    pass
+
+
+# Uma busca iniciada por um usuário do Discord
+class Job():
+    def __init__(self, job_id, owner, tenant, store, mode, bot):
+        self.id = job_id
+        self.owner_id = owner.id
+        self.owner_name = getattr(owner, "name", str(owner.id))
+        self.tenant = tenant
+        self.store = store
+        self.mode = mode  # "busca", "listagem", "produto" ou "cupons"
+        self.bot = bot
+        self.tracked = False  # Busca executada fora do pool de threads (ex.: produto na watchlist)
+        self.state = RUNNING
+        self.error = None
+        self.future = None
+        self.created_at = time()
+        self.finished_at = None
+
+    def is_active(self):
+        return self.state in (RUNNING, STOPPING)
+
+    def describe(self):
+        elapsed = (self.finished_at or time()) - self.created_at
+        description = f"#{self.id} {self.store} ({self.mode}) de {self.owner_name}: {self.state} há {elapsed / 60:.0f} min"
+        summary = format_job_summary(self.id)
+        return f"{description} | {summary}" if summary else description
+
+
+# Registro das buscas do processo. Cada busca recebe um ID, respeita os limites por usuário e
+# global e roda em um pool de threads próprio, separado do executor padrão usado pelo discord.py,
+# então buscas longas nunca ocupam as threads de que o loop do gateway precisa.
+class JobRegistry():
+    def __init__(self, max_per_user=JOB_MAX_PER_USER, max_total=JOB_MAX_TOTAL, max_watches_per_user=JOB_MAX_WATCHES_PER_USER):
+        self.max_per_user = max_per_user
+        self.max_total = max_total
+        self.max_watches_per_user = max_watches_per_user
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_total, thread_name_prefix="store-job")
+        self.jobs = {}  # {id: Job}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.supervisor_attached = False
+
+    # Registra a busca e começa a executar function(*args) no pool das buscas.
+    # Lança JobLimitError se o usuário ou o processo já estiverem no limite de buscas ativas
+    def start(self, owner, tenant, store, mode, bot, function, *args):
+        job = self.register(owner, tenant, store, mode, bot)
+        job.future = self.executor.submit(self.run, job, function, *args)
+        job.future.add_done_callback(lambda future: self.finish(job, future))
+        return job
+
+    # Executa a busca com o ID e a loja dela no contexto da thread, para as métricas das etapas
+    def run(self, job, function, *args):
+        self.attach_supervisor()
+        set_job_context(job.id, job.store)
+        try:
+            return function(*args)
+        finally:
+            clear_job_context()
+
+    # Liga o supervisor dos navegadores ao registro, para ele fechar os navegadores emprestados para buscas que
+    # já terminaram. Feito na primeira busca (na thread dela): importar o pool carrega o selenium e o psutil
+    def attach_supervisor(self):
+        if self.supervisor_attached:
+            return
+
+        from botUtils.driverPool import get_driver_pool
+
+        get_driver_pool().supervisor.job_active = self.is_active
+        self.supervisor_attached = True
+
+    # Registra uma busca que roda fora do pool das buscas (ex.: um produto na watchlist) e acompanha o future dela.
+    # Essas buscas têm um limite próprio por usuário e não contam nos limites das buscas com thread própria
+    def track(self, owner, tenant, store, mode, bot, future):
+        job = self.register(owner, tenant, store, mode, bot, tracked=True)
+        job.future = future
+        future.add_done_callback(lambda future: self.finish(job, future))
+        return job
+
+    def register(self, owner, tenant, store, mode, bot, tracked=False):
+        with self.lock:
+            active = [job for job in self.jobs.values() if job.is_active() and job.tracked == tracked]
+
+            if tracked:
+                if sum(1 for job in active if job.owner_id == owner.id) >= self.max_watches_per_user:
+                    raise JobLimitError(f"Você já tem {self.max_watches_per_user} produtos monitorados. Use !parar <id> para encerrar algum.")
+            else:
+                if len(active) >= self.max_total:
+                    raise JobLimitError(f"O limite de {self.max_total} buscas simultâneas foi atingido. Tente novamente mais tarde.")
+
+                if sum(1 for job in active if job.owner_id == owner.id) >= self.max_per_user:
+                    raise JobLimitError(f"Você já tem {self.max_per_user} buscas ativas. Use !parar <id> para encerrar alguma.")
+
+            job = Job(next(self.ids), owner, tenant, store, mode, bot)
+            job.tracked = tracked
+            self.jobs[job.id] = job
+
+        return job
+
+    def finish(self, job, future):
+        with self.lock:
+            job.finished_at = time()
+            error = future.exception()
+
+            # Uma busca interrompida pelo !parar pode terminar com erro (ex.: desistiu de esperar um navegador livre)
+            if error is not None and job.state != STOPPING:
+                job.state = FAILED
+                job.error = error
+                count_error(error, job.store)
+                print(f"Busca {job.describe()}: {error}")
+            elif job.state == STOPPING:
+                job.state = STOPPED
+            else:
+                job.state = FINISHED
+
+            self.prune()
+
+        if job.tracked:
+            return
+
+        # Fecha o navegador que a busca não devolveu ao pool (ex.: terminou com uma exceção). Fica fora do lock:
+        # fechar o navegador e encerrar os processos dele pode levar alguns segundos
+        from botUtils.driverPool import get_driver_pool
+
+        get_driver_pool().reclaim(job.id)
+
+        summary = format_job_summary(job.id)
+        if summary:
+            print(f"Busca #{job.id} ({job.store}) encerrada. Etapas mais demoradas: {summary}")
+
+    def is_active(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return job is not None and job.is_active()
+
+    # Mantém só as buscas ativas e as 100 encerradas mais recentes
+    def prune(self):
+        finished = [job for job in self.jobs.values() if not job.is_active()]
+        for job in finished[:-100]:
+            del self.jobs[job.id]
+            get_metrics().forget_job(job.id)
+
+    # Espera a busca terminar sem bloquear o loop de eventos
+    async def wait(self, job):
+        try:
+            await asyncio.wrap_future(job.future)
+        except Exception:
+            pass
+        return job
+
+    # Pede para a busca parar. Só o dono da busca pode pará-la
+    def stop(self, job_id, owner_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.owner_id != owner_id or job.state != RUNNING:
+                return None
+            job.state = STOPPING
+
+        job.bot.stop_searching()
+        return job
+
+    # Para todas as buscas ativas do usuário (no tenant informado)
+    def stop_all(self, owner_id, tenant=None):
+        return [job for job in self.list(owner_id, tenant) if self.stop(job.id, owner_id)]
+
+    def list(self, owner_id=None, tenant=None, active_only=True):
+        with self.lock:
+            return [
+                job for job in self.jobs.values()
+                if (owner_id is None or job.owner_id == owner_id)
+                and (tenant is None or job.tenant == tenant)
+                and (job.is_active() or not active_only)
+            ]
+
+    def stats(self):
+        with self.lock:
+            jobs = list(self.jobs.values())
+        states = {}
+        for job in jobs:
+            states[job.state] = states.get(job.state, 0) + 1
+        return {"max_total": self.max_total, "max_per_user": self.max_per_user, "max_watches_per_user": self.max_watches_per_user, "states": states}
+
+
+job_registry = None
+job_registry_lock = threading.Lock()
+
+
+# Retorna o registro único do processo, criando-o na primeira chamada
+def get_job_registry():
+    global job_registry
+
+    with job_registry_lock:
+        if job_registry is None:
+            job_registry = JobRegistry()
+
+    return job_registry
@@ -0,0 +1,69 @@
+import importlib
+import threading
+
+from time import time
+
+# Lojas disponíveis nos comandos: (nome usado no comando, módulo, classe do bot).
+# A ordem é a ordem em que o nome do site é procurado no texto do comando
+STORES = [
+    ("amazon", "amazonPriceBot.amazonPriceBot", "AmazonPriceBot"),
+    ("kabum", "kabumPriceBot.kabumPriceBot", "KabumPriceBot"),
+    ("americanas", "americanasPriceBot.americanasPriceBot", "AmericanasPriceBot"),
+    ("aliexpress", "aliexpressPriceBot.aliexpressPriceBot", "AliExpressPriceBot"),
+    ("casasbahia", "casasbahiaPriceBot.casasbahiaPriceBot", "CasasBahiaPriceBot"),
+    ("terabyte", "terabytePriceBot.terabytePriceBot", "TerabytePriceBot"),
+    ("carrefour", "carrefourPriceBot.carrefourPriceBot", "CarrefourPriceBot"),
+    ("pichau", "pichauPriceBot.pichauPriceBot", "PichauPriceBot"),
+    ("mercadolivre", "mercadoLivrePriceBot.mercadoLivrePriceBot", "MercadoLivrePriceBot"),
+    ("pontofrio", "pontofrioPriceBot.pontofrioPriceBot", "PontoFrioPriceBot"),
+    ("extra", "extraPriceBot.extraPriceBot", "ExtraPriceBot"),
+    ("magazineluiza", "magazineluizaPriceBot.magazineLuizaPriceBot", "MagazineLuizaPriceBot"),
+    ("fast", "fastPriceBot.fastPriceBot", "FastPriceBot"),
+]
+
+# Classes já importadas: {nome da loja: classe}
+loaded_stores = {}
+
+# Tempo (em segundos) que cada loja levou para ser importada
+load_times = {}
+
+stores_lock = threading.Lock()
+
+
+# Retorna o nome da loja citada no site do comando (ou None se nenhuma loja conhecida foi citada)
+def find_store(site):
+    for name, module, class_name in STORES:
+        if name in site:
+            return name
+    return None
+
+
+# Importa o módulo da loja na primeira vez que ela é usada e retorna a classe do bot.
+# Assim o processo só carrega as dependências (selenium, seleniumwire, pyautogui...) das lojas usadas
+def load_store(name):
+    with stores_lock:
+        if name in loaded_stores:
+            return loaded_stores[name]
+
+        for store, module, class_name in STORES:
+            if store == name:
+                break
+        else:
+            raise KeyError(f"Loja desconhecida: {name}")
+
+        started_at = time()
+        bot_class = getattr(importlib.import_module(module), class_name)
+        load_times[name] = time() - started_at
+        loaded_stores[name] = bot_class
+
+        print(f"Loja {name} carregada em {load_times[name]:.2f}s")
+        return bot_class
+
+
+def stats():
+    with stores_lock:
+        return {
+            "available": [name for name, module, class_name in STORES],
+            "loaded": sorted(loaded_stores),
+            "load_seconds": dict(load_times),
+        }
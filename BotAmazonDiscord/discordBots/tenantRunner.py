@@ -0,0 +1,154 @@
+import threading
+import asyncio
+import discord
+import json
+import os
+
+from discordBots.MonitorDiscordBot import MonitorDiscordBot
+from discordBots.jobRegistry import get_job_registry
+from botUtils.notifications import get_notification_queue
+from botUtils.metrics import start_metrics_server
+
+# Arquivo com os tenants hospedados pelo runner
+TENANTS_FILE = os.getenv("TENANTS_FILE", "tenants.json")
+
+# Intervalo (em segundos) entre os relatórios de uso de recursos por tenant
+REPORT_INTERVAL = int(os.getenv("RUNNER_REPORT_INTERVAL", "300"))
+
+
+# Lê os tenants do arquivo de configuração. Cada tenant tem um nome, a variável de ambiente com o
+# token do bot do Discord ("token_env") e, opcionalmente, os canais que ele atende ("channels").
+# Sem arquivo, o runner hospeda um único tenant com o BOT_ID, como o main.py.
+def load_tenants(path=TENANTS_FILE):
+    if not os.path.exists(path):
+        return [{"name": "monitor", "token_env": "BOT_ID"}]
+
+    with open(path, encoding="utf-8") as file:
+        tenants = json.load(file)
+
+    for tenant in tenants:
+        if "name" not in tenant:
+            raise ValueError(f"Tenant sem nome em {path}: {tenant}")
+        tenant.setdefault("token_env", "BOT_ID")
+
+    return tenants
+
+
+# Agrupa os tenants pelo token: tenants com o mesmo token dividem a mesma conexão com o Discord
+def group_by_token(tenants):
+    groups = {}
+
+    for tenant in tenants:
+        token = tenant.get("token") or os.getenv(tenant["token_env"])
+        if not token:
+            print(f"Tenant '{tenant['name']}' ignorado: variável {tenant['token_env']} não definida")
+            continue
+        groups.setdefault(token, []).append(tenant)
+
+    return groups
+
+
+# Hospeda todos os tenants em um único processo: um só interpretador, um só loop de eventos,
+# um só pool de navegadores, uma só fila de notificações e uma conexão com o Discord por token.
+class TenantRunner():
+    def __init__(self, tenants):
+        self.tenants = tenants
+        self.bots = []  # [(token, MonitorDiscordBot)]
+        self.loop = None
+
+        intents = discord.Intents.default()
+        intents.message_content = True
+
+        for token, group in group_by_token(tenants).items():
+            names = ", ".join(tenant["name"] for tenant in group)
+
+            # Se algum tenant do grupo atende todos os canais, o bot do grupo também atende
+            if all(tenant.get("channels") for tenant in group):
+                channels = [channel for tenant in group for channel in tenant["channels"]]
+            else:
+                channels = None
+
+            bot = MonitorDiscordBot(command_prefix="!", intents=intents, name=names, channels=channels)
+            self.bots.append((token, bot))
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        start_metrics_server()
+
+        print(f"Iniciando {len(self.bots)} conexões com o Discord para {len(self.tenants)} tenants")
+
+        tasks = [bot.start(token) for token, bot in self.bots]
+        tasks.append(self.report_loop())
+        await asyncio.gather(*tasks)
+
+    def run(self):
+        try:
+            asyncio.run(self.start())
+        except KeyboardInterrupt:
+            print("Runner encerrado.")
+
+    async def report_loop(self):
+        while True:
+            await asyncio.sleep(REPORT_INTERVAL)
+            # O relatório consulta os processos do Chrome, então roda fora do loop
+            await asyncio.get_running_loop().run_in_executor(None, self.print_report)
+
+    # Uso de recursos de cada tenant: buscas ativas, navegadores em uso e consumo dos navegadores
+    def tenant_usage(self, bot):
+        from botUtils.processInfo import process_tree_usage, driver_pid
+
+        usage = {"tenant": bot.name, "jobs": 0, "drivers": 0, "pages": 0, "products": 0, "results": 0, "chrome_rss_mb": 0, "chrome_cpu_seconds": 0}
+
+        for store_bot in bot.store_bots().values():
+            usage["jobs"] += 1
+            usage["products"] += len(getattr(store_bot, "product_store", []))
+            usage["results"] += len(getattr(store_bot, "results", []))
+
+            driver = getattr(store_bot, "driver", None)
+            if driver is None:
+                continue
+
+            usage["drivers"] += 1
+            usage["pages"] += getattr(driver, "pages_loaded", 0)
+            rss, cpu = process_tree_usage(driver_pid(driver))
+            usage["chrome_rss_mb"] += rss
+            usage["chrome_cpu_seconds"] += cpu
+
+        return usage
+
+    # Os módulos dos navegadores (selenium, psutil) só são importados no primeiro relatório, para o runner
+    # subir sem carregar nada das lojas
+    def report(self):
+        from botUtils.driverPool import get_driver_pool
+        from botUtils.processInfo import psutil
+        from botUtils.watchlist import get_watchlist
+        from botUtils.productWatcher import watcher_stats
+        from botUtils.changeDetector import watch_stats
+        from botUtils.structuredData import structured_stats
+
+        runner_rss, runner_cpu = 0, 0
+        if psutil is not None:
+            process = psutil.Process()
+            runner_rss = process.memory_info().rss / (1024 * 1024)
+            runner_cpu = sum(process.cpu_times()[:2])
+
+        return {
+            "runner": {"rss_mb": runner_rss, "cpu_seconds": runner_cpu, "threads": threading.active_count()},
+            "driver_pool": get_driver_pool().stats(),
+            "jobs": get_job_registry().stats(),
+            "notifications": get_notification_queue(self.loop).stats() if self.loop else {},
+            "structured_data": structured_stats(),
+            "product_watches": watch_stats(),
+            "browser_watches": watcher_stats(),
+            "watchlist": get_watchlist().stats(),
+            "tenants": [self.tenant_usage(bot) for token, bot in self.bots],
+        }
+
+    def print_report(self):
+        report = self.report()
+        runner = report["runner"]
+        pool = report["driver_pool"]
+
+        print(f"[runner] {runner['rss_mb']:.0f} MB, {runner['cpu_seconds']:.0f}s de CPU, {runner['threads']} threads, navegadores: {pool['in_use']} em uso / {pool['idle']} livres")
+        for usage in report["tenants"]:
+            print(f"[{usage['tenant']}] {usage['jobs']} buscas, {usage['drivers']} navegadores, {usage['pages']} páginas, {usage['products']} produtos, Chrome: {usage['chrome_rss_mb']:.0f} MB / {usage['chrome_cpu_seconds']:.0f}s de CPU")
@@ -1,21 +1,27 @@
-import pandas as pd
 import threading
 import asyncio
 import os
 
 from dotenv import load_dotenv
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 
-from time import sleep, time
+
+from botUtils.driverPool import get_driver_pool
+from botUtils.browserProfiles import apply_profile
+from botUtils.productStore import ProductStateStore, NEW_PRODUCT, PRICE_CHANGED
+from botUtils.resultSink import ResultSink
+from botUtils.priceHistory import get_price_history
+from botUtils.notifications import get_notification_queue
+from botUtils.waits import StoreWaiter
+from botUtils.structuredData import page_structured_product
+from botUtils.pagePipeline import load_product_pages
+from botUtils.productWatcher import start_watcher, stop_watcher
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -28,63 +34,65 @@ class FastPriceBot():
     def __init__(self, search_query, expected_price, pages, user, loop, times):
         self.url = "https://www.fastshop.com.br/"
         self.search_query = search_query
-        self.priceList = []  # Lista para armazenar os preços encontrados
+        self.results = ResultSink("fast", search_query)  # Resultados gravados em disco durante a busca (só os mais recentes ficam em memória)
+        self.price_history = get_price_history()  # Histórico de preços em SQLite compartilhado por todos os bots
         self.expected_price = expected_price
         self.pages = pages  # Número de páginas a serem verificadas
         self.user = user  # Objeto para enviar notificações para o usuário
         self.loop = loop
+        self.notifier = get_notification_queue(loop)  # Fila que junta as notificações em resumos e controla o ritmo de envio
         self.times = times
         self.stop_search = False  # Controle de interrupção
         self.processed_links = set()  # Conjunto para armazenar URLs já processados neste ciclo
-        self.products_info = []
-        self.product_names = []
+        self.product_store = ProductStateStore(sink=self.results, history=self.price_history, store="fast")  # Produtos já vistos, indexados pela chave do produto
 
 
         # Configurações do navegador Chrome
         self.options = Options() 
         self.user_agent = userAgent
         self.options.add_argument(f'user-agent={self.user_agent}')
-        #self.options.add_argument('--headless')
         self.options.add_argument('--disable-gpu')
-        self.options.add_argument('--window-size=1920x1080')
         self.options.add_argument('--disable-dev-shm-usage')
         self.options.add_argument('--no-sandbox')
         self.options.add_argument('--ignore-certificate-errors')
         self.options.add_experimental_option('excludeSwitches', ['enable-logging'])
         self.options.add_argument('--disable-blink-features=AutomationControlled')
         self.options.add_argument('--disable-extensions')
-        self.options.add_argument('--disable-images')
 
-        service = Service(ChromeDriverManager().install())
-        service.log_path = 'NUL'
+        # Perfil do navegador da loja (headless, memória reduzida...), definido em botUtils/browserProfiles.py
+        apply_profile(self.options, "fast")
+
+        # O navegador é emprestado do pool compartilhado a cada ciclo (ver restart_driver)
+        self.driver = None
 
-        self.driver = webdriver.Chrome(service=service, options=self.options)
+        # Espera pelos cards da busca e pelo título da página do produto em vez de pausas fixas
+        self.waiter = StoreWaiter("fast", results=(By.CSS_SELECTOR, "app-product-item a.without-scroll.clearfix"), product=(By.XPATH, '//*[@id="auto_title_skeleton_box_empty"]/span'))
 
     async def notify_discord_about_new_product(self, title, price, url):
         message = "-" * 70 + f"\n\n**Novo Produto!**\n**Produto:** {title}\n**Preço Abaixo do Esperado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_change_in_price(self, title, price, url):
         message = "-" * 70 + f"\n\n**Mudança no preço**\n**Produto:** {title}\n**Preço Abaixo do Esperado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
 
     async def notify_discord_about_monitoring_new_product(self, title, price, url):
         message = "-" * 70 + f"\n\n**Novo Produto!**\n**Produto:** {title}\n**Preço Monitorado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_monitoring_new_price(self, title, price, url):
         message = "-" * 70 + f"\n\n**Mudança no preço!**\n**Produto:** {title}\n**Preço Monitorado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_error(self):
         message = "-" * 70 + f"\n\nOcorreu um erro ao monitorar o produto. \n\nO produto pode estar sem estoque, a página pode estar indisponível ou a estrutura do site mudou!\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     # Método para realizar a pesquisa do produto na Fast
     def search_product(self):
         self.driver.get(self.url)
-        sleep(1)
+        self.waiter.page_ready(self.driver)
         # Localiza o input de busca usando o seletor CSS, combinando a classe e o placeholder
         search_input = self.driver.find_element(By.CSS_SELECTOR, "input.search-input[placeholder='O que deseja?']")
         search_input.send_keys(self.search_query)
@@ -105,106 +113,103 @@ class FastPriceBot():
 
             print(f"Encontrados {len(product_links)} produtos na página atual.")
 
-            for product in product_links:
-                if self.stop_search:
-                    break
-                if product["url"] in [info["url"] for info in self.products_info]:
-                    continue
-                self.driver.get(product["url"])
-                sleep(1)
+            # Ignora os produtos que já foram verificados
+            new_product_links = [product for product in product_links if product["url"] not in self.product_store]
 
-                try:
-                    # Espera até que o título do produto esteja visível
-                    title_element = WebDriverWait(self.driver, 10).until(
-                        EC.visibility_of_element_located((By.XPATH, '//*[@id="auto_title_skeleton_box_empty"]/span'))
-                    )
-                    product["title"] = title_element.text
+            # Carrega as páginas dos produtos (várias ao mesmo tempo quando PAGE_CONCURRENCY > 1) e processa cada uma
+            load_product_pages(self.driver, new_product_links, self.check_product_page, ready=self.waiter.product_ready, should_stop=lambda: self.stop_search)
 
-                    # Espera até que o preço do produto esteja visível
-                    price_element = WebDriverWait(self.driver, 10).until(
-                        EC.visibility_of_element_located((By.CSS_SELECTOR, "span.price-fraction"))
-                    )
-                    cents_element = self.driver.find_element(By.CSS_SELECTOR, "span.price-cents")
+        except Exception as e:
+            print(f"Ocorreu um erro geral ao tentar buscar os produtos e preços: {e}")
 
-                    # Obter texto de preço e substituir a primeira ocorrência do ponto por uma string vazia
-                    price_text = price_element.text.replace('.', '', 1) + cents_element.text.replace(',', '.')
+        # Armazena e retorna a lista de produtos e preços
+        print(product_links)
+        return product_links
 
-                    # Converte o texto de preço ajustado para float
-                    price = float(price_text)
+    # Lê o título e o preço da página de produto aberta no navegador e envia as notificações
+    def check_product_page(self, product):
+        try:
+            # Tenta primeiro os dados estruturados (JSON-LD/microdata) da página; os seletores ficam como alternativa
+            structured = page_structured_product(self.driver, "fast")
 
-                    product["preço"] = price
+            if structured is not None and not structured["available"]:
+                print(f"Produto '{structured['title']}' indisponível: {product['url']}")
+                return
 
-                    product_data = {
-                        "title": product["title"],
-                        "preço": product["preço"],
-                        "url": product["url"]
-                    }
+            if structured is not None:
+                product["title"] = structured["title"]
+                price = structured["preço"]
+            else:
+                # Espera até que o título do produto esteja visível
+                title_element = WebDriverWait(self.driver, 10).until(
+                    EC.visibility_of_element_located((By.XPATH, '//*[@id="auto_title_skeleton_box_empty"]/span'))
+                )
+                product["title"] = title_element.text
 
-                    # Verifica se o produto já foi processado
+                # Espera até que o preço do produto esteja visível
+                price_element = WebDriverWait(self.driver, 10).until(
+                    EC.visibility_of_element_located((By.CSS_SELECTOR, "span.price-fraction"))
+                )
+                cents_element = self.driver.find_element(By.CSS_SELECTOR, "span.price-cents")
 
-                    if product_data['title'] not in self.product_names:
-                        # Adiciona o produto à lista de produtos
-                        self.products_info.append(product_data)
-                        self.product_names.append(product_data['title'])
+                # Obter texto de preço e substituir a primeira ocorrência do ponto por uma string vazia
+                price_text = price_element.text.replace('.', '', 1) + cents_element.text.replace(',', '.')
 
-                        if self.expected_price == None:
-                            
-                            asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_product(product['title'], price, product["url"]), self.loop)
-                            
-                            print(f"Novo produto!\nPreço encontrado para '{product['title']}' \nPreço: R${price}\n\n")
+                # Converte o texto de preço ajustado para float
+                price = float(price_text)
 
-                        elif price <= self.expected_price:
+            product["preço"] = price
 
-                            asyncio.run_coroutine_threadsafe(self.notify_discord_about_new_product(product['title'], price, product["url"]), self.loop)
+            product_data = {
+                "title": product["title"],
+                "preço": product["preço"],
+                "url": product["url"]
+            }
 
-                            print(f"Novo produto!\nPreço encontrado para '{product['title']}' \nPreço: R${price}\n\n")                        
-                    
-                    else:
-                        # Verifica se o preço do produto mudou
-                        for product in self.products_info:
+            # Consulta o estado do produto pela chave (busca O(1)) para saber se ele é novo ou se o preço mudou
+            change = self.product_store.observe(product_data['url'], product_data['title'], price)
 
-                            if product["title"] == product_data["title"]:
+            if change == NEW_PRODUCT:
 
-                                if product["preço"] != product_data["preço"]:
+                if self.expected_price is None:
 
-                                    product["preço"] = product_data["preço"]
+                    self.notifier.submit(self.notify_discord_about_monitoring_new_product(product_data['title'], price, product_data['url']))
 
-                                    if self.expected_price == None:
-                                        
-                                        asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_price(product['title'], price, product["url"]), self.loop)
-                                        
-                                        print(f"Preço mudou para '{product['title']}' \nPreço: R${price}\n\n")
+                    print(f"Novo produto!\nPreço encontrado para '{product_data['title']}' \nPreço: R${price}\n\n")
 
-                                    elif price <= self.expected_price:
+                elif price <= self.expected_price:
 
-                                        asyncio.run_coroutine_threadsafe(self.notify_discord_about_change_in_price(product['title'], price, product["url"]), self.loop)
+                    self.notifier.submit(self.notify_discord_about_new_product(product_data['title'], price, product_data['url']))
 
-                                        print(f"Preço mudou para '{product['title']}' \nPreço: R${price}\n\n")                                    
+                    print(f"Novo produto!\nPreço encontrado para '{product_data['title']}' \nPreço: R${price}\n\n")
 
-                except NoSuchElementException:
-                    print(f"Não foi possível encontrar o título ou preço para a URL: {product['url']}")
-                    continue
-                except ValueError:
-                    print(f"Formato de preço inválido para '{product['title']}'")
-                    continue
-                except TimeoutException:
-                    print(f"O tempo de espera excedeu enquanto procurava pelo título ou preço de '{product['title']}'")
-                    continue
+            elif change == PRICE_CHANGED:
 
-        except Exception as e:
-            print(f"Ocorreu um erro geral ao tentar buscar os produtos e preços: {e}")
+                if self.expected_price is None:
 
-        # Armazena e retorna a lista de produtos e preços
-        self.priceList = product_links
-        print(self.priceList)
-        return self.priceList
+                    self.notifier.submit(self.notify_discord_about_monitoring_new_price(product_data['title'], price, product_data['url']))
+
+                    print(f"Preço mudou para '{product_data['title']}' \nPreço: R${price}\n\n")
+
+                elif price <= self.expected_price:
+
+                    self.notifier.submit(self.notify_discord_about_change_in_price(product_data['title'], price, product_data['url']))
+
+                    print(f"Preço mudou para '{product_data['title']}' \nPreço: R${price}\n\n")
+
+        except NoSuchElementException:
+            print(f"Não foi possível encontrar o título ou preço para a URL: {product['url']}")
+        except ValueError:
+            print(f"Formato de preço inválido para '{product['title']}'")
+        except TimeoutException:
+            print(f"O tempo de espera excedeu enquanto procurava pelo título ou preço de '{product['title']}'")
 
     # Método para navegar para a próxima página de resultados
     def next_page(self):
         try:
             # Scroll até o fim da página
             self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            sleep(3)  # Espera para que a página carregue novos itens após o scroll
+            self.waiter.network_idle(self.driver)
 
             # Verifica se novos cards de produto foram carregados
             new_product_cards = self.driver.find_elements(By.CSS_SELECTOR, "app-product-item div.wrapper.animation.category-list")
@@ -230,45 +235,43 @@ class FastPriceBot():
             while not self.stop_search:
                 self.restart_driver()
                 self.driver.get(self.url)
-                sleep(0.7)
+                self.waiter.page_ready(self.driver)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
                 search_url = self.driver.current_url
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
-                    sleep(5)
+                    self.waiter.results_ready(self.driver)
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url)
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         else:
             for _ in range(self.times):
                 if self.stop_search:
                     break
                 self.restart_driver()
                 self.driver.get(self.url)
-                sleep(0.7)
+                self.waiter.page_ready(self.driver)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
                 search_url = self.driver.current_url
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url)
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         
-        self.driver.quit()
+        self.release_driver()
 
     
     # Método para realizar a busca de preços de forma síncrona
@@ -277,46 +280,56 @@ class FastPriceBot():
             while not self.stop_search:
                 self.restart_driver()
                 self.driver.get(link)
-                sleep(0.7)
+                self.waiter.results_ready(self.driver)
                 search_url = self.driver.current_url
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url)
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         else:
             for _ in range(self.times):
                 if self.stop_search:
                     break
                 self.restart_driver()
                 self.driver.get(link)
-                sleep(0.7)
+                self.waiter.results_ready(self.driver)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
                 search_url = self.driver.current_url
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     self.driver.get(search_url) 
                     if not self.next_page():
                         break
+                    self.waiter.results_ready(self.driver)
                     search_url = self.driver.current_url
-                    sleep(1)
         
-        self.driver.quit()
+        self.release_driver()
+
+    # Devolve o navegador atual ao pool e pega outro (reaproveitado, se houver algum livre)
+    def restart_driver(self, recycle=False):
+        self.waiter.next_cycle()
+        driver_pool = get_driver_pool()
+        if recycle:
+            driver_pool.discard(self.driver)
+        else:
+            driver_pool.release(self.driver)
+        self.driver = driver_pool.checkout(self.options, store="fast", should_stop=lambda: self.stop_search)
 
-    def restart_driver(self):
-        self.driver.quit()
-        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=self.options)
+    def release_driver(self):
+        self.results.flush()
+        self.waiter.end_cycle()
+        get_driver_pool().release(self.driver)
+        self.driver = None
 
     # Função para monitorar um link de um produto específico e se o preço dele mudou   
     def check_specific_product(self, link, expected_price):
@@ -330,12 +343,14 @@ class FastPriceBot():
 
         in_stock = True
 
+        # Aba do produto mantida aberta entre as verificações
+        watcher = start_watcher(self, "fast", link)
+
         while not self.stop_search:
             try:
-                # Tente carregar a página
-                self.restart_driver()
-                self.driver.get(link)
-                sleep(1)
+                # Abre a página do produto na primeira volta; nas seguintes espera o intervalo e atualiza a mesma aba
+                watcher.load()
+                self.waiter.product_ready(self.driver)
             except TimeoutException:
                 # Se ocorrer um timeout, recarregue a página e vá para a próxima iteração
                 print(f"Timeout ao carregar {link}, tentando recarregar.")
@@ -347,36 +362,49 @@ class FastPriceBot():
                 continue
 
             try:
-                # Tenta localizar o título do produto usando o novo seletor CSS
-                title_element = WebDriverWait(self.driver, 10).until(
-                        EC.visibility_of_element_located((By.XPATH, '//*[@id="auto_title_skeleton_box_empty"]/span'))
-                    )
-                title = title_element.text
+                # Tenta primeiro os dados estruturados (JSON-LD/microdata) da página; os seletores ficam como alternativa
+                product = page_structured_product(self.driver, "fast")
 
-                # Tenta localizar o preço do produto usando o novo seletor CSS
-                price_element = WebDriverWait(self.driver, 10).until(
-                        EC.visibility_of_element_located((By.CSS_SELECTOR, "span.price-fraction"))
-                    )
-                cents_element = self.driver.find_element(By.CSS_SELECTOR, "span.price-cents")
+                if product is not None and not product["available"]:
+                    raise NoSuchElementException("Produto indisponível")
 
-                # Obter texto de preço e substituir a primeira ocorrência do ponto por uma string vazia
-                price_text = price_element.text.replace('.', '', 1) + cents_element.text.replace(',', '.')
+                if product is not None:
+                    title = product["title"]
+                    price = product["preço"]
+                else:
+                    # Tenta localizar o título do produto usando o novo seletor CSS
+                    title_element = WebDriverWait(self.driver, 10).until(
+                            EC.visibility_of_element_located((By.XPATH, '//*[@id="auto_title_skeleton_box_empty"]/span'))
+                        )
+                    title = title_element.text
 
-                # Converte o texto de preço ajustado para float
-                price = float(price_text)
+                    # Tenta localizar o preço do produto usando o novo seletor CSS
+                    price_element = WebDriverWait(self.driver, 10).until(
+                            EC.visibility_of_element_located((By.CSS_SELECTOR, "span.price-fraction"))
+                        )
+                    cents_element = self.driver.find_element(By.CSS_SELECTOR, "span.price-cents")
+
+                    # Obter texto de preço e substituir a primeira ocorrência do ponto por uma string vazia
+                    price_text = price_element.text.replace('.', '', 1) + cents_element.text.replace(',', '.')
+
+                    # Converte o texto de preço ajustado para float
+                    price = float(price_text)
 
                 print(f"Preço encontrado para '{title}' \nPreço: R${price}\n\n")
 
+                # Guarda o preço no histórico (a gravação acontece em segundo plano)
+                self.price_history.record("fast", link, title, price)
+
                 if last_price is None:
                     last_price = price
 
                 if first_notification:
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_product(title, price, link), self.loop)
+                    self.notifier.submit(self.notify_discord_about_monitoring_new_product(title, price, link))
                     first_notification = False
 
                 # Condição modificada para enviar notificação apenas quando o preço diminuir ou for menor que o esperado
                 if price < last_price or (price < expected_price and not notified_for_price_drop):
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_price(title, price, link), self.loop)
+                    self.notifier.submit(self.notify_discord_about_monitoring_new_price(title, price, link))
                     print(f"Preço encontrado para '{title}' \nPreço: R${price}\n\n")
                     last_price = price  # Atualiza o último preço verificado
                     notified_for_price_drop = True
@@ -386,15 +414,17 @@ class FastPriceBot():
             except NoSuchElementException:
                 print(f"Não foi possível encontrar o título ou preço para a URL: {link}")
                 if in_stock:
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_error(), self.loop)
+                    self.notifier.submit(self.notify_discord_about_error())
                     in_stock = False    
                 continue
 
-            except WebDriverException as e:
-                if "Out of Memory" in str(e):
-                    print("Detectado erro 'Out of Memory'. Reiniciando o driver...")
-                    self.restart_driver()
+            except WebDriverException:
+                # Troca o navegador se ele parou de responder ou passou dos limites de memória/CPU (botUtils/resourceMonitor.py)
+                if get_driver_pool().needs_recycle(self.driver):
+                    self.restart_driver(recycle=True)
 
+        stop_watcher(watcher)
+        self.release_driver()
 
     async def search_specific_product(self, link, expected_price):
         await asyncio.get_event_loop().run_in_executor(None, self.check_specific_product, link, expected_price)
@@ -405,11 +435,10 @@ class FastPriceBot():
     async def search_link_prices(self, link):
         await asyncio.get_event_loop().run_in_executor(None, self.check_link_prices, link)
 
-    # Método para salvar os dados em um arquivo CSV
+    # Método para gravar no arquivo de resultados as linhas que ainda estão em memória
     def data_to_csv(self):
-        df = pd.DataFrame(self.priceList)
-        df = df.dropna(how='all')
-        df.to_csv(f"{self.search_query}.csv", index=False)
+        self.results.flush()
+        return self.results.path
 
 if __name__ == "__main__":
     # Cria uma instância do bot
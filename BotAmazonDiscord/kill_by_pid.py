@@ -1,17 +1,25 @@
-import os
-import signal
+import sys
 
+from botUtils.processSupervisor import psutil, kill_processes, process_tree
+
+# Encerra o processo e todos os processos filhos dele (ex.: o chromedriver e o Chrome aberto por ele)
 def kill_process(pid):
-    try:
-        os.kill(pid, signal.SIGTERM)  # Envia o sinal SIGTERM
-        print(f"Processo {pid} terminado com sucesso.")
-    except PermissionError:
-        print(f"Permissão negada para terminar o processo {pid}. Você pode precisar de privilégios de administrador.")
-    except ProcessLookupError:
+    if psutil is None:
+        print("O psutil não está instalado (pip install psutil).")
+        return
+
+    tree = process_tree(pid)
+    if not tree:
         print(f"Nenhum processo encontrado com PID {pid}.")
-    except Exception as e:
-        print(f"Erro ao tentar terminar o processo {pid}: {e}")
+        return
+
+    count = kill_processes(tree)
+    if count:
+        print(f"{count} processos (o {pid} e os filhos dele) terminados com sucesso.")
+    else:
+        print(f"Não foi possível terminar o processo {pid}. Você pode precisar de privilégios de administrador.")
+
 
-# Exemplo de uso:
-# Substitua 1234 pelo PID do processo que você deseja terminar
-kill_process(10536)
+# Uso: python kill_by_pid.py <pid>
+if __name__ == "__main__":
+    kill_process(int(sys.argv[1]))
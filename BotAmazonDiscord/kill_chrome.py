@@ -1,11 +1,14 @@
-import os
+from botUtils.processSupervisor import psutil, reap_stale_records, SUPERVISOR_DIR
 
+# Encerra os navegadores (chromedriver e Chrome) deixados por processos do bot que já morreram, pelos
+# registros do supervisor (botUtils/processSupervisor.py). Os outros Chromes da máquina não são tocados
 def kill_chrome():
-    # Executa o comando 'taskkill' para encerrar todos os processos do Chrome
-    try:
-        os.system("taskkill /F /IM chrome.exe")
-        print("\n\nTodos os processos do Chrome foram encerrados com sucesso.\n\n")
-    except:
-        print("Não foi possível encerrar os processos do Chrome.")
-
-kill_chrome()
\ No newline at end of file
+    if psutil is None:
+        print("O psutil não está instalado (pip install psutil).")
+        return
+
+    count = reap_stale_records()
+    print(f"\n\n{count} processos do Chrome deixados por execuções anteriores do bot (registros em {SUPERVISOR_DIR}) foram encerrados.\n\n")
+
+
+kill_chrome()
@@ -3,6 +3,7 @@ import discord
 import os
 
 from discordBots.MonitorDiscordBot import MonitorDiscordBot
+from botUtils.metrics import start_metrics_server
 
 from dotenv import load_dotenv
 
@@ -18,6 +19,9 @@ intents.message_content = True
 # Cria uma instância do bot MonitorDiscordBot
 bot = MonitorDiscordBot(command_prefix="!", intents=intents)
     
+# Endpoint local com as métricas dos bots (METRICS_PORT=0 desliga)
+start_metrics_server()
+
 # Inicia o bot e o conecta ao servidor Discord
 bot.run(bot_id)
 
@@ -1,21 +1,29 @@
-import pandas as pd
 import threading
 import asyncio
 import os
 
 from dotenv import load_dotenv
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 
-from time import sleep, time
+from time import time
+
+from botUtils.driverPool import get_driver_pool
+from botUtils.browserProfiles import apply_profile
+from botUtils.productStore import ProductStateStore, NEW_PRODUCT, PRICE_CHANGED
+from botUtils.resultSink import ResultSink
+from botUtils.priceHistory import get_price_history
+from botUtils.notifications import get_notification_queue
+from botUtils.waits import StoreWaiter
+from botUtils.nextData import fetch_next_listing, page_next_listing, next_search_url, listing_page_url, wait_listing_cycle, parse_next_product, page_next_product
+from botUtils.changeDetector import start_watch, stop_watch
+from botUtils.structuredData import page_structured_product
+from botUtils.productWatcher import start_watcher, stop_watcher
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -28,58 +36,61 @@ class PichauPriceBot():
     def __init__(self, search_query, expected_price, pages, user, loop, times):
         self.url = "https://www.pichau.com.br"
         self.search_query = search_query
-        self.priceList = []  # Lista para armazenar os preços encontrados
+        self.results = ResultSink("pichau", search_query)  # Resultados gravados em disco durante a busca (só os mais recentes ficam em memória)
+        self.price_history = get_price_history()  # Histórico de preços em SQLite compartilhado por todos os bots
         self.expected_price = expected_price
         self.pages = pages  # Número de páginas a serem verificadas
         self.user = user  # Objeto para enviar notificações para o usuário
         self.loop = loop
+        self.notifier = get_notification_queue(loop)  # Fila que junta as notificações em resumos e controla o ritmo de envio
         self.times = times
         self.stop_search = False  # Controle de interrupção
+        self.http_cycle_at = None  # Início do último ciclo feito via HTTP
         self.processed_links = set()  # Conjunto para armazenar URLs já processados neste ciclo
-        self.products_info = []
-        self.products_names = []
+        self.product_store = ProductStateStore(sink=self.results, history=self.price_history, store="pichau")  # Produtos já vistos, indexados pela chave do produto
 
         # Configurações do navegador Chrome
         self.options = Options() 
         self.user_agent = userAgent
         self.options.add_argument(f'user-agent={self.user_agent}')
-        #self.options.add_argument('--headless')
         self.options.add_argument('--disable-gpu')
-        self.options.add_argument('--window-size=1920x1080')
         self.options.add_argument('--disable-dev-shm-usage')
         self.options.add_argument('--no-sandbox')
         self.options.add_argument('--ignore-certificate-errors')
         self.options.add_experimental_option('excludeSwitches', ['enable-logging']  )
         self.options.add_argument('--disable-blink-features=AutomationControlled')
         self.options.add_argument('--disable-extensions')
-        self.options.add_argument('--disable-images')
+
+        # Perfil do navegador da loja (headless, memória reduzida...), definido em botUtils/browserProfiles.py
+        apply_profile(self.options, "pichau")
         self.options.add_experimental_option("excludeSwitches", ['enable-automation'])
 
-        service = Service(ChromeDriverManager().install())
-        service.log_path = 'NUL'
+        # O navegador é emprestado do pool compartilhado a cada ciclo (ver restart_driver)
+        self.driver = None
 
-        self.driver = webdriver.Chrome(service=service, options=self.options)
+        # Espera pelos cards da busca e pelo título da página do produto em vez de pausas fixas
+        self.waiter = StoreWaiter("pichau", results=(By.XPATH, "//div[contains(@class, 'MuiGrid-root') and contains(@class, 'MuiGrid-item')]/a[contains(@class, 'jss16')]"), product=(By.CSS_SELECTOR, "h1.MuiTypography-root.jss39.MuiTypography-h6"))
 
     async def notify_discord_about_new_product(self, title, price, url):
         message = "-" * 70 + f"\n\n**Novo Produto!**\n**Produto:** {title}\n**Preço Abaixo do Esperado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_change_in_price(self, title, price, url):
         message = "-" * 70 + f"\n\n**Mudança no preço**\n**Produto:** {title}\n**Preço Abaixo do Esperado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
 
     async def notify_discord_about_monitoring_new_product(self, title, price, url):
         message = "-" * 70 + f"\n\n**Novo Produto!**\n**Produto:** {title}\n**Preço Monitorado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_monitoring_new_price(self, title, price, url):
         message = "-" * 70 + f"\n\n**Mudança no preço!**\n**Produto:** {title}\n**Preço Monitorado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_error(self):
         message = "-" * 70 + f"\n\nOcorreu um erro ao monitorar o produto. \n\nO produto pode estar sem estoque, a página pode estar indisponível ou a estrutura do site mudou!\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     # Método para realizar a pesquisa do produto na Pichau
     def search_product(self):
@@ -88,17 +99,68 @@ class PichauPriceBot():
         search_url = f"{self.url}/search?q={self.search_query}"
         self.driver.get(search_url)
         self.driver.fullscreen_window()
-        sleep(1)
+
+    # Verifica as páginas de resultados via HTTP (JSON do Next.js), sem abrir o navegador. Entre dois ciclos via
+    # HTTP espera LISTING_HTTP_INTERVAL (contado do início do ciclo anterior), para não pedir a busca à loja sem parar.
+    # Retorna False quando a primeira página não trouxe o JSON com os produtos, para o ciclo ser feito pelo navegador
+    def check_pages_http(self, url):
+        wait_listing_cycle(self.http_cycle_at, lambda: self.stop_search)
+        if self.stop_search:
+            return True
+
+        self.http_cycle_at = time()
+        self.waiter.next_cycle()
+
+        for page in range(1, self.pages + 1):
+            if self.stop_search:
+                break
+
+            products = fetch_next_listing(listing_page_url(url, "pichau", page), "pichau")
+
+            if products is None:
+                if page == 1:
+                    print("Produtos não encontrados no HTML da página. Usando o navegador...")
+                    return False
+                print("Próxima página não encontrada.")
+                break
+
+            print(f"Monitorando página {page} de {self.pages}")
+            print(f"Encontrados {len(products)} produtos na página atual (dados do Next.js).")
+
+            for product_data in products:
+                if self.stop_search:
+                    break
+                self.process_product(product_data)
+
+        # Fim do ciclo: grava os resultados e devolve o navegador que sobrou de um ciclo anterior feito pelo
+        # navegador (ele não é necessário enquanto o HTTP funcionar)
+        self.results.flush()
+        self.waiter.end_cycle()
+        if self.driver is not None:
+            get_driver_pool().release(self.driver)
+            self.driver = None
+        return True
 
     # Método para verificar os preços dos produtos nas páginas
     def check_prices(self):
+        # Tenta ler os produtos do JSON do Next.js da página de resultados já aberta, sem depender das classes do layout
+        products = page_next_listing(self.driver, "pichau")
+
+        if products is not None:
+            print(f"Encontrados {len(products)} produtos na página (dados do Next.js).")
+            for product_data in products:
+                if self.stop_search:
+                    break
+                self.process_product(product_data)
+            return self.product_store.values()
+
         try:
             self.driver.fullscreen_window()
-            sleep(1)
+            self.waiter.results_ready(self.driver)
             self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            sleep(1)
+            self.waiter.network_idle(self.driver)
             self.driver.execute_script("window.scrollTo(0, 0);")
-            sleep(1)
+            self.waiter.network_idle(self.driver)
             try:
                 product_cards = self.driver.find_elements(By.XPATH, "//div[contains(@class, 'MuiGrid-root') and contains(@class, 'MuiGrid-item')]/a[contains(@class, 'jss16')]")
                 print(f"Encontrados {len(product_cards)} cartões de produto na página.")
@@ -137,68 +199,63 @@ class PichauPriceBot():
                     print(f"Erro ao tentar encontrar o preço do produto")
                     continue
 
-                product_info = {
-                    "link": product_link,
-                    "title": product_title,
-                    "price": price_text
-                }
-
-                if product_info['title'] not in self.products_names:
-                    self.products_names.append(product_info['title'])
-                    self.products_info.append(product_info)
+                try:
+                    price = float(price_text.replace('R$', '').replace('.', '').replace(',', '.').strip())
+                except ValueError:
+                    print(f"Erro ao converter o preço do produto '{product_title}'. Preço encontrado: '{price_text}'")
+                    continue
 
-                    try:
-                        price = float(price_text.replace('R$', '').replace('.', '').replace(',', '.').strip())
-                    except ValueError:
-                        print(f"Erro ao converter o preço do produto '{product_title}'. Preço encontrado: '{price_text}'")
-                        continue
-
-                    if self.expected_price is None:
-                        try:
-                            asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_product(product_info['title'], price, product_info["link"]), self.loop)
-                            print(f"Novo Produto!\nPreço encontrado para '{product_info['title']}' \nPreço: R${price}\n\n")
-                        except Exception as e:
-                            print(f"Erro ao notificar sobre o novo produto")
-                    elif price <= self.expected_price:
-                        try:
-                            asyncio.run_coroutine_threadsafe(self.notify_discord_about_new_product(product_info['title'], price, product_info["link"]), self.loop)
-                            print(f"Novo Produto!\nPreço encontrado para '{product_info['title']}' \nPreço: R${price}\n\n")
-                        except Exception as e:
-                            print(f"Erro ao notificar sobre o novo produto")
-                else:
-                    for product in self.products_info:
-                        if product_info['title'] == product['title'] and product_info['price'] != product['price']:
-                            try:
-                                price = float(product_info['price'].replace('R$', '').replace('.', '').replace(',', '.').strip())
-                            except ValueError:
-                                print(f"Erro ao converter o preço do produto '{product_info['title']}'. Preço encontrado: '{product_info['price']}'")
-                                continue
-
-                            product['price'] = product_info['price']
-
-                            if self.expected_price is None:
-                                try:
-                                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_price(product_info['title'], price, product_info["link"]), self.loop)
-                                    print(f"Novo Preço!\nPreço encontrado para '{product_info['title']}' \nPreço: R${price}\n\n")
-                                except Exception as e:
-                                    print(f"Erro ao notificar sobre o novo preço")
-                            elif price <= self.expected_price:
-                                try:
-                                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_change_in_price(product_info['title'], price, product_info["link"]), self.loop)
-                                    print(f"Novo Preço!\nPreço encontrado para '{product_info['title']}' \nPreço: R${price}\n\n")
-                                except Exception as e:
-                                    print(f"Erro ao notificar sobre o novo preço")
+                self.process_product({
+                    "url": product_link,
+                    "title": product_title,
+                    "preço": price
+                })
 
         except Exception as e:
             print(f"Erro geral na busca de produtos e preços")
 
-        return self.products_info
+        return self.product_store.values()
+
+    # Consulta o estado do produto e envia as notificações de produto novo ou de mudança de preço
+    def process_product(self, product_data):
+        price = product_data["preço"]
+
+        # Consulta o estado do produto pela chave (busca O(1)) para saber se ele é novo ou se o preço mudou
+        change = self.product_store.observe(product_data['url'], product_data['title'], price)
+
+        if change == NEW_PRODUCT:
+
+            if self.expected_price is None:
+
+                self.notifier.submit(self.notify_discord_about_monitoring_new_product(product_data['title'], price, product_data['url']))
+
+                print(f"Novo produto!\nPreço encontrado para '{product_data['title']}' \nPreço: R${price}\n\n")
+
+            elif price <= self.expected_price:
+
+                self.notifier.submit(self.notify_discord_about_new_product(product_data['title'], price, product_data['url']))
+
+                print(f"Novo produto!\nPreço encontrado para '{product_data['title']}' \nPreço: R${price}\n\n")
+
+        elif change == PRICE_CHANGED:
+
+            if self.expected_price is None:
+
+                self.notifier.submit(self.notify_discord_about_monitoring_new_price(product_data['title'], price, product_data['url']))
+
+                print(f"Preço mudou para '{product_data['title']}' \nPreço: R${price}\n\n")
+
+            elif price <= self.expected_price:
+
+                self.notifier.submit(self.notify_discord_about_change_in_price(product_data['title'], price, product_data['url']))
+
+                print(f"Preço mudou para '{product_data['title']}' \nPreço: R${price}\n\n")
 
     # Método para navegar para a próxima página de resultados
     def next_page(self):
         try:
             self.driver.execute_script("window.scrollBy(0, 2400);")
-            sleep(5)
+            self.waiter.network_idle(self.driver)
             # Encontra o botão de próxima página usando o seletor CSS para o ícone SVG
             print("\nTentando encontrar o botão de próxima página...\n")
 
@@ -222,81 +279,101 @@ class PichauPriceBot():
 
     # Método para realizar a busca de preços de forma síncrona
     def search_prices_sync(self):
+        # Calculada antes da primeira busca pelo navegador (a busca pelo navegador pode mudar o texto buscado)
+        search_link = next_search_url("pichau", self.search_query)
         if self.times == "indeterminado":
             while not self.stop_search:
+                if self.check_pages_http(search_link):
+                    continue
                 self.restart_driver()
-                sleep(0.7)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     if not self.next_page():
                         break
-                    sleep(1)
+                    self.waiter.results_ready(self.driver)
         else:
             for _ in range(self.times):
                 if self.stop_search:
                     break
                 self.next_page_counter = 2
+                if self.check_pages_http(search_link):
+                    continue
                 self.restart_driver()
-                sleep(0.7)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     if not self.next_page():
                         break
-                    sleep(1)
+                    self.waiter.results_ready(self.driver)
         
-        self.driver.quit()
+        self.release_driver()
 
     
     # Método para realizar a busca de preços de forma síncrona
     def check_link_prices(self, link):
         if self.times == "indeterminado":
             while not self.stop_search:
+                if self.check_pages_http(link):
+                    continue
                 self.restart_driver()
                 self.driver.get(link)
-                sleep(0.7)
+                self.waiter.results_ready(self.driver)
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     if not self.next_page():
                         break
-                    sleep(1)
+                    self.waiter.results_ready(self.driver)
         else:
             for _ in range(self.times):
                 if self.stop_search:
                     break
+                if self.check_pages_http(link):
+                    continue
                 self.restart_driver()
                 self.driver.get(link)
-                sleep(0.7)
+                self.waiter.results_ready(self.driver)
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices()
-                    sleep(1)
                     if not self.next_page():
                         break
-                    sleep(1)
+                    self.waiter.results_ready(self.driver)
         
-        self.driver.quit()
+        self.release_driver()
+
+    # Devolve o navegador atual ao pool e pega outro (reaproveitado, se houver algum livre)
+    def restart_driver(self, recycle=False):
+        self.waiter.next_cycle()
+        driver_pool = get_driver_pool()
+        if recycle:
+            driver_pool.discard(self.driver)
+        else:
+            driver_pool.release(self.driver)
+        self.driver = driver_pool.checkout(self.options, store="pichau", should_stop=lambda: self.stop_search)
+
+    def release_driver(self):
+        self.results.flush()
+        self.waiter.end_cycle()
+        get_driver_pool().release(self.driver)
+        self.driver = None
 
-    def restart_driver(self):
-        self.driver.quit()
-        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=self.options)
+    # Lê o produto do HTML da página (usado pela watchlist, que baixa as páginas via HTTP)
+    def parse_product_html(self, page_html, link):
+        return parse_next_product(page_html, "pichau", link)
 
     # Função para monitorar um link de um produto específico e se o preço dele mudou   
     def check_specific_product(self, link, expected_price):
@@ -310,65 +387,113 @@ class PichauPriceBot():
 
         in_stock = True
 
-        while not self.stop_search:
-            try:
-                # Tente carregar a página
-                self.restart_driver()
-                self.driver.get(link)
-                self.driver.fullscreen_window()
+        # Validadores HTTP, impressão digital da região do preço e intervalo entre as verificações deste produto
+        watch = start_watch("pichau", link)
 
-                sleep(2)
-            except TimeoutException:
-                # Se ocorrer um timeout, recarregue a página e vá para a próxima iteração
-                print(f"Timeout ao carregar {link}, tentando recarregar.")
+        # Aba do produto mantida aberta entre as verificações
+        watcher = start_watcher(self, "pichau", link)
+
+        while not self.stop_search:
+            # Espera o intervalo do produto em toda volta do loop (só a primeira verificação não espera).
+            # O intervalo cresce enquanto o preço não muda e quando a leitura falha seguidamente
+            watch.wait(lambda: self.stop_search)
+            if self.stop_search:
+                break
+
+            # Tenta primeiro pelo JSON do Next.js (__NEXT_DATA__) via HTTP, com requisição condicional; o navegador só é usado quando a página não traz os dados
+            product = watch.poll(lambda page_html: parse_next_product(page_html, "pichau", link))
+
+            if product is not None:
+                # Devolve o navegador só se uma verificação anterior precisou dele
+                if self.driver is not None:
+                    self.release_driver()
+                if not watch.changed:
+                    # 304 ou região do preço igual à da última leitura: nada a ler nem a notificar
+                    continue
+            else:
                 try:
-                    self.driver.refresh()
-                except Exception as e:
-                    print(f"Erro ao tentar recarregar a página")
-                    continue  # Pula para a próxima iteração do loop
+                    # Abre a página do produto no navegador (ou atualiza a aba que já está aberta)
+                    watcher.load(wait=False)
+                    self.driver.fullscreen_window()
+                    self.waiter.product_ready(self.driver)
+                except TimeoutException:
+                    watch.fail()
+                    # Se ocorrer um timeout, recarregue a página e vá para a próxima iteração
+                    print(f"Timeout ao carregar {link}, tentando recarregar.")
+                    try:
+                        self.driver.refresh()
+                    except Exception as e:
+                        print(f"Erro ao tentar recarregar a página")
+                        continue  # Pula para a próxima iteração do loop
+                    continue
+
+                # Com a página renderizada, tenta o mesmo JSON (ou o JSON-LD/microdata) antes de procurar os elementos pelas classes
+                product = page_next_product(self.driver, "pichau", link) or page_structured_product(self.driver, "pichau")
+
+            if product is not None and not product["available"]:
+                print(f"Produto '{product['title']}' indisponível: {link}")
+                watch.observe(None)
+                if in_stock:
+                    self.notifier.submit(self.notify_discord_about_error())
+                    in_stock = False
                 continue
 
-            try:
-                # Localizar o título do produto com o novo seletor
-                title_element = self.driver.find_element(By.CSS_SELECTOR, "h1.MuiTypography-root.jss39.MuiTypography-h6")
-                title = title_element.text
+            if product is not None:
+                title = product["title"]
+                price = product["preço"]
+            else:
+                try:
+                    # Localizar o título do produto com o novo seletor
+                    title_element = self.driver.find_element(By.CSS_SELECTOR, "h1.MuiTypography-root.jss39.MuiTypography-h6")
+                    title = title_element.text
+
+                    # Localizar o preço do produto com o novo seletor
+                    price_element = self.driver.find_element(By.CSS_SELECTOR, "div.jss88")
+                    price_text = price_element.text.replace('R$', '').replace('&nbsp;', '').replace('.', '').replace(',', '.').strip()
+
+                    price = float(price_text)
+
+                except NoSuchElementException:
+                    watch.fail()
+                    print(f"Não foi possível encontrar o título ou preço para a URL: {link}")
+                    if in_stock:
+                        self.notifier.submit(self.notify_discord_about_error())
+                        in_stock = False
+                    continue
 
-                # Localizar o preço do produto com o novo seletor
-                price_element = self.driver.find_element(By.CSS_SELECTOR, "div.jss88")
-                price_text = price_element.text.replace('R$', '').replace('&nbsp;', '').replace('.', '').replace(',', '.').strip()
+                except WebDriverException:
+                    watch.fail()
+                    # Troca o navegador se ele parou de responder ou passou dos limites de memória/CPU (botUtils/resourceMonitor.py)
+                    if get_driver_pool().needs_recycle(self.driver):
+                        self.restart_driver(recycle=True)
+                    continue
 
-                price = float(price_text)
+            watch.observe(price)
 
-                print(f"Preço encontrado para '{title}' \nPreço: R${price}\n\n")
+            print(f"Preço encontrado para '{title}' \nPreço: R${price}\n\n")
 
-                if last_price is None:
-                    last_price = price
+            # Guarda o preço no histórico (a gravação acontece em segundo plano)
+            self.price_history.record("pichau", link, title, price)
 
-                if first_notification:
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_product(title, price, link), self.loop)
-                    first_notification = False
+            if last_price is None:
+                last_price = price
 
-                # Condição modificada para enviar notificação apenas quando o preço diminuir ou for menor que o esperado
-                if price < last_price or (price < expected_price and not notified_for_price_drop):
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_price(title, price, link), self.loop)
-                    print(f"Preço encontrado para '{title}' \nPreço: R${price}\n\n")
-                    last_price = price  # Atualiza o último preço verificado
-                    notified_for_price_drop = True
-                
-                in_stock = True
+            if first_notification:
+                self.notifier.submit(self.notify_discord_about_monitoring_new_product(title, price, link))
+                first_notification = False
 
-            except NoSuchElementException:
-                print(f"Não foi possível encontrar o título ou preço para a URL: {link}")
-                if in_stock:
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_error(), self.loop)
-                    in_stock = False    
-                continue
+            # Condição modificada para enviar notificação apenas quando o preço diminuir ou for menor que o esperado
+            if price < last_price or (price < expected_price and not notified_for_price_drop):
+                self.notifier.submit(self.notify_discord_about_monitoring_new_price(title, price, link))
+                print(f"Preço encontrado para '{title}' \nPreço: R${price}\n\n")
+                last_price = price  # Atualiza o último preço verificado
+                notified_for_price_drop = True
 
-            except WebDriverException as e:
-                if "Out of Memory" in str(e):
-                    print("Detectado erro 'Out of Memory'. Reiniciando o driver...")
-                    self.restart_driver()
+            in_stock = True
 
+        stop_watch(watch)
+        stop_watcher(watcher)
+        self.release_driver()
 
     async def search_specific_product(self, link, expected_price):
         await asyncio.get_event_loop().run_in_executor(None, self.check_specific_product, link, expected_price)
@@ -379,8 +504,7 @@ class PichauPriceBot():
     async def search_link_prices(self, link):
         await asyncio.get_event_loop().run_in_executor(None, self.check_link_prices, link)
 
-    # Método para salvar os dados em um arquivo CSV
+    # Método para gravar no arquivo de resultados as linhas que ainda estão em memória
     def data_to_csv(self):
-        df = pd.DataFrame(self.priceList)
-        df = df.dropna(how='all')
-        df.to_csv(f"{self.search_query}.csv", index=False)
\ No newline at end of file
+        self.results.flush()
+        return self.results.path
\ No newline at end of file
@@ -0,0 +1,11 @@
+from dotenv import load_dotenv
+
+from discordBots.tenantRunner import TenantRunner, load_tenants
+
+load_dotenv()
+
+# Hospeda todos os bots configurados em tenants.json em um único processo
+runner = TenantRunner(load_tenants())
+
+# Conecta todos os tenants ao Discord e mantém o processo rodando
+runner.run()
@@ -1,21 +1,27 @@
-import pandas as pd
 import threading
 import asyncio
 import os
 
 from dotenv import load_dotenv
 
-from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException, ElementClickInterceptedException
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
 
-from time import sleep, time
+
+from botUtils.driverPool import get_driver_pool
+from botUtils.browserProfiles import apply_profile
+from botUtils.productStore import ProductStateStore, NEW_PRODUCT, PRICE_CHANGED
+from botUtils.resultSink import ResultSink
+from botUtils.priceHistory import get_price_history
+from botUtils.notifications import get_notification_queue
+from botUtils.waits import StoreWaiter
+from botUtils.listingExtractor import extract_listing
+from botUtils.structuredData import page_structured_product
+from botUtils.productWatcher import start_watcher, stop_watcher
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -28,62 +34,64 @@ class TerabytePriceBot():
     def __init__(self, search_query, expected_price, pages, user, loop, times):
         self.url = "https://www.terabyteshop.com.br"    
         self.search_query = search_query
-        self.priceList = []  # Lista para armazenar os preços encontrados
+        self.results = ResultSink("terabyte", search_query)  # Resultados gravados em disco durante a busca (só os mais recentes ficam em memória)
+        self.price_history = get_price_history()  # Histórico de preços em SQLite compartilhado por todos os bots
         self.expected_price = expected_price
         self.pages = pages  # Número de páginas a serem verificadas
         self.user = user  # Objeto para enviar notificações para o usuário
         self.loop = loop
+        self.notifier = get_notification_queue(loop)  # Fila que junta as notificações em resumos e controla o ritmo de envio
         self.times = times
         self.stop_search = False  # Controle de interrupção
         self.processed_links = set()  # Conjunto para armazenar URLs já processados neste ciclo
-        self.products_info = []
-        self.products_names = []
+        self.product_store = ProductStateStore(sink=self.results, history=self.price_history, store="terabyte")  # Produtos já vistos, indexados pela chave do produto
 
 
         # Configurações do navegador Chrome
         self.options = Options() 
         self.user_agent = userAgent
         self.options.add_argument(f'user-agent={self.user_agent}')
-        #self.options.add_argument('--headless')
         self.options.add_argument('--disable-gpu')
-        self.options.add_argument('--window-size=1920x1080')
         self.options.add_argument('--disable-dev-shm-usage')
         self.options.add_argument('--no-sandbox')
         self.options.add_argument('--ignore-certificate-errors')
         self.options.add_experimental_option('excludeSwitches', ['enable-logging'])
         self.options.add_argument('--disable-blink-features=AutomationControlled')
         self.options.add_argument('--disable-extensions')
-        self.options.add_argument('--disable-images')
 
-        service = Service(ChromeDriverManager().install())
-        service.log_path = 'NUL'
+        # Perfil do navegador da loja (headless, memória reduzida...), definido em botUtils/browserProfiles.py
+        apply_profile(self.options, "terabyte")
+
+        # O navegador é emprestado do pool compartilhado a cada ciclo (ver restart_driver)
+        self.driver = None
 
-        self.driver = webdriver.Chrome(service=service, options=self.options)
+        # Espera pelos cards da busca e pelo título da página do produto em vez de pausas fixas
+        self.waiter = StoreWaiter("terabyte", results=(By.CSS_SELECTOR, "div.pbox"), product=(By.CSS_SELECTOR, "h1.tit-prod"))
 
     async def notify_discord_about_new_product(self, title, price, url):
         message = "-" * 70 + f"\n\n**Novo Produto!**\n**Produto:** {title}\n**Preço Abaixo do Esperado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_change_in_price(self, title, price, url):
         message = "-" * 70 + f"\n\n**Mudança no preço**\n**Produto:** {title}\n**Preço Abaixo do Esperado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
 
     async def notify_discord_about_monitoring_new_product(self, title, price, url):
         message = "-" * 70 + f"\n\n**Novo Produto!**\n**Produto:** {title}\n**Preço Monitorado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_monitoring_new_price(self, title, price, url):
         message = "-" * 70 + f"\n\n**Mudança no preço!**\n**Produto:** {title}\n**Preço Monitorado:** ${price}\n**Link:** {url}\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     async def notify_discord_about_error(self):
         message = "-" * 70 + f"\n\nOcorreu um erro ao monitorar o produto. \n\nO produto pode estar sem estoque, a página pode estar indisponível ou a estrutura do site mudou!\n\n" + "-" * 70
-        await self.user.send(message)
+        await self.notifier.enqueue(self.user, message)
 
     # Método para realizar a pesquisa do produto na Terabyte        
     def search_product(self):
-        sleep(0.5)
+        self.waiter.element_present(self.driver, "search_input", (By.ID, 'isearch'))
         search_input = self.driver.find_element(By.ID, 'isearch')
         search_input.send_keys(self.search_query)
         search_input.submit()
@@ -109,11 +117,11 @@ class TerabytePriceBot():
     # Método para verificar os preços dos produtos nas páginas
     def check_prices(self, x, y):
 
-        sleep(3)
+        self.waiter.results_ready(self.driver)
 
         self.close_popup(x, y)
 
-        sleep(3)
+        self.waiter.network_idle(self.driver)
 
         try:
 
@@ -122,107 +130,63 @@ class TerabytePriceBot():
 
             for _ in range(scrolls):
                 self.driver.execute_script(f"window.scrollBy(0, {scroll_increment});")
+                self.waiter.network_idle(self.driver)
 
-                sleep(1)  # Aguarda o carregamento da página após o scroll.
-
-                try:   
-                    product_cards = self.driver.find_elements(By.CSS_SELECTOR, "div.pbox")
-
-                except NoSuchElementException:
-                    print("Erro: Não foi possível encontrar os cartões de produto na página.")
-                    break
-                except WebDriverException as e:
-                    print(f"Erro do WebDriver")
-                    break
-                
-                except Exception as e:
-                    print(f"Erro geral ao tentar encontrar os cartões de produto")
-                    break
-
-
-                for card in product_cards:
+                # Lê todos os cards da página com uma única chamada ao navegador
+                for product in extract_listing(self.driver, "terabyte"):
                     if self.stop_search:
                         break
 
-                    try:
-                        product_link_element = card.find_element(By.CSS_SELECTOR, "a.commerce_columns_item_image").get_attribute("href")
-                    
-                    except Exception as e:
-                        print(f"Erro ao tentar encontrar o link do produto")
-                        
-                    try:
-                        title_element = card.find_element(By.CSS_SELECTOR, "h2").text
+                    product_info = {
+                        'link': product['url'],
+                        'title': product['title'],
+                        'price': product['price']
+                    }
 
-                    except Exception as e:
-                        print(f"Erro ao tentar encontrar o título do produto")
-                    
-                    try:
-                        price_element = card.find_element(By.CSS_SELECTOR, "div.prod-new-price span").text.replace('R$', '').replace('.', '').replace(',', '.').strip()
+                    if product['price'] is None:
+                        if product['out_of_stock']:
+                            print(f"Produto '{product['title']}' está esgotado.")
+                        else:
+                            print(f"Erro ao tentar encontrar o preço do produto '{product['title']}'")
+                        continue
 
-                    except Exception as e:
-                        try:
-                            price_element = card.find_element(By.CLASS_NAME, "tbt_esgotado").text
-                        except Exception as e:
-                            print(f"Erro ao tentar encontrar o preço do produto '{title_element}'")
-                            continue
+                    price = product['price']
 
+                    # Consulta o estado do produto pela chave (busca O(1)) para saber se ele é novo ou se o preço mudou
+                    change = self.product_store.observe(product_info['link'], product_info['title'], price)
 
-                    product_info = {
-                        'link': product_link_element,
-                        'title': title_element,
-                        'price': price_element
-                    }
-                    
-                    if product_info['title'] not in self.products_names:
-                        self.products_names.append(product_info['title'])
-                        self.products_info.append(product_info)
-
-                        try:
-                            price = float(price_element)
-                        except ValueError:
-                            if price_element == "Todos vendidos":
-                                print(f"Produto '{title_element}' está esgotado.")
-                            continue
+                    if change == NEW_PRODUCT:
 
                         if self.expected_price is None:
 
-                            asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_product(product_info['title'], price, product_info["link"]), self.loop)
+                            self.notifier.submit(self.notify_discord_about_monitoring_new_product(product_info['title'], price, product_info['link']))
 
-                            print(f"Novo Produto!\nPreço encontrado para '{product_info['title']}' \nPreço: R${price}\n\n")
+                            print(f"Novo produto!\nPreço encontrado para '{product_info['title']}' \nPreço: R${price}\n\n")
 
                         elif price <= self.expected_price:
 
-                            asyncio.run_coroutine_threadsafe(self.notify_discord_about_new_product(product_info['title'], price, product_info["link"]), self.loop)
+                            self.notifier.submit(self.notify_discord_about_new_product(product_info['title'], price, product_info['link']))
 
-                            print(f"Novo Produto!\nPreço encontrado para '{product_info['title']}' \nPreço: R${price}\n\n")
+                            print(f"Novo produto!\nPreço encontrado para '{product_info['title']}' \nPreço: R${price}\n\n")
 
-                    else:
-                        for product in self.products_info:
-                            if product_info['title'] == product['title'] and product_info['price'] != product['price']:
-                                try:
-                                    price = float(product_info['price'].replace('R$', '').replace('.', '').replace(',', '.').strip())
-                                except ValueError:
-                                    print(f"Erro ao converter o preço do produto '{product_info['title']}'. Preço encontrado: '{product_info['price']}'")
-                                    continue
+                    elif change == PRICE_CHANGED:
 
-                                product['price'] = product_info['price']
+                        if self.expected_price is None:
 
-                                if self.expected_price is None:
-                                        
-                                        asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_price(product_info['title'], price, product_info["link"]), self.loop)
-    
-                                        print(f"Novo Preço!\nPreço encontrado para '{product_info['title']}' \nPreço: R${price}\n\n")
-                                
-                                elif price <= self.expected_price:
-                                        
-                                        asyncio.run_coroutine_threadsafe(self.notify_discord_about_change_in_price(product_info['title'], price, product_info["link"]), self.loop)
-    
-                                        print(f"Novo Preço!\nPreço encontrado para '{product_info['title']}' \nPreço: R${price}\n\n")
+                            self.notifier.submit(self.notify_discord_about_monitoring_new_price(product_info['title'], price, product_info['link']))
+
+                            print(f"Preço mudou para '{product_info['title']}' \nPreço: R${price}\n\n")
+
+                        elif price <= self.expected_price:
+
+                            self.notifier.submit(self.notify_discord_about_change_in_price(product_info['title'], price, product_info['link']))
+
+                            print(f"Preço mudou para '{product_info['title']}' \nPreço: R${price}\n\n")
 
         except Exception as e:
             print(f"Erro geral na busca de produtos e preços")
 
-        return self.products_info
+        return self.product_store.values()
 
     # Método para navegar para a próxima página de resultados
     def next_page(self):
@@ -265,18 +229,17 @@ class TerabytePriceBot():
                 self.restart_driver()
                 self.driver.get(self.url)
                 self.driver.fullscreen_window()
-                sleep(1)
+                self.waiter.page_ready(self.driver)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices(1, 1)
-                    sleep(1)
                     if not self.next_page():
                         break
-                    sleep(1)
+                    self.waiter.results_ready(self.driver)
         else:
             for _ in range(self.times):
                 if self.stop_search:
@@ -284,20 +247,19 @@ class TerabytePriceBot():
                 self.restart_driver()
                 self.driver.get(self.url)
                 self.driver.fullscreen_window()
-                sleep(0.7)
+                self.waiter.page_ready(self.driver)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices(1, 1)
-                    sleep(1)
                     if not self.next_page():
                         break
-                    sleep(1)
+                    self.waiter.results_ready(self.driver)
         
-        self.driver.quit()
+        self.release_driver()
 
     
     # Método para realizar a busca de preços de forma síncrona
@@ -307,17 +269,15 @@ class TerabytePriceBot():
                 self.restart_driver()
                 self.driver.get(link)
                 self.driver.fullscreen_window()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
-                    sleep(1)
                     self.check_prices(200, 200)
-                    sleep(1)
                     if not self.next_page():
                         break
-                    sleep(1)
+                    self.waiter.results_ready(self.driver)
         else:
             for _ in range(self.times):
                 if self.stop_search:
@@ -325,30 +285,41 @@ class TerabytePriceBot():
                 self.restart_driver()
                 self.driver.get(link)
                 self.driver.fullscreen_window()
-                sleep(0.7)
+                self.waiter.page_ready(self.driver)
                 self.search_product()
-                sleep(1)
+                self.waiter.results_ready(self.driver)
 
                 for _ in range(self.pages):
                     if self.stop_search:
                         break
                     self.check_prices(200, 200)
-                    sleep(1)
                     if not self.next_page():
                         break
-                    sleep(1)
+                    self.waiter.results_ready(self.driver)
         
-        self.driver.quit()
+        self.release_driver()
+
+    # Devolve o navegador atual ao pool e pega outro (reaproveitado, se houver algum livre)
+    def restart_driver(self, recycle=False):
+        self.waiter.next_cycle()
+        driver_pool = get_driver_pool()
+        if recycle:
+            driver_pool.discard(self.driver)
+        else:
+            driver_pool.release(self.driver)
+        self.driver = driver_pool.checkout(self.options, store="terabyte", should_stop=lambda: self.stop_search)
 
-    def restart_driver(self):
-        self.driver.quit()
-        self.driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=self.options)
+    def release_driver(self):
+        self.results.flush()
+        self.waiter.end_cycle()
+        get_driver_pool().release(self.driver)
+        self.driver = None
 
     # Função para monitorar um link de um produto específico e se o preço dele mudou   
     def handle_product_out_of_stock(self, link, in_stock):
         print(f"\n\nNão foi possível encontrar o título ou preço para a URL: {link}\nPode ser que o produto esteja sem estoque ou a estrutura do site mudou.\n\n")
         if in_stock:
-            asyncio.run_coroutine_threadsafe(self.notify_discord_about_error(), self.loop)
+            self.notifier.submit(self.notify_discord_about_error())
             self.in_stock = False
 
     def check_specific_product(self, link, expected_price):
@@ -362,12 +333,15 @@ class TerabytePriceBot():
 
         in_stock = True
 
+        # Aba do produto mantida aberta entre as verificações
+        watcher = start_watcher(self, "terabyte", link)
+
         while not self.stop_search:
             try:
-                self.restart_driver()
-                self.driver.get(link)
+                # Abre a página do produto na primeira volta; nas seguintes espera o intervalo e atualiza a mesma aba
+                watcher.load()
                 self.driver.fullscreen_window()
-                sleep(3)
+                self.waiter.product_ready(self.driver)
                 self.close_popup(1, 1)
             except TimeoutException:
                 print(f"Timeout ao carregar {link}, tentando recarregar.")
@@ -379,32 +353,46 @@ class TerabytePriceBot():
                 continue
 
             try:
-                title_element = self.driver.find_element(By.CSS_SELECTOR, "h1.tit-prod")
-                title = title_element.text
-
-                price_element = self.driver.find_element(By.CSS_SELECTOR, "p.val-prod.valVista")
-                price_text = price_element.text.replace('R$', '').replace('.', '').replace(',', '.').strip()
+                # Tenta primeiro os dados estruturados (JSON-LD/microdata) da página; os seletores ficam como alternativa
+                product = page_structured_product(self.driver, "terabyte")
 
-                if not price_text:
+                if product is not None and not product["available"]:
                     self.handle_product_out_of_stock(link, in_stock)
                     continue
 
-                try:
-                    price = float(price_text)
-                except ValueError:
-                    price = price_text
+                if product is not None:
+                    title = product["title"]
+                    price = product["preço"]
+                else:
+                    title_element = self.driver.find_element(By.CSS_SELECTOR, "h1.tit-prod")
+                    title = title_element.text
+
+                    price_element = self.driver.find_element(By.CSS_SELECTOR, "p.val-prod.valVista")
+                    price_text = price_element.text.replace('R$', '').replace('.', '').replace(',', '.').strip()
+
+                    if not price_text:
+                        self.handle_product_out_of_stock(link, in_stock)
+                        continue
+
+                    try:
+                        price = float(price_text)
+                    except ValueError:
+                        price = price_text
 
                 print(f"Preço encontrado para '{title}' \nPreço: R${price}\n\n")
 
+                # Guarda o preço no histórico (a gravação acontece em segundo plano)
+                self.price_history.record("terabyte", link, title, price)
+
                 if last_price is None:
                     last_price = price
 
                 if first_notification:
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_product(title, price, link), self.loop)
+                    self.notifier.submit(self.notify_discord_about_monitoring_new_product(title, price, link))
                     first_notification = False
 
                 if price < last_price or (price < expected_price and not notified_for_price_drop):
-                    asyncio.run_coroutine_threadsafe(self.notify_discord_about_monitoring_new_price(title, price, link), self.loop)
+                    self.notifier.submit(self.notify_discord_about_monitoring_new_price(title, price, link))
                     print(f"Preço encontrado para '{title}' \nPreço: R${price}\n\n")
                     last_price = price
                     notified_for_price_drop = True
@@ -415,11 +403,13 @@ class TerabytePriceBot():
                 self.handle_product_out_of_stock(link, in_stock)
                 continue
 
-            except WebDriverException as e:
-                if "Out of Memory" in str(e):
-                    print("Detectado erro 'Out of Memory'. Reiniciando o driver...")
-                    self.restart_driver()
+            except WebDriverException:
+                # Troca o navegador se ele parou de responder ou passou dos limites de memória/CPU (botUtils/resourceMonitor.py)
+                if get_driver_pool().needs_recycle(self.driver):
+                    self.restart_driver(recycle=True)
 
+        stop_watcher(watcher)
+        self.release_driver()
 
     async def search_specific_product(self, link, expected_price):
         await asyncio.get_event_loop().run_in_executor(None, self.check_specific_product, link, expected_price)
@@ -430,11 +420,10 @@ class TerabytePriceBot():
     async def search_link_prices(self, link):
         await asyncio.get_event_loop().run_in_executor(None, self.check_link_prices, link)
 
-    # Método para salvar os dados em um arquivo CSV
+    # Método para gravar no arquivo de resultados as linhas que ainda estão em memória
     def data_to_csv(self):
-        df = pd.DataFrame(self.priceList)
-        df = df.dropna(how='all')
-        df.to_csv(f"{self.search_query}.csv", index=False)
+        self.results.flush()
+        return self.results.path
 
 
 
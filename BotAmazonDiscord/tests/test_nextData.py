@@ -0,0 +1,66 @@
+import json
+
+from botUtils.nextData import parse_next_product, page_next_listing, next_search_url, listing_page_url
+
+
+def next_page(props):
+    return f'<html><script id="__NEXT_DATA__" type="application/json">{json.dumps({"props": props})}</script></html>'
+
+
+# Navegador falso: devolve o texto do __NEXT_DATA__ da página "aberta" e não sabe navegar
+class PageDriver():
+    def __init__(self, props):
+        self.text = json.dumps({"props": props})
+
+    def execute_script(self, script):
+        return self.text
+
+
+# Produto principal esgotado (sem preço) e recomendações com preço, uma delas com código contido no da URL
+KABUM_PAGE = next_page({
+    "pageProps": {
+        "product": {"code": 520369, "name": "Placa de Vídeo", "available": False, "friendlyName": "placa-de-video"},
+        "recommendations": [
+            {"code": 111, "name": "Mouse", "priceWithDiscount": 49.9, "available": True, "friendlyName": "mouse"},
+            {"code": 5203, "name": "Teclado", "priceWithDiscount": 99.9, "available": True, "friendlyName": "teclado"},
+        ],
+    },
+})
+
+
+def test_out_of_stock_product_is_not_replaced_by_a_recommendation():
+    product = parse_next_product(KABUM_PAGE, "kabum", "https://www.kabum.com.br/produto/520369/placa-de-video")
+
+    assert product["id"] == "520369"
+    assert product["title"] == "Placa de Vídeo"
+    assert product["preço"] is None
+    assert not product["available"]
+
+
+def test_product_code_must_match_a_whole_path_segment():
+    assert parse_next_product(KABUM_PAGE, "kabum", "https://www.kabum.com.br/produto/5203699/outro") is None
+
+
+def test_priced_product_is_found_by_its_code():
+    product = parse_next_product(KABUM_PAGE, "kabum", "https://www.kabum.com.br/produto/5203/teclado")
+
+    assert product["title"] == "Teclado"
+    assert product["preço"] == 99.9
+    assert product["available"]
+
+
+def test_listing_is_read_from_the_open_page():
+    products = page_next_listing(PageDriver({"pageProps": {"products": [
+        {"code": 111, "name": "Mouse", "priceWithDiscount": 49.9, "available": True, "friendlyName": "mouse"},
+        {"code": 222, "name": "Teclado", "priceWithDiscount": 99.9, "available": False, "friendlyName": "teclado"},
+    ]}}), "kabum")
+
+    assert [product["title"] for product in products] == ["Mouse"]
+
+
+def test_listing_pages_are_built_with_the_store_page_parameter():
+    url = next_search_url("kabum", "placa de vídeo")
+
+    assert url == "https://www.kabum.com.br/busca/placa%20de%20v%C3%ADdeo"
+    assert listing_page_url(url, "kabum", 1) == url
+    assert listing_page_url(f"{url}?page_number=3", "kabum", 2) == f"{url}?page_number=2"